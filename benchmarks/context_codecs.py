@@ -0,0 +1,110 @@
+"""
+Compares storing event contexts in the ``context`` JSON column against each registered context codec,
+measuring storage size, ingest and read throughput, and raw encode and decode throughput.
+
+    python -m benchmarks.context_codecs --events 20000 --context-size 40
+"""
+from argparse import ArgumentParser
+from itertools import islice
+import json
+
+from benchmarks.utils import benchmark_database, print_table, setup, timed
+
+
+def get_context(i, context_size):
+    return {
+        'user': i,
+        'project': i % 100,
+        'items': [
+            {'id': i * context_size + j, 'name': 'Item {0}'.format(j), 'status': 'open' if j % 3 else 'closed'}
+            for j in range(context_size)
+        ],
+    }
+
+
+def get_column_bytes(Event, uuid_prefix):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT sum(coalesce(pg_column_size(context), 0) + coalesce(pg_column_size(context_data), 0)) '
+            'FROM {0} WHERE uuid LIKE %s'.format(Event._meta.db_table),
+            ['{0}-%'.format(uuid_prefix)]
+        )
+        return cursor.fetchone()[0]
+
+
+def run(num_events, context_size, batch_size):
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django.test.utils import override_settings
+    from django_dynamic_fixture import G
+
+    from entity_event.codecs import _codecs
+    from entity_event.models import Event, Source
+
+    source = G(Source)
+    contexts = [get_context(i, context_size) for i in range(num_events)]
+
+    storage_rows = []
+    for codec_name in [None] + sorted(_codecs):
+        label = codec_name or 'json column'
+
+        def create_events():
+            kwargs_iter = (
+                {'source': source, 'context': context, 'uuid': '{0}-{1}'.format(label, i)}
+                for i, context in enumerate(contexts)
+            )
+            while True:
+                batch = list(islice(kwargs_iter, batch_size))
+                if not batch:
+                    break
+                Event.objects.create_events(batch)
+
+        def read_events():
+            for event in Event.objects.filter(uuid__startswith='{0}-'.format(label)).iterator(chunk_size=batch_size):
+                event.context
+
+        with override_settings(ENTITY_EVENT_CONTEXT_CODEC=codec_name):
+            create_seconds, _ = timed(create_events)
+        read_seconds, _ = timed(read_events)
+        num_bytes = get_column_bytes(Event, label)
+
+        storage_rows.append([
+            label,
+            '{0:.1f}'.format(num_bytes / num_events),
+            '{0:.0f}'.format(num_events / create_seconds),
+            '{0:.0f}'.format(num_events / read_seconds),
+        ])
+
+    print_table(['storage', 'bytes/event', 'create events/sec', 'read events/sec'], storage_rows)
+    print()
+
+    def json_encode():
+        return [json.dumps(context, cls=DjangoJSONEncoder) for context in contexts]
+
+    codec_rows = []
+    json_seconds, encoded = timed(json_encode)
+    decode_seconds, _ = timed(lambda: [json.loads(data) for data in encoded])
+    codec_rows.append([
+        'json text', '{0:.0f}'.format(num_events / json_seconds), '{0:.0f}'.format(num_events / decode_seconds)
+    ])
+    for codec_name, codec in sorted(_codecs.items()):
+        encode_seconds, encoded = timed(lambda: [codec.encode(context) for context in contexts])
+        decode_seconds, _ = timed(lambda: [codec.decode(data) for data in encoded])
+        codec_rows.append([
+            codec_name, '{0:.0f}'.format(num_events / encode_seconds), '{0:.0f}'.format(num_events / decode_seconds)
+        ])
+
+    print_table(['codec', 'encodes/sec', 'decodes/sec'], codec_rows)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--context-size', type=int, default=40)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    with benchmark_database():
+        run(args.events, args.context_size, args.batch_size)
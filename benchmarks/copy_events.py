@@ -0,0 +1,58 @@
+"""
+Compares the ingest throughput of ``Event.objects.copy_events`` against ``Event.objects.create_events``.
+
+    python -m benchmarks.copy_events --events 100000 --batch-size 10000
+"""
+from argparse import ArgumentParser
+from itertools import islice
+
+from benchmarks.utils import benchmark_database, print_table, setup, timed
+
+
+def get_event_kwargs(prefix, num_events, source, actors):
+    for i in range(num_events):
+        yield {
+            'source': source,
+            'context': {'user': i, 'project': i % 100, 'text': 'Event number {0}'.format(i)},
+            'uuid': '{0}-{1}'.format(prefix, i),
+            'actors': actors[i % len(actors):i % len(actors) + 2],
+        }
+
+
+def run(num_events, batch_size):
+    from django_dynamic_fixture import G
+    from entity.models import Entity
+
+    from entity_event.models import Event, Source
+
+    source = G(Source)
+    actors = [G(Entity) for i in range(10)]
+
+    def create_events():
+        kwargs_iter = get_event_kwargs('create', num_events, source, actors)
+        while True:
+            batch = list(islice(kwargs_iter, batch_size))
+            if not batch:
+                break
+            Event.objects.create_events(batch)
+
+    def copy_events():
+        Event.objects.copy_events(get_event_kwargs('copy', num_events, source, actors), batch_size=batch_size)
+
+    rows = []
+    for name, func in [('create_events', create_events), ('copy_events', copy_events)]:
+        seconds, _ = timed(func)
+        rows.append([name, num_events, '{0:.2f}'.format(seconds), '{0:.0f}'.format(num_events / seconds)])
+
+    print_table(['method', 'events', 'seconds', 'events/sec'], rows)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup()
+    with benchmark_database():
+        run(args.events, args.batch_size)
@@ -0,0 +1,85 @@
+"""
+Compares rendering the same events for several mediums with a ``Medium.render`` call per medium against one
+``Medium.objects.render_many`` call, counting the queries and timing each.
+
+    python -m benchmarks.render_many --events 1000 --mediums 3
+"""
+from argparse import ArgumentParser
+
+from benchmarks.utils import benchmark_database, count_queries, print_table, setup, timed
+
+
+CONTEXT_HINTS = {
+    'user': {
+        'app_name': 'auth',
+        'model_name': 'User',
+    },
+    'group': {
+        'app_name': 'auth',
+        'model_name': 'Group',
+    },
+}
+
+
+def run(num_events, num_mediums, num_repeats):
+    from django.contrib.auth.models import Group, User
+    from django_dynamic_fixture import G
+
+    from entity_event.models import ContextRenderer, Event, Medium, RenderingStyle, Source
+
+    users = User.objects.bulk_create([User(username='user{0}'.format(i)) for i in range(100)])
+    groups = Group.objects.bulk_create([Group(name='group{0}'.format(i)) for i in range(10)])
+
+    source = G(Source)
+    mediums = []
+    for i in range(num_mediums):
+        rendering_style = G(RenderingStyle)
+        G(
+            ContextRenderer, source=source, rendering_style=rendering_style, context_hints=CONTEXT_HINTS,
+            text_template='{{ user.username }} joined {{ group.name }} ' + str(i),
+            html_template='<b>{{ user.username }}</b> joined {{ group.name }}{% if footer %} {{ footer }}{% endif %}',
+        )
+        mediums.append(G(Medium, rendering_style=rendering_style, additional_context={'footer': i} if i else None))
+
+    Event.objects.create_events([
+        {
+            'source': source,
+            'context': {'user': users[i % len(users)].id, 'group': groups[i % len(groups)].id},
+            'uuid': 'render-{0}'.format(i),
+        }
+        for i in range(num_events)
+    ])
+
+    def render_per_medium(events):
+        return {medium: medium.render(events) for medium in mediums}
+
+    def render_many(events):
+        return Medium.objects.render_many(events, mediums)
+
+    rows = []
+    for name, func in [('Medium.render', render_per_medium), ('render_many', render_many)]:
+        total_seconds = 0
+        for i in range(num_repeats):
+            events = list(Event.objects.cache_related())
+            with count_queries() as queries:
+                seconds, _ = timed(func, events)
+            total_seconds += seconds
+
+        rows.append([
+            name, num_events, num_mediums, len(queries), '{0:.3f}'.format(total_seconds / num_repeats),
+            '{0:.0f}'.format(num_events * num_mediums * num_repeats / total_seconds),
+        ])
+
+    print_table(['method', 'events', 'mediums', 'queries', 'seconds', 'renders/sec'], rows)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--mediums', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    with benchmark_database():
+        run(args.events, args.mediums, args.repeats)
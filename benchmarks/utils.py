@@ -0,0 +1,69 @@
+"""
+Shared helpers for the benchmark scripts. Benchmarks are run from the root of the
+repository as modules, for example ``python -m benchmarks.copy_events``, against a
+throwaway test database created with the same settings as the test suite.
+"""
+from contextlib import contextmanager
+from time import perf_counter
+
+import django
+
+from settings import configure_settings
+
+
+def setup():
+    """
+    Configures the settings and loads the apps.
+    """
+    configure_settings()
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Creates a test database for the duration of the benchmark and destroys it afterwards.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def count_queries():
+    """
+    Captures the queries executed in the block. The yielded list is filled in when the block exits.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    queries = []
+    with CaptureQueriesContext(connection) as context:
+        yield queries
+    queries.extend(context.captured_queries)
+
+
+def timed(func, *args, **kwargs):
+    """
+    Calls the function and returns a tuple of the elapsed seconds and the return value.
+    """
+    start = perf_counter()
+    result = func(*args, **kwargs)
+    return perf_counter() - start, result
+
+
+def print_table(headers, rows):
+    """
+    Prints the rows as an aligned table.
+    """
+    rows = [[str(v) for v in row] for row in rows]
+    widths = [max(len(str(h)), *(len(row[i]) for row in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(v.ljust(w) for v, w in zip(row, widths)))
@@ -3,6 +3,7 @@ from uuid import uuid1
 
 from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 
 from entity_event.models import (
     AdminEvent, Event, EventActor, EventSeen, Medium, Source, SourceGroup, Subscription, Unsubscription
@@ -38,14 +39,32 @@ class AdminEventForm(forms.ModelForm):
         pass
 
 
+class DeferredFieldsChangeList(ChangeList):
+    """
+    A change list that defers the ``list_defer`` fields of its model admin, for fields that are
+    too large to be worth loading for every row of the list.
+    """
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super(DeferredFieldsChangeList, self).get_queryset(request, *args, **kwargs)
+        return queryset.defer(*self.model_admin.list_defer)
+
+
 class AdminEventAdmin(admin.ModelAdmin):
     list_display = ('time', 'source')
+    list_defer = ('context', 'context_data')
     form = AdminEventForm
 
+    def get_changelist(self, request, **kwargs):
+        return DeferredFieldsChangeList
+
 
 class EventSeenAdmin(admin.ModelAdmin):
     list_display = ('event', 'medium', 'time_seen')
     list_filter = ('event__source',)
+    list_defer = ('event__context', 'event__context_data')
+
+    def get_changelist(self, request, **kwargs):
+        return DeferredFieldsChangeList
 
 
 class EventActorInline(admin.TabularInline):
@@ -59,12 +78,16 @@ class EventSeenInline(admin.TabularInline):
 class EventAdmin(admin.ModelAdmin):
     list_display = ('time', 'source')
     list_filter = ('time', 'source')
+    list_defer = ('context', 'context_data')
 
     inlines = [
         EventActorInline,
         EventSeenInline
     ]
 
+    def get_changelist(self, request, **kwargs):
+        return DeferredFieldsChangeList
+
 
 class MediumAdmin(admin.ModelAdmin):
     list_display = ('display_name', 'description')
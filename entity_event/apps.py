@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class EntityEventConfig(AppConfig):
     name = 'entity_event'
     verbose_name = 'Django Entity Event'
+
+    def ready(self):
+        from entity_event import signal_handlers  # noqa: F401
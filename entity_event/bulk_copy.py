@@ -0,0 +1,199 @@
+"""
+A module for bulk loading events with Postgres ``COPY``.
+
+``Event.objects.create_events`` goes through the ORM, which means every event pays for
+JSON encoding, parameter binding and a round trip for the uuid lookup. When loading very
+large numbers of events (migrations, replays), the rows are instead streamed into a
+temporary staging table with ``COPY FROM STDIN`` and merged into the event and actor
+tables with a single statement that skips any uuid that already exists.
+"""
+import json
+from itertools import chain, count, islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from entity_event.models import Event, EventActor, Source
+
+
+STAGING_TABLE = 'entity_event_event_staging'
+
+
+def escape_copy_value(value):
+    """
+    Escapes a single value for the text format of ``COPY``. ``None`` is written as ``\\N``.
+    """
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def format_copy_array(values):
+    """
+    Formats a list of integers as a Postgres array literal.
+    """
+    return '{{{0}}}'.format(','.join(str(int(v)) for v in values))
+
+
+def get_copy_row(position, kwargs, now):
+    """
+    Given the position of an event in the stream and the kwargs that would be passed
+    to ``create_event``, return the tab separated ``COPY`` line for the staging table.
+    """
+    source = kwargs.get('source')
+    source_id = source.id if source is not None else kwargs['source_id']
+    actors = kwargs.get('actors') or []
+
+    time_field = Event._meta.get_field('time')
+    time_expires_field = Event._meta.get_field('time_expires')
+    values = [
+        position,
+        kwargs.get('uuid', ''),
+        source_id,
+        json.dumps(kwargs['context'], cls=DjangoJSONEncoder),
+        time_field.get_prep_value(kwargs.get('time') or now).isoformat(),
+        time_expires_field.get_prep_value(kwargs.get('time_expires') or time_expires_field.default).isoformat(),
+        format_copy_array(actor.id if hasattr(actor, 'id') else actor for actor in actors),
+    ]
+
+    return '\t'.join(escape_copy_value(v) for v in values) + '\n'
+
+
+class CopyStream(object):
+    """
+    A file-like object over an iterable of ``COPY`` lines. psycopg2 reads the data for
+    ``copy_expert`` through a ``read`` method, so this lets events be streamed without
+    building the whole payload in memory.
+    """
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._buffer = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer.extend(line.encode('utf-8'))
+
+        if size < 0:
+            size = len(self._buffer)
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def copy_lines_to_table(cursor, sql, lines):
+    """
+    Streams the lines into a ``COPY FROM STDIN`` statement with whichever psycopg version
+    backs the connection.
+    """
+    raw_cursor = cursor.cursor
+
+    # psycopg2
+    if hasattr(raw_cursor, 'copy_expert'):  # pragma: no cover
+        raw_cursor.copy_expert(sql, CopyStream(lines))
+    # psycopg 3
+    else:  # pragma: no cover
+        with raw_cursor.copy(sql) as copy:
+            for line in lines:
+                copy.write(line)
+
+
+def get_staging_table_sql():
+    """
+    Returns the sql used for creating the temporary staging table.
+    """
+    return (
+        'CREATE TEMPORARY TABLE {table} ('
+        'position bigint, uuid {uuid_type}, source_id {source_type}, context jsonb, '
+        'time {time_type}, time_expires {time_type}, actor_ids {actor_type}[]'
+        ') ON COMMIT DROP'
+    ).format(
+        table=STAGING_TABLE,
+        uuid_type=Event._meta.get_field('uuid').db_type(connection),
+        source_type=Event._meta.get_field('source').db_type(connection),
+        time_type=Event._meta.get_field('time').db_type(connection),
+        actor_type=EventActor._meta.get_field('entity').db_type(connection),
+    )
+
+
+def get_merge_sql():
+    """
+    Returns the sql that merges the staging table into the event and actor tables. When the
+    same uuid is staged more than once in a batch, the last one wins, which matches ``create_events``.
+    Events with a uuid that already exists are skipped along with their actors. The number
+    of created events is returned. The source group of each event is read from its source.
+    """
+    return (
+        'WITH deduped AS ('
+        '    SELECT DISTINCT ON (uuid) * FROM {staging} ORDER BY uuid, position DESC'
+        '), inserted AS ('
+        '    INSERT INTO {event} (source_id, context, time, time_expires, uuid, uuid_hash, actor_ids, source_group_id)'
+        '    SELECT deduped.source_id, context, time, time_expires, uuid, md5(uuid)::uuid,'
+        '        ARRAY(SELECT DISTINCT unnest(actor_ids)), {source}.group_id FROM deduped'
+        '    INNER JOIN {source} ON {source}.id = deduped.source_id'
+        '    ON CONFLICT (uuid_hash) DO NOTHING'
+        '    RETURNING id, uuid'
+        '), actors AS ('
+        '    INSERT INTO {event_actor} (event_id, entity_id)'
+        '    SELECT inserted.id, unnest(deduped.actor_ids) FROM inserted'
+        '    INNER JOIN deduped ON deduped.uuid = inserted.uuid'
+        ') '
+        'SELECT count(*) FROM inserted'
+    ).format(
+        staging=STAGING_TABLE,
+        event=Event._meta.db_table,
+        source=Source._meta.db_table,
+        event_actor=EventActor._meta.db_table,
+    )
+
+
+def copy_events(kwargs_list, batch_size=None):
+    """
+    Creates events and their actors in bulk with ``COPY``. Each element in the kwargs list should be a dict
+    with the same arguments that would be passed to ``create_event``, except that ``ignore_duplicates``
+    is implied: events whose uuid already exists are always skipped. The kwargs list may be any iterable,
+    such as a generator, and is streamed to the database in batches of ``batch_size`` events (or all at
+    once if no batch size is given).
+
+    Each batch is committed in its own transaction, so a failure only rolls back the batch that failed,
+    and since existing uuids are skipped, the load can be run again to pick up where it stopped. A uuid
+    repeated within a batch keeps its last event, while a uuid repeated across batches keeps its first.
+
+    :rtype: int
+    :returns: The number of events that were created.
+    """
+    kwargs_iter = iter(kwargs_list)
+    positions = count()
+    num_created = 0
+    now = timezone.now()
+
+    while True:
+        batch = islice(kwargs_iter, batch_size)
+        first_kwargs = next(batch, None)
+        if first_kwargs is None:
+            break
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(get_staging_table_sql())
+            copy_lines_to_table(
+                cursor,
+                'COPY {0} (position, uuid, source_id, context, time, time_expires, actor_ids) FROM STDIN'.format(
+                    STAGING_TABLE
+                ),
+                (get_copy_row(next(positions), kwargs, now) for kwargs in chain([first_kwargs], batch))
+            )
+            cursor.execute(get_merge_sql())
+            num_created += cursor.fetchone()[0]
+            cursor.execute('DROP TABLE {0}'.format(STAGING_TABLE))
+
+    return num_created
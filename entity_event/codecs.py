@@ -0,0 +1,90 @@
+"""
+Codecs for storing event contexts as compressed binary data. See the ``ENTITY_EVENT_CONTEXT_CODEC`` setting.
+"""
+import json
+import zlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+# The registered codecs keyed on their names. The name of the codec is stored with each encoded context,
+# so a codec must stay registered for as long as contexts encoded with it exist.
+_codecs = {}
+
+
+class ContextCodec(object):
+    """
+    The interface of a context codec. Encoding takes the same JSON serializable contexts
+    as the ``context`` JSON column, and decoding returns them as the column would, with
+    any values that are not native to JSON converted by the ``DjangoJSONEncoder``.
+    """
+    name = None
+
+    def encode(self, context):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+
+class ZlibJsonCodec(ContextCodec):
+    """
+    Compact JSON compressed with zlib.
+    """
+    name = 'zlib-json'
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def encode(self, context):
+        return zlib.compress(
+            json.dumps(context, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8'), self.level)
+
+    def decode(self, data):
+        return json.loads(zlib.decompress(data))
+
+
+class MsgpackCodec(ContextCodec):
+    """
+    MessagePack, which requires the ``msgpack`` package.
+    """
+    name = 'msgpack'
+
+    def __init__(self):
+        if msgpack is None:  # pragma: no cover
+            raise ImproperlyConfigured('The msgpack context codec requires the msgpack package')
+        self.default = DjangoJSONEncoder().default
+
+    def encode(self, context):
+        return msgpack.packb(context, default=self.default)
+
+    def decode(self, data):
+        return msgpack.unpackb(data)
+
+
+def register_codec(codec):
+    """
+    Registers a ``ContextCodec`` instance under its name.
+    """
+    _codecs[codec.name] = codec
+
+
+def get_codec(name):
+    """
+    Returns the codec registered under the given name.
+    """
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ImproperlyConfigured('No context codec is registered with the name {0}'.format(name))
+
+
+register_codec(ZlibJsonCodec())
+if msgpack is not None:  # pragma: no branch
+    register_codec(MsgpackCodec())
@@ -2,19 +2,228 @@
 A module for loading contexts using context hints.
 """
 from collections import defaultdict
+from functools import partial
+import json
+import threading
 
+import django
 from django.conf import settings
-from django.db.models import Q
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import BooleanField, Func, Prefetch, Q
+from django.db.models.query import ModelIterable
+from django.utils.functional import LazyObject
+from django.utils.module_loading import import_string
 from django.apps import apps
 get_model = apps.get_model
-from manager_utils import id_dict
 
+from entity_event.fetch_executor import fetch_concurrently
 from entity_event.models import ContextRenderer
+from entity_event.object_cache import get_object_cache
+from entity_event.renderer_registry import get_renderer_registry
+
+
+class EqualsAny(Func):
+    """
+    Matches rows where the expression equals any of the values, which are sent as a single array
+    parameter with ``= ANY(%s)`` instead of as a parameter per value like ``__in`` does.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, expression, values):
+        super(EqualsAny, self).__init__(expression)
+        self.values = list(values)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        expression = self.get_source_expressions()[0]
+        sql, params = compiler.compile(expression)
+        array_type = expression.output_field.cast_db_type(connection)
+        return '{0} = ANY(%s::{1}[])'.format(sql, array_type), (*params, self.values)
+
+
+class BatchResolver(object):
+    """
+    The function named by the ``resolver`` of a context hint, for values that are not model ids. The
+    function is called once per render with the set of every value found under the hinted key, and
+    returns a dictionary of the values to what replaces them. Values may be numbers or strings.
+    """
+    value_types = (complex, float, int, str)
+
+    def __init__(self, path):
+        self.path = path
+        self.resolve = import_string(path)
+
+    def __eq__(self, other):
+        return isinstance(other, BatchResolver) and self.path == other.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return 'BatchResolver({0})'.format(self.path)
+
+
+class PolymorphicHint(object):
+    """
+    The models of a ``polymorphic`` context hint, whose values are references to objects of different models
+    such as ``{"type": "project", "id": 5}``. The ``types`` of the hint map the type of a reference to the
+    label of its model, such as ``{"project": "projects.Project"}``, and are required, so that a context can
+    only load the models that its renderers allow. References are replaced with their objects, and the ids of
+    each model are fetched together across all of the references.
+    """
+    def __init__(self, types):
+        if not types:
+            raise ImproperlyConfigured('Polymorphic context hints require the types of the models they may load')
+        self.types = {type_name: apps.get_model(label) for type_name, label in types.items()}
+
+    def __eq__(self, other):
+        return isinstance(other, PolymorphicHint) and self.types == other.types
+
+    def __hash__(self):
+        return hash(frozenset(self.types.items()))
+
+    def __repr__(self):
+        return 'PolymorphicHint({0})'.format(sorted(self.types))
+
+    def get_model(self, reference):
+        """
+        Returns the model of a reference, or ``None`` if the reference does not have a known type.
+        """
+        type_name = reference.get('type') if isinstance(reference, dict) else None
+        return self.types.get(type_name) if isinstance(type_name, str) else None
+
+    def get_model_ids(self, references):
+        """
+        Returns tuples of the model and the id of each reference whose model is known.
+        """
+        for reference in references:
+            model = self.get_model(reference)
+            if model is not None and isinstance(reference.get('id'), (float, int)):
+                yield model, reference['id']
+
+    def load(self, value, model_data):
+        """
+        Returns the objects of a reference or of a list of references, or ``None`` for the references whose
+        objects were not fetched.
+        """
+        if isinstance(value, list):
+            return [self.load(reference, model_data) for reference in value]
+
+        model = self.get_model(value)
+        return model_data.get(model, {}).get(value.get('id')) if model is not None else None
+
+
+def get_hinted_model(hints):
+    """
+    Returns the model of a context hint, its ``BatchResolver`` when it names a ``resolver``, or its
+    ``PolymorphicHint`` when it is ``polymorphic``.
+    """
+    if hints.get('resolver'):
+        return BatchResolver(hints['resolver'])
+    if hints.get('polymorphic'):
+        return PolymorphicHint(hints.get('types'))
+    return get_model(hints['app_name'], hints['model_name'])
+
+
+class PrefetchHint(object):
+    """
+    A ``Prefetch`` declared in the ``prefetch_related`` of a context hint as a dictionary, such as:
+
+    .. code-block:: python
+
+        {
+            'lookup': 'comment_set',
+            'app_name': 'comments',
+            'model_name': 'Comment',
+            'filter': {'is_public': True},
+            'order_by': ['-time'],
+            'limit': 3,
+            'to_attr': 'recent_comments',
+        }
+
+    The queryset of the prefetch is built from the model, and optionally the ``filter``, ``exclude``,
+    ``select_related``, ``order_by`` and ``limit`` keys. Hints are equal when their dictionaries are equal,
+    so that the same prefetch declared by several renderers is only done once.
+    """
+    def __init__(self, spec):
+        self.spec = spec
+        self.key = json.dumps(spec, cls=DjangoJSONEncoder, sort_keys=True)
+
+    def __eq__(self, other):
+        return isinstance(other, PrefetchHint) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return 'PrefetchHint({0})'.format(self.key)
+
+    @property
+    def lookup(self):
+        return self.spec['lookup']
+
+    @property
+    def prefetch_to(self):
+        """
+        The lookup of the objects that the prefetch sets, which must be unique in a queryset.
+        """
+        return '__'.join(self.lookup.split('__')[:-1] + [self.spec.get('to_attr') or self.lookup.split('__')[-1]])
+
+    def get_prefetch(self):
+        queryset = get_model(self.spec['app_name'], self.spec['model_name']).objects.all()
+        if self.spec.get('filter'):
+            queryset = queryset.filter(**self.spec['filter'])
+        if self.spec.get('exclude'):
+            queryset = queryset.exclude(**self.spec['exclude'])
+        if self.spec.get('select_related'):
+            queryset = queryset.select_related(*self.spec['select_related'])
+        if self.spec.get('order_by'):
+            queryset = queryset.order_by(*self.spec['order_by'])
+        if self.spec.get('limit'):
+            # Prefetching a sliced queryset is only supported from Django 4.2
+            if django.VERSION < (4, 2):
+                raise ImproperlyConfigured('Prefetching a limit of related objects requires Django 4.2')
+            queryset = queryset[:self.spec['limit']]
+
+        return Prefetch(self.lookup, queryset=queryset, to_attr=self.spec.get('to_attr'))
+
+
+def get_prefetch_hints(hints):
+    """
+    Returns the ``prefetch_related`` of a context hint, with the prefetches that are declared as
+    dictionaries as ``PrefetchHint`` objects.
+    """
+    return [
+        PrefetchHint(lookup) if isinstance(lookup, dict) else lookup
+        for lookup in hints.get('prefetch_related', [])
+    ]
+
+
+def get_prefetches(model, prefetch_related):
+    """
+    Returns the lookups and ``Prefetch`` objects of the merged ``prefetch_related`` hints of a model, ordered
+    so that the prefetches of a relation come before the lookups that go through it. Hints that prefetch
+    different objects into the same attribute cannot be merged and raise a ``ValueError``.
+    """
+    prefetches_to = {}
+    for lookup in prefetch_related:
+        prefetch_to = lookup.prefetch_to if isinstance(lookup, PrefetchHint) else lookup
+        if prefetches_to.setdefault(prefetch_to, lookup) != lookup:
+            raise ValueError('Context hints for {0} prefetch different objects into {1}'.format(
+                model.__name__, prefetch_to))
+
+    return [
+        lookup.get_prefetch() if isinstance(lookup, PrefetchHint) else lookup
+        for prefetch_to, lookup in sorted(
+            prefetches_to.items(),
+            key=lambda item: (item[0].count('__'), not isinstance(item[1], PrefetchHint), item[0]))
+    ]
 
 
 def get_context_hints_per_source(context_renderers):
     """
-    Given a list of context renderers, return a dictionary of context hints per source.
+    Given a list of context renderers, return a dictionary of context hints per source id.
     """
     # Merge the context render hints for each source as there can be multiple context hints for
     # sources depending on the render target. Merging them together involves combining select
@@ -28,14 +237,77 @@ def get_context_hints_per_source(context_renderers):
     for cr in context_renderers:
         for key, hints in cr.context_hints.items() if cr.context_hints else []:
             for source in cr.get_sources():
-                context_hints_per_source[source][key]['app_name'] = hints['app_name']
-                context_hints_per_source[source][key]['model_name'] = hints['model_name']
-                context_hints_per_source[source][key]['select_related'].update(hints.get('select_related', []))
-                context_hints_per_source[source][key]['prefetch_related'].update(hints.get('prefetch_related', []))
+                is_first = key not in context_hints_per_source[source.id]
+                merged_hints = context_hints_per_source[source.id][key]
+                merged_hints['app_name'] = hints.get('app_name')
+                merged_hints['model_name'] = hints.get('model_name')
+                for option in ('resolver', 'polymorphic', 'types'):
+                    if hints.get(option):
+                        merged_hints[option] = hints[option]
+                merged_hints['select_related'].update(hints.get('select_related', []))
+                merged_hints['prefetch_related'].update(get_prefetch_hints(hints))
+                if hints.get('paths'):
+                    merged_hints.setdefault('paths', set()).update(hints['paths'])
+                if hints.get('cache'):
+                    merged_hints['cache'] = merge_cache_timeouts(merged_hints.get('cache'), hints['cache'])
+                merge_field_hints(merged_hints, hints, is_first)
 
     return context_hints_per_source
 
 
+def merge_field_hints(merged_hints, hints, is_first):
+    """
+    Merges the field options of context hints into ``merged_hints``, so that every field that any of the
+    hints needs is loaded. The ``only``, ``values`` and ``values_list`` options are kept as the union of
+    their fields when every hint declares them, and ``defer`` as the intersection of its fields. The fields
+    of ``values`` and ``values_list`` are also kept as ``only``, in case the models are loaded as instances
+    for other hints.
+    """
+    hint_fields = {
+        'only': hints.get('only') or hints.get('values') or hints.get('values_list'),
+        'defer': hints.get('defer'),
+        'values': hints.get('values'),
+        'values_list': hints.get('values_list'),
+    }
+    for option, fields in hint_fields.items():
+        if fields and is_first:
+            merged_hints[option] = set(fields)
+        elif fields and option in merged_hints:
+            merged_fields = merged_hints[option]
+            merged_hints[option] = merged_fields & set(fields) if option == 'defer' else merged_fields | set(fields)
+        else:
+            merged_hints.pop(option, None)
+
+
+def get_hinted_queryset(model, select_related, prefetch_related, field_hints):
+    """
+    Returns the queryset of a hinted model, given the merged related and field hints of the model.
+    Models with ``values`` or ``values_list`` hints are loaded as dictionaries or named tuples that
+    always include the ``id``, without their related models.
+    """
+    if field_hints.get('values'):
+        return model.objects.values('id', *sorted(field_hints['values']))
+    if field_hints.get('values_list'):
+        return model.objects.values_list('id', *sorted(field_hints['values_list']), named=True)
+
+    queryset = model.objects
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*get_prefetches(model, prefetch_related))
+
+    # Related models that are selected cannot be deferred
+    related_fields = {
+        '__'.join(path.split('__')[:i + 1]) for path in select_related for i in range(len(path.split('__')))
+    }
+    if field_hints.get('only'):
+        queryset = queryset.only(*sorted(field_hints['only'] | related_fields))
+    if field_hints.get('defer'):
+        queryset = queryset.defer(*sorted(field_hints['defer'] - related_fields))
+
+    return queryset
+
+
 def get_querysets_for_context_hints(context_hints_per_source):
     """
     Given a list of context hint dictionaries, return a dictionary
@@ -49,23 +321,51 @@ def get_querysets_for_context_hints(context_hints_per_source):
     """
     model_select_relateds = defaultdict(set)
     model_prefetch_relateds = defaultdict(set)
-    model_querysets = {}
+    model_field_hints = {}
     for context_hints in context_hints_per_source.values():
         for hints in context_hints.values():
+            if hints.get('resolver') or hints.get('polymorphic'):
+                continue
+
             model = get_model(hints['app_name'], hints['model_name'])
-            model_querysets[model] = model.objects
+            merge_field_hints(model_field_hints.setdefault(model, {}), hints, model not in model_select_relateds)
             model_select_relateds[model].update(hints.get('select_related', []))
-            model_prefetch_relateds[model].update(hints.get('prefetch_related', []))
+            model_prefetch_relateds[model].update(get_prefetch_hints(hints))
+
+    # Attach select and prefetch related parameters and field hints to the querysets if needed
+    return {
+        model: get_hinted_queryset(
+            model, model_select_relateds[model], model_prefetch_relateds[model], model_field_hints[model])
+        for model in model_field_hints
+    }
+
+
+def merge_cache_timeouts(timeout1, timeout2):
+    """
+    Merges two ``cache`` context hint options into the shorter timeout. ``True`` stands for the default
+    timeout of the object cache and gives way to any number of seconds, and ``None`` for not caching.
+    """
+    if timeout1 is None or timeout1 is True:
+        return timeout2
+    if timeout2 is True:
+        return timeout1
+    return min(timeout1, timeout2)
+
 
-    # Attach select and prefetch related parameters to the querysets if needed
-    for model, queryset in model_querysets.items():
-        if model_select_relateds[model]:
-            queryset = queryset.select_related(*model_select_relateds[model])
-        if model_prefetch_relateds[model]:
-            queryset = queryset.prefetch_related(*model_prefetch_relateds[model])
-        model_querysets[model] = queryset
+def get_cache_timeouts_for_context_hints(context_hints_per_source):
+    """
+    Returns a dictionary of the hinted models that are cached by the object cache to the number of seconds
+    that they are cached for, or ``None`` for the default timeout of the cache.
+    """
+    model_cache_timeouts = {}
+    for context_hints in context_hints_per_source.values():
+        for hints in context_hints.values():
+            if hints.get('cache') and not hints.get('resolver') and not hints.get('polymorphic'):
+                model = get_model(hints['app_name'], hints['model_name'])
+                model_cache_timeouts[model] = merge_cache_timeouts(
+                    model_cache_timeouts.get(model), hints['cache'])
 
-    return model_querysets
+    return {model: None if timeout is True else timeout for model, timeout in model_cache_timeouts.items()}
 
 
 def dict_find(d, which_key):
@@ -88,6 +388,163 @@ def dict_find(d, which_key):
                 yield result
 
 
+def find_keys(d, keys):
+    """
+    Finds the values of any of the keys in a nested dictionary with a single walk, the same way that
+    ``dict_find`` does for one key. Returns tuples of the dictionary in which a key was found along
+    with the key.
+    """
+    if isinstance(d, (list, tuple)):
+        for i in d:
+            for result in find_keys(i, keys):
+                yield result
+
+    elif isinstance(d, dict):
+        for k, v in d.items():
+            if k in keys:
+                yield d, k
+            for result in find_keys(v, keys):
+                yield result
+
+
+class ContextHintPlan(object):
+    """
+    The context hints of a source, compiled for finding the hinted values in the contexts of its events.
+    The models of the hints are resolved once, every hinted key is searched for in a single walk of a
+    context, and keys that declare their ``paths`` in the hints are looked up without walking.
+
+    A path is a dotted list of keys that ends with the hinted key, where ``*`` stands for every item of
+    a list, such as ``'items.*.owner'``. When a context does not have one of the declared paths, it does
+    not have the declared shape, so all of the hinted keys are searched for instead.
+    """
+    def __init__(self, context_hints):
+        self.models = {
+            key: get_hinted_model(hints) for key, hints in context_hints.items()
+        }
+        self.paths = {
+            key: [path.split('.') for path in sorted(hints['paths'])]
+            for key, hints in context_hints.items() if hints.get('paths')
+        }
+        self.walked_keys = set(self.models) - set(self.paths)
+
+    def follow_path(self, context, path):
+        """
+        Returns the dictionaries that hold the last key of the path, or ``None`` if the context does
+        not have the path.
+        """
+        nodes = [context]
+        for key in path[:-1]:
+            next_nodes = []
+            for node in nodes:
+                if key == '*' and isinstance(node, list):
+                    next_nodes.extend(node)
+                elif isinstance(node, dict) and key in node:
+                    next_nodes.append(node[key])
+                else:
+                    return None
+            nodes = next_nodes
+
+        if all(isinstance(node, dict) and path[-1] in node for node in nodes):
+            return nodes
+        return None
+
+    def find_slots(self, context):
+        """
+        Returns a tuple of the dictionary, the key and the model of every hinted value in the context.
+        """
+        slots = []
+        for key, paths in self.paths.items():
+            for path in paths:
+                nodes = self.follow_path(context, path)
+                if nodes is None:
+                    return [(d, k, self.models[k]) for d, k in find_keys(context, self.models)]
+                slots.extend((node, path[-1], self.models[key]) for node in nodes)
+
+        if self.walked_keys:
+            slots.extend((d, k, self.models[k]) for d, k in find_keys(context, self.walked_keys))
+
+        return slots
+
+
+def get_context_hint_plans(context_hints_per_source):
+    """
+    Compiles the context hints of each source into a ``ContextHintPlan``, keyed on the source id.
+    """
+    return {
+        source_id: ContextHintPlan(context_hints) for source_id, context_hints in context_hints_per_source.items()
+    }
+
+
+def compile_context_hints(context_renderers):
+    """
+    Returns a tuple of the context hints per source of the context renderers, the querysets of the hinted
+    models, the ``ContextHintPlan`` of each source and the cache timeouts of the hinted models. None of them
+    are modified when contexts are loaded, so they can be reused for as long as the context renderers do not
+    change.
+    """
+    context_hints_per_source = {
+        source_id: dict(context_hints)
+        for source_id, context_hints in get_context_hints_per_source(context_renderers).items()
+    }
+    return (
+        context_hints_per_source,
+        get_querysets_for_context_hints(context_hints_per_source),
+        get_context_hint_plans(context_hints_per_source),
+        get_cache_timeouts_for_context_hints(context_hints_per_source),
+    )
+
+
+def get_compiled_context_hints(context_renderers, registry=None):
+    """
+    Returns ``compile_context_hints(context_renderers)``, memoized by the renderer registry when it is enabled.
+    The registry is looked up unless it is given.
+    """
+    if registry is None:
+        registry = get_renderer_registry()
+    if registry is not None:
+        return registry.get_compiled_context_hints(context_renderers, compile_context_hints)
+    return compile_context_hints(context_renderers)
+
+
+def find_context_hint_slots(events, context_hint_plans):
+    """
+    Returns the slots of the hinted values in the context of each event, in the same order as the events.
+    The slots are found once and then used for both fetching and loading the hinted models.
+    """
+    return [
+        context_hint_plans[event.source_id].find_slots(event.context) if event.source_id in context_hint_plans else []
+        for event in events
+    ]
+
+
+def get_model_ids_in_slots(event_slots):
+    """
+    Returns a dictionary of models that point to sets of the ids in the slots that need to be fetched. The
+    batch resolvers of the slots point to the numbers and strings in their slots.
+    """
+    model_ids_to_fetch = defaultdict(set)
+
+    for slots in event_slots:
+        for d, key, model in slots:
+            value = d[key]
+            add_model_ids(model_ids_to_fetch, model, value if isinstance(value, list) else [value])
+
+    return model_ids_to_fetch
+
+
+def add_model_ids(model_ids_to_fetch, model, values):
+    """
+    Adds the ids among the values of a hinted key to the ids of the model that need to be fetched. The
+    references of a polymorphic hint are added to the ids of their own models.
+    """
+    if isinstance(model, PolymorphicHint):
+        for reference_model, model_id in model.get_model_ids(values):
+            model_ids_to_fetch[reference_model].add(model_id)
+    else:
+        value_types = model.value_types if isinstance(model, BatchResolver) else (complex, float, int)
+        model_ids_to_fetch[model].update(v for v in values if isinstance(v, value_types))
+
+
 def get_model_ids_to_fetch(events, context_hints_per_source):
     """
     Obtains the ids of all models that need to be fetched. Returns a dictionary of models that
@@ -98,22 +555,12 @@ def get_model_ids_to_fetch(events, context_hints_per_source):
         ...
     }
     """
-    number_types = (complex, float, int)
-    model_ids_to_fetch = defaultdict(set)
+    return get_model_ids_in_slots(
+        find_context_hint_slots(events, get_context_hint_plans(context_hints_per_source))
+    )
 
-    for event in events:
-        context_hints = context_hints_per_source.get(event.source, {})
-        for context_key, hints in context_hints.items():
-            for d, value in dict_find(event.context, context_key):
-                values = value if isinstance(value, list) else [value]
-                model_ids_to_fetch[get_model(hints['app_name'], hints['model_name'])].update(
-                    v for v in values if isinstance(v, number_types)
-                )
 
-    return model_ids_to_fetch
-
-
-def fetch_model_data(model_querysets, model_ids_to_fetch):
+def fetch_model_data(model_querysets, model_ids_to_fetch, model_cache_timeouts=None):
     """
     Given a dictionary of models to querysets and model IDs to models, fetch the IDs
     for every model and return the objects in the following structure.
@@ -125,28 +572,267 @@ def fetch_model_data(model_querysets, model_ids_to_fetch):
         },
         ...
     }
+
+    Models in ``model_cache_timeouts`` are looked up in the object cache first when it is enabled, and
+    only the objects that are not cached are fetched. The values of batch resolvers are resolved by calling
+    them once.
     """
-    return {
-        model: id_dict(model_querysets[model].filter(id__in=ids_to_fetch))
-        for model, ids_to_fetch in model_ids_to_fetch.items()
-    }
+    # Each model is fetched concurrently when the fetch executor is enabled
+    return fetch_concurrently(*get_model_fetches(model_querysets, model_ids_to_fetch, model_cache_timeouts))
+
+
+def get_model_fetches(model_querysets, model_ids_to_fetch, model_cache_timeouts=None):
+    """
+    Returns a dictionary of each model to a function that fetches its objects for ``fetch_model_data``, along
+    with the set of databases that the functions query.
+    """
+    object_cache = get_object_cache() if model_cache_timeouts else None
+    fetches = {}
+    databases = set()
+    for model, ids_to_fetch in model_ids_to_fetch.items():
+        if isinstance(model, BatchResolver):
+            fetches[model] = partial(model.resolve, ids_to_fetch)
+            continue
+
+        # The models of polymorphic hints may not have querysets of their own
+        queryset = model_querysets[model] if model in model_querysets else model._default_manager
+        databases.add(queryset.db)
+        if object_cache is not None and model in model_cache_timeouts:
+            fetches[model] = partial(
+                fetch_cached_objects, object_cache, queryset, ids_to_fetch, model_cache_timeouts[model])
+        else:
+            fetches[model] = partial(fetch_objects, queryset, ids_to_fetch)
+
+    return fetches, databases
+
+
+class LazyObjects(object):
+    """
+    The objects of a model that are loaded into contexts in lazy mode. Proxies of the objects are loaded
+    in place of the objects, and the first proxy that is used fetches every object of the model at once.
+    """
+    def __init__(self, fetch, ids):
+        self.fetch = fetch
+        self.ids = ids
+        self.objects = None
+        self.lock = threading.Lock()
+
+    def get(self, model_id):
+        """
+        Returns a proxy of the object with the id, or ``None`` if the id is not fetched.
+        """
+        return ContextProxy(self, model_id) if model_id in self.ids else None
+
+    def get_object(self, model_id):
+        with self.lock:
+            if self.objects is None:
+                self.objects = self.fetch()
+        return self.objects.get(model_id)
+
+
+class ContextProxy(LazyObject):
+    """
+    Stands in for an object in a context until it is used, such as by a template.
+    """
+    def __init__(self, lazy_objects, model_id):
+        self.__dict__['_lazy_objects'] = lazy_objects
+        self.__dict__['_model_id'] = model_id
+        super(ContextProxy, self).__init__()
+
+    def _setup(self):
+        self._wrapped = self._lazy_objects.get_object(self._model_id)
+
+    def __copy__(self):
+        return ContextProxy(self._lazy_objects, self._model_id)
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+
+def is_fetched_lazily(model, model_querysets):
+    """
+    Returns ``True`` if the model is fetched as model instances, which can be stood in for by proxies.
+    """
+    if isinstance(model, BatchResolver):
+        return False
+    return model not in model_querysets or issubclass(model_querysets[model].all()._iterable_class, ModelIterable)
+
+
+def get_lazy_model_data(model_querysets, model_ids_to_fetch, model_cache_timeouts=None):
+    """
+    Does the same as ``fetch_model_data``, except that model instances are returned as proxies that fetch
+    every object of their model the first time that any of them is used. The values of batch resolvers and
+    the rows of ``values`` and ``values_list`` hints are fetched right away, since templates use them as they
+    are and a proxy would not render the same.
+    """
+    fetches, databases = get_model_fetches(model_querysets, model_ids_to_fetch, model_cache_timeouts)
+    model_data = fetch_concurrently({
+        model: fetch for model, fetch in fetches.items() if not is_fetched_lazily(model, model_querysets)
+    }, databases)
+    model_data.update({
+        model: LazyObjects(fetch, model_ids_to_fetch[model])
+        for model, fetch in fetches.items() if model not in model_data
+    })
+    return model_data
+
+
+def get_fetch_chunk_size(connection, num_ids):
+    """
+    Returns the most ids that are fetched in one query. Postgres is sent the ids as a single array
+    parameter, so they are only chunked when ``ENTITY_EVENT_FETCH_CHUNK_SIZE`` is set. Other databases
+    are sent a parameter per id, so the ids are also chunked to fit in the query parameter limit.
+    """
+    chunk_size = getattr(settings, 'ENTITY_EVENT_FETCH_CHUNK_SIZE', None) or num_ids
+    if connection.vendor != 'postgresql':
+        chunk_size = min(chunk_size, connection.ops.bulk_batch_size(['id'], [None] * num_ids))
+    return max(chunk_size, 1)
+
+
+def get_id_dict(objects):
+    """
+    Returns a dictionary of the ids of the objects to the objects, which may also be dictionaries.
+    """
+    return {obj['id'] if isinstance(obj, dict) else obj.id: obj for obj in objects}
+
+
+def fetch_objects(queryset, ids_to_fetch):
+    """
+    Returns a dictionary of ids to the objects of the queryset with the ids, fetched in chunks of
+    ``get_fetch_chunk_size`` ids.
+    """
+    connection = connections[queryset.db]
+    ids_to_fetch = list(ids_to_fetch)
+    chunk_size = get_fetch_chunk_size(connection, len(ids_to_fetch))
+
+    objects = {}
+    for i in range(0, len(ids_to_fetch), chunk_size):
+        ids = ids_to_fetch[i:i + chunk_size]
+        if connection.vendor == 'postgresql':
+            objects.update(get_id_dict(queryset.filter(EqualsAny('id', ids))))
+        else:
+            objects.update(get_id_dict(queryset.filter(id__in=ids)))
+
+    return objects
+
+
+def get_queryset_shape(queryset):
+    """
+    Returns a hashable description of the objects that a queryset fetches: the columns and related models
+    of its query, whether its rows are loaded as model instances, dictionaries or tuples, and the objects
+    that it prefetches. Querysets of a model that are built from different hints have different shapes.
+    """
+    queryset = queryset.all()
+    return (
+        str(queryset.query),
+        queryset._iterable_class.__name__,
+        tuple(
+            (lookup.prefetch_to, None if lookup.queryset is None else str(lookup.queryset.query))
+            if isinstance(lookup, Prefetch) else lookup
+            for lookup in queryset._prefetch_related_lookups
+        ),
+    )
+
+
+def fetch_cached_objects(object_cache, queryset, ids_to_fetch, timeout):
+    """
+    Returns a dictionary of ids to objects, fetching the objects that are not in the object cache from
+    the queryset and caching them for ``timeout`` seconds. Objects are only shared with querysets of
+    the same shape.
+    """
+    shape = get_queryset_shape(queryset)
+    objects = object_cache.get_many(queryset.model, ids_to_fetch, shape)
+    missing_ids = [id for id in ids_to_fetch if id not in objects]
+    if missing_ids:
+        fetched_objects = fetch_objects(queryset, missing_ids)
+        object_cache.set_many(queryset.model, fetched_objects, timeout, shape)
+        objects.update(fetched_objects)
+
+    return objects
+
+
+def load_slot(value, model, model_data):
+    """
+    Returns the loaded objects of the value of a slot, with ``None`` for the ids whose objects were not fetched.
+    """
+    if isinstance(model, PolymorphicHint):
+        return model.load(value, model_data)
+
+    objects = model_data.get(model, {})
+    if isinstance(value, list):
+        return [objects.get(model_id) for model_id in value]
+    return objects.get(value)
+
+
+def overlay_loaded_slots(value, loaded_slots):
+    """
+    Returns the value with the loaded values of the slots of its dictionaries in place of their ids. The loaded
+    slots are keyed on the ``id`` of the dictionaries that hold them. Only the dictionaries and lists that lead
+    to a slot are copied, the rest of the value is shared and nothing is modified.
+    """
+    if isinstance(value, dict):
+        overlay = dict(loaded_slots.get(id(value), {}))
+        for k, v in value.items():
+            if k not in overlay:
+                overlaid = overlay_loaded_slots(v, loaded_slots)
+                if overlaid is not v:
+                    overlay[k] = overlaid
+        return {**value, **overlay} if overlay else value
+
+    if isinstance(value, (list, tuple)):
+        items = [overlay_loaded_slots(v, loaded_slots) for v in value]
+        if any(overlaid is not v for overlaid, v in zip(items, value)):
+            return tuple(items) if isinstance(value, tuple) else items
+
+    return value
+
+
+def get_loaded_context(context, slots, model_data):
+    """
+    Given the slots of a context and the fetched model data, returns the context with the loaded objects in place
+    of the ids in its slots. The context itself is not modified, so it can be shared by events and loaded again.
+    """
+    if not slots:
+        return context
+
+    loaded_slots = defaultdict(dict)
+    for d, key, model in slots:
+        loaded_slots[id(d)][key] = load_slot(d[key], model, model_data)
+
+    # Slots are usually at the top of the context, which then only needs a shallow copy
+    if len(loaded_slots) == 1 and id(context) in loaded_slots:
+        return {**context, **loaded_slots[id(context)]}
+    return overlay_loaded_slots(context, loaded_slots)
+
+
+def load_fetched_objects_into_events(events, event_slots, model_data):
+    """
+    Given the fetched model data and the slots of each event, load the context of each event with the loaded
+    objects in place of the ids in its slots. The loaded contexts are layered over the raw contexts of the events,
+    which are left as they are.
+    """
+    for event, slots in zip(events, event_slots):
+        event._loaded_context = get_loaded_context(event.context, slots, model_data)
 
 
 def load_fetched_objects_into_contexts(events, model_data, context_hints_per_source):
     """
     Given the fetched model data and the context hints for each source, go through each
-    event and populate the contexts with the loaded information.
+    event and populate the loaded contexts with the loaded information.
     """
-    for event in events:
-        context_hints = context_hints_per_source.get(event.source, {})
-        for context_key, hints in context_hints.items():
-            model = get_model(hints['app_name'], hints['model_name'])
-            for d, value in dict_find(event.context, context_key):
-                if isinstance(value, list):
-                    for i, model_id in enumerate(d[context_key]):
-                        d[context_key][i] = model_data[model].get(model_id)
-                else:
-                    d[context_key] = model_data[model].get(value)
+    load_fetched_objects_into_events(
+        events, find_context_hint_slots(events, get_context_hint_plans(context_hints_per_source)), model_data
+    )
+
+
+def get_source_group_id(event):
+    """
+    Returns the source group id of an event. Events that have not been saved, such as ones built with
+    ``Event(source=source)``, do not have their source group filled in yet, so it is read from their
+    source when the source is already loaded, and from the denormalized column otherwise.
+    """
+    if event._meta.get_field('source').is_cached(event):
+        return event.source.group_id
+    return event.source_group_id
 
 
 def load_renderers_into_events(events, mediums, context_renderers, default_rendering_style):
@@ -166,6 +852,7 @@ def load_renderers_into_events(events, mediums, context_renderers, default_rende
     }
 
     for e in events:
+        source_group_id = get_source_group_id(e)
         for m in mediums:
             # Try the following when loading a context renderer for a medium in an event.
             # 1. Try to look up the renderer based on the source group and medium rendering style
@@ -173,11 +860,11 @@ def load_renderers_into_events(events, mediums, context_renderers, default_rende
             # 3. If step 2 doesn't work, look up based on the source group and default rendering style
             # 4. if step 3 doesn't work, look up based on the source and default rendering style
             # If none of those steps work, this event will not be able to be rendered for the mediun
-            cr = source_group_style_to_renderer.get((e.source.group_id, m.rendering_style_id))
+            cr = source_group_style_to_renderer.get((source_group_id, m.rendering_style_id))
             if not cr:
                 cr = source_style_to_renderer.get((e.source_id, m.rendering_style_id))
             if not cr and default_rendering_style:
-                cr = source_group_style_to_renderer.get((e.source.group_id, default_rendering_style.id))
+                cr = source_group_style_to_renderer.get((source_group_id, default_rendering_style.id))
             if not cr and default_rendering_style:
                 cr = source_style_to_renderer.get((e.source_id, default_rendering_style.id))
 
@@ -185,36 +872,77 @@ def load_renderers_into_events(events, mediums, context_renderers, default_rende
                 e._context_renderers[m] = cr
 
 
-def get_default_rendering_style():
+def get_default_rendering_style(registry=None):
     default_rendering_style = getattr(settings, 'DEFAULT_ENTITY_EVENT_RENDERING_STYLE', None)
     if default_rendering_style:
-        default_rendering_style = get_model('entity_event', 'RenderingStyle').objects.get(name=default_rendering_style)
+        if registry is None:
+            registry = get_renderer_registry()
+        if registry is not None:
+            default_rendering_style = registry.get_rendering_style(default_rendering_style)
+        else:
+            default_rendering_style = get_model('entity_event', 'RenderingStyle').objects.get(
+                name=default_rendering_style)
 
     return default_rendering_style
 
 
+def get_context_renderers(source_ids, source_group_ids, rendering_style_ids, registry=None):
+    """
+    Returns the context renderers of any of the rendering styles that are for any of the sources or source
+    groups, from the renderer registry when it is enabled. The registry is looked up unless it is given.
+    """
+    if registry is None:
+        registry = get_renderer_registry()
+    if registry is not None:
+        return registry.get_context_renderers(source_ids, source_group_ids, rendering_style_ids)
+
+    return ContextRenderer.objects.filter(
+        Q(source_id__in=source_ids, rendering_style_id__in=rendering_style_ids) |
+        Q(source_group_id__in=source_group_ids, rendering_style_id__in=rendering_style_ids)).select_related(
+            'source', 'rendering_style').prefetch_related('source_group__source_set')
+
+
+def load_deferred_contexts(events):
+    """
+    Given a list of events, load the contexts of the events that were fetched with a deferred context,
+    or that reference a shared context, in bulk.
+    """
+    get_model('entity_event', 'Event')._meta.get_field('context').load_contexts(events)
+
+
 def load_contexts_and_renderers(events, mediums):
     """
-    Given a list of events and mediums, load the context model data into the contexts of the events.
+    Given a list of events and mediums, load the context model data into the loaded contexts of the events.
     """
-    sources = {event.source for event in events}
-    rendering_styles = {medium.rendering_style for medium in mediums if medium.rendering_style}
+    load_deferred_contexts(events)
+
+    # The source and group ids are read off the events so that the sources of saved events do not need to be loaded
+    source_ids = {event.source_id for event in events}
+    source_group_ids = {get_source_group_id(event) for event in events}
+    rendering_style_ids = {medium.rendering_style_id for medium in mediums if medium.rendering_style_id}
+
+    # Look up the registry once, since checking its version may go through a shared cache, and so that the
+    # whole render uses the same version of it
+    registry = get_renderer_registry()
 
     # Fetch the default rendering style and add it to the set of rendering styles
-    default_rendering_style = get_default_rendering_style()
+    default_rendering_style = get_default_rendering_style(registry)
     if default_rendering_style:
-        rendering_styles.add(default_rendering_style)
+        rendering_style_ids.add(default_rendering_style.id)
 
-    context_renderers = ContextRenderer.objects.filter(
-        Q(source__in=sources, rendering_style__in=rendering_styles) |
-        Q(source_group_id__in=[s.group_id for s in sources], rendering_style__in=rendering_styles)).select_related(
-            'source', 'rendering_style').prefetch_related('source_group__source_set')
+    context_renderers = get_context_renderers(source_ids, source_group_ids, rendering_style_ids, registry)
+
+    context_hints_per_source, model_querysets, context_hint_plans, model_cache_timeouts = get_compiled_context_hints(
+        context_renderers, registry)
 
-    context_hints_per_source = get_context_hints_per_source(context_renderers)
-    model_querysets = get_querysets_for_context_hints(context_hints_per_source)
-    model_ids_to_fetch = get_model_ids_to_fetch(events, context_hints_per_source)
-    model_data = fetch_model_data(model_querysets, model_ids_to_fetch)
-    load_fetched_objects_into_contexts(events, model_data, context_hints_per_source)
+    # Find the hinted values in each context once, for both fetching and loading the hinted models
+    event_slots = find_context_hint_slots(events, context_hint_plans)
+    model_ids_to_fetch = get_model_ids_in_slots(event_slots)
+    if getattr(settings, 'ENTITY_EVENT_LAZY_CONTEXTS', False):
+        model_data = get_lazy_model_data(model_querysets, model_ids_to_fetch, model_cache_timeouts)
+    else:
+        model_data = fetch_model_data(model_querysets, model_ids_to_fetch, model_cache_timeouts)
+    load_fetched_objects_into_events(events, event_slots, model_data)
     load_renderers_into_events(events, mediums, context_renderers, default_rendering_style)
 
     return events
@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 import json
 from django.db import models
 from django.forms import model_to_dict
@@ -121,8 +122,8 @@ class DefaultContextSerializer(object):
         :return:
         """
 
-        # Check if this is a dict
-        if not isinstance(value, dict):
+        # Check if this is a dict, or the layered context of a medium
+        if not isinstance(value, Mapping):
             return value
 
         # Loop over all the values and serialize them
@@ -0,0 +1,91 @@
+"""
+A process-wide thread pool for fetching the models hinted by context renderers concurrently, so that
+loading contexts takes about as long as the slowest query instead of all of them. See the
+``ENTITY_EVENT_CONCURRENT_FETCH`` setting.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+
+
+# The process-wide executor, started on first use when ENTITY_EVENT_CONCURRENT_FETCH is set
+_fetch_executor = None
+_fetch_executor_lock = threading.Lock()
+
+
+def get_fetch_executor():
+    """
+    Returns the fetch executor of the process, or ``None`` if the ``ENTITY_EVENT_CONCURRENT_FETCH``
+    setting is not configured. The setting is a dict with the ``max_workers`` of the executor. Each
+    worker holds its own database connection, so a process opens at most ``max_workers`` connections
+    for fetching.
+    """
+    global _fetch_executor
+
+    config = getattr(settings, 'ENTITY_EVENT_CONCURRENT_FETCH', None)
+    if not config:
+        return None
+
+    with _fetch_executor_lock:
+        if _fetch_executor is None:
+            _fetch_executor = ThreadPoolExecutor(
+                max_workers=config.get('max_workers', 4), thread_name_prefix='entity-event-fetch')
+
+    return _fetch_executor
+
+
+def close_unusable_connections():
+    """
+    Closes the connections of a worker that are unusable or older than ``CONN_MAX_AGE``. Unlike the
+    connections of requests, the connections of workers are kept open between fetches when
+    ``CONN_MAX_AGE`` is 0, since closing them would reconnect for every fetch.
+    """
+    for conn in connections.all():
+        if conn.connection is not None and conn.settings_dict['CONN_MAX_AGE'] == 0:
+            conn.close_at = None
+        conn.close_if_unusable_or_obsolete()
+
+
+def run_fetch(fetch):
+    """
+    Runs a fetch in a worker, closing the connections of the worker before and after it if they are
+    no longer usable.
+    """
+    close_unusable_connections()
+    try:
+        return fetch()
+    finally:
+        close_unusable_connections()
+
+
+def fetch_concurrently(fetches, databases):
+    """
+    Given a dictionary of keys to functions that query the databases, returns a dictionary of the keys to
+    the results of the functions. The functions are run by the fetch executor when it is enabled.
+
+    Workers use their own connections, which cannot see the uncommitted changes of a transaction, so the
+    functions are run one after another in the current thread while any of the databases is in an atomic
+    block.
+    """
+    executor = get_fetch_executor() if len(fetches) > 1 else None
+    if executor is None or any(connections[database].in_atomic_block for database in databases):
+        return {key: fetch() for key, fetch in fetches.items()}
+
+    futures = {key: executor.submit(run_fetch, fetch) for key, fetch in fetches.items()}
+    return {key: future.result() for key, future in futures.items()}
+
+
+@receiver(setting_changed)
+def reset_fetch_executor(setting=None, **kwargs):
+    """
+    Shuts down the executor of the process so that it is restarted on next use.
+    """
+    global _fetch_executor
+
+    if setting in (None, 'ENTITY_EVENT_CONCURRENT_FETCH') and _fetch_executor is not None:
+        _fetch_executor.shutdown(wait=False)
+        _fetch_executor = None
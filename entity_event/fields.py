@@ -0,0 +1,239 @@
+from copy import deepcopy
+from hashlib import md5
+from uuid import UUID
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import JSONField
+from django.db.models.lookups import PostgresOperatorLookup
+from django.db.models.query_utils import DeferredAttribute
+
+from entity_event.codecs import get_codec
+
+
+def hash_uuid(uuid):
+    """
+    Returns the 128 bit md5 digest of an event uuid as a ``UUID``. This matches
+    ``md5(uuid)::uuid`` in Postgres.
+    """
+    return UUID(bytes=md5(uuid.encode('utf-8')).digest())
+
+
+def hash_context(context):
+    """
+    Returns the 128 bit md5 digest of the canonical JSON of an event context as a ``UUID``.
+    Contexts that are equal once serialized have the same hash.
+    """
+    return hash_uuid(json.dumps(context, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':')))
+
+
+class UuidHashField(models.UUIDField):
+    """
+    A fixed width hash of the ``uuid`` field of the model. The hash is computed whenever the model
+    is saved or bulk created, so it never needs to be set directly.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs['editable'] = False
+        super(UuidHashField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(UuidHashField, self).deconstruct()
+        del kwargs['editable']
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = hash_uuid(model_instance.uuid)
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class SourceGroupField(models.ForeignKey):
+    """
+    The group of the ``source`` of the model, denormalized so that events can be filtered and
+    rendered by group without joining their source. The group is copied from the source whenever
+    the model is saved or bulk created, so it never needs to be set directly. When the source is
+    not cached on the instance, it is looked up.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs['editable'] = False
+        super(SourceGroupField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(SourceGroupField, self).deconstruct()
+        del kwargs['editable']
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = model_instance.source.group_id
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class JsonPathExists(PostgresOperatorLookup):
+    """
+    Matches JSON values for which a jsonpath returns any item, such as
+    ``context__path_exists='$.projects[*] ? (@ == 42)'``. The ``@?`` operator
+    is supported by ``jsonb_path_ops`` GIN indexes.
+    """
+    lookup_name = 'path_exists'
+    postgres_operator = '@?'
+    prepare_rhs = False
+
+    def process_rhs(self, compiler, connection):
+        rhs, rhs_params = super(JsonPathExists, self).process_rhs(compiler, connection)
+        return '{0}::jsonpath'.format(rhs), rhs_params
+
+
+class ContextDescriptor(DeferredAttribute):
+    """
+    Reads the context of the instance from its own column, from its encoded data, or from the shared
+    context it references. Deferred and shared contexts are loaded and encoded data is decoded on first
+    access.
+    """
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+
+        field = self.field
+        if field.attname not in instance.__dict__ or field.needs_shared_context(instance):
+            field.load_contexts([instance])
+
+        value = instance.__dict__[field.attname]
+        if value is None and field.get_codec_name(instance) is not None:
+            value = field.decode(instance)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class ContextField(JSONField):
+    """
+    A JSON field whose value may instead be stored encoded in the binary ``data_field`` by the codec
+    named in ``codec_field``, or in a row of a shared context model referenced by the ``shared_field``
+    foreign key. Shared rows are keyed by the ``hash_context`` of their ``context`` so that identical
+    contexts are only stored once.
+
+    Reading the field is transparent. Each instance gets its own copy of a shared context, and the
+    instance keeps referencing the shared row when it is saved with an unchanged context. New instances
+    that do not reference a shared context are encoded with the ``ENTITY_EVENT_CONTEXT_CODEC`` codec
+    when the setting is configured. The data and codec fields must be declared after this field.
+    """
+    descriptor_class = ContextDescriptor
+
+    def __init__(self, *args, shared_field=None, data_field=None, codec_field=None, **kwargs):
+        self.shared_field = shared_field
+        self.data_field = data_field
+        self.codec_field = codec_field
+        super(ContextField, self).__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super(ContextField, self).deconstruct()
+        kwargs['shared_field'] = self.shared_field
+        kwargs['data_field'] = self.data_field
+        kwargs['codec_field'] = self.codec_field
+        return name, path, args, kwargs
+
+    @property
+    def shared_hash_attname(self):
+        return '_{0}_shared_hash'.format(self.attname)
+
+    def get_related_attname(self, name):
+        return self.model._meta.get_field(name).attname if name else None
+
+    def get_shared_id(self, instance):
+        return getattr(instance, self.get_related_attname(self.shared_field)) if self.shared_field else None
+
+    def get_codec_name(self, instance):
+        return getattr(instance, self.get_related_attname(self.codec_field)) if self.codec_field else None
+
+    def needs_shared_context(self, instance):
+        """
+        Returns ``True`` if the instance references a shared context that has not been loaded.
+        """
+        return (
+            instance.__dict__.get(self.attname, False) is None and
+            self.get_codec_name(instance) is None and
+            self.get_shared_id(instance) is not None
+        )
+
+    def set_shared_context(self, instance, context_hash, context):
+        instance.__dict__[self.attname] = context
+        instance.__dict__[self.shared_hash_attname] = context_hash
+
+    def decode(self, instance):
+        """
+        Decodes the encoded data of the instance into its context.
+        """
+        data = getattr(instance, self.get_related_attname(self.data_field))
+        value = get_codec(self.get_codec_name(instance)).decode(data)
+        instance.__dict__[self.attname] = value
+        return value
+
+    def load_contexts(self, instances):
+        """
+        Loads the deferred and the shared contexts of the instances, with at most one query for each.
+        Encoded contexts are decoded when they are first accessed.
+        """
+        deferred_instances = [instance for instance in instances if self.attname not in instance.__dict__]
+        if deferred_instances:
+            attnames = [self.attname] + [
+                self.get_related_attname(name) for name in (self.data_field, self.codec_field) if name
+            ]
+            rows = self.model._base_manager.using(deferred_instances[0]._state.db).filter(
+                pk__in=[instance.pk for instance in deferred_instances]
+            ).values_list('pk', *attnames)
+            values = {row[0]: row[1:] for row in rows}
+            for instance in deferred_instances:
+                instance.__dict__.update(zip(attnames, values[instance.pk]))
+
+        shared_instances = [instance for instance in instances if self.needs_shared_context(instance)]
+        if shared_instances:
+            shared_model = self.model._meta.get_field(self.shared_field).related_model
+            shared_contexts = {
+                shared_id: (context_hash, context)
+                for shared_id, context_hash, context in shared_model._base_manager.using(
+                    shared_instances[0]._state.db
+                ).filter(
+                    id__in={self.get_shared_id(instance) for instance in shared_instances}
+                ).values_list('id', 'hash', 'context')
+            }
+
+            loaded_ids = set()
+            for instance in shared_instances:
+                shared_id = self.get_shared_id(instance)
+                context_hash, context = shared_contexts[shared_id]
+
+                # Each instance gets its own copy, since contexts may be modified before they are saved
+                if shared_id in loaded_ids:
+                    context = deepcopy(context)
+                loaded_ids.add(shared_id)
+
+                self.set_shared_context(instance, context_hash, context)
+
+    def pre_save(self, model_instance, add):
+        value = model_instance.__dict__.get(self.attname)
+        if value is None:
+            # The context is either null, or still encoded or shared and has not been loaded
+            return None
+
+        context_hash = model_instance.__dict__.get(self.shared_hash_attname)
+        if context_hash is not None and hash_context(value) == context_hash:
+            # The shared context is unchanged, so keep referencing it
+            return None
+
+        codec_name = self.get_codec_name(model_instance)
+        if codec_name is None and add and self.codec_field and self.get_shared_id(model_instance) is None:
+            codec_name = getattr(settings, 'ENTITY_EVENT_CONTEXT_CODEC', None)
+            setattr(model_instance, self.get_related_attname(self.codec_field), codec_name)
+
+        if codec_name is not None:
+            setattr(model_instance, self.get_related_attname(self.data_field), get_codec(codec_name).encode(value))
+            return None
+
+        return value
+
+
+ContextField.register_lookup(JsonPathExists)
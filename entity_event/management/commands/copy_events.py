@@ -0,0 +1,61 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from entity_event.models import Event, Source
+
+
+class Command(BaseCommand):
+    """
+    A management command for bulk loading events from a file of JSON lines with ``COPY``.
+
+    Each line is a JSON object with a ``context``, a ``uuid``, either a ``source`` name or a ``source_id``,
+    and optionally ``time``, ``time_expires`` (ISO 8601 strings) and ``actors`` (a list of entity ids).
+    """
+    help = 'Bulk load events and their actors from a file of JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The file of JSON lines to load, or - to read from stdin')
+        parser.add_argument(
+            '--batch-size', dest='batch_size', type=int, default=100000,
+            help='The number of events to stream to the database at a time')
+
+    def get_event_kwargs(self, lines):
+        """
+        Parses the event kwargs from the JSON lines, converting source names to ids and
+        time strings to datetimes.
+        """
+        source_ids = dict(Source.objects.values_list('name', 'id'))
+
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+
+            kwargs = json.loads(line)
+            if 'source' in kwargs:
+                try:
+                    kwargs['source_id'] = source_ids[kwargs.pop('source')]
+                except KeyError as e:
+                    raise CommandError('Unknown source {0} on line {1}'.format(e, line_number))
+
+            for time_key in ('time', 'time_expires'):
+                if kwargs.get(time_key):
+                    kwargs[time_key] = parse_datetime(kwargs[time_key])
+
+            yield kwargs
+
+    def handle(self, *args, **options):
+        """
+        Streams the events in the file to ``Event.objects.copy_events``
+        """
+        if options['path'] == '-':
+            num_created = Event.objects.copy_events(
+                self.get_event_kwargs(sys.stdin), batch_size=options['batch_size'])
+        else:
+            with open(options['path']) as f:
+                num_created = Event.objects.copy_events(
+                    self.get_event_kwargs(f), batch_size=options['batch_size'])
+
+        self.stdout.write('Created {0} events'.format(num_created))
@@ -0,0 +1,15 @@
+from entity_event.producers import defer_events
+
+
+class DeferredEventsMiddleware(object):
+    """
+    Defers every ``Event.objects.create_event`` call made while handling a request and creates
+    the events in one batch once the request's transaction commits. See
+    ``entity_event.producers.defer_events``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with defer_events():
+            return self.get_response(request)
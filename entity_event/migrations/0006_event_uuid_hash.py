@@ -0,0 +1,17 @@
+from django.db import migrations
+import entity_event.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entity_event', '0001_0005_squashed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='uuid_hash',
+            field=entity_event.fields.UuidHashField(null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Fills in the uuid hash of existing events. This matches ``entity_event.fields.hash_uuid``.
+    Large tables can be backfilled ahead of time in batches with the same statement, in which
+    case this only touches the remaining rows.
+    """
+
+    dependencies = [
+        ('entity_event', '0006_event_uuid_hash'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'UPDATE entity_event_event SET uuid_hash = md5(uuid)::uuid WHERE uuid_hash IS NULL',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
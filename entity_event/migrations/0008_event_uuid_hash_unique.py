@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import entity_event.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entity_event', '0007_backfill_event_uuid_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='uuid_hash',
+            field=entity_event.fields.UuidHashField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='uuid',
+            field=models.CharField(max_length=512),
+        ),
+    ]
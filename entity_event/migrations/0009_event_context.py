@@ -0,0 +1,32 @@
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import entity_event.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entity_event', '0008_event_uuid_hash_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventContext',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.UUIDField(unique=True)),
+                ('context', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='context',
+            field=entity_event.fields.ContextField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, shared_field='shared_context'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='shared_context',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='entity_event.eventcontext'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.core.serializers.json
+from django.db import migrations, models
+import entity_event.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entity_event', '0009_event_context'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='context_codec',
+            field=models.CharField(max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='context_data',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='context',
+            field=entity_event.fields.ContextField(codec_field='context_codec', data_field='context_data', encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, shared_field='shared_context'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entity_event', '0010_event_context_codec'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='actor_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        # Backfill the actor ids of existing events before indexing them
+        migrations.RunSQL(
+            'UPDATE entity_event_event SET actor_ids = actors.actor_ids FROM ('
+            '    SELECT event_id, array_agg(DISTINCT entity_id ORDER BY entity_id) AS actor_ids'
+            '    FROM entity_event_eventactor GROUP BY event_id'
+            ') actors WHERE actors.event_id = entity_event_event.id',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['actor_ids'], name='entity_event_actor_ids_gin'),
+        ),
+    ]
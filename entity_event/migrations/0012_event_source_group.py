@@ -0,0 +1,18 @@
+from django.db import migrations
+import django.db.models.deletion
+import entity_event.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entity_event', '0011_event_actor_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='source_group',
+            field=entity_event.fields.SourceGroupField(null=True, on_delete=django.db.models.deletion.CASCADE, to='entity_event.sourcegroup'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Fills in the source group of existing events from their sources. Large tables can be
+    backfilled ahead of time in batches with the same statement, in which case this only
+    touches the remaining rows.
+    """
+
+    dependencies = [
+        ('entity_event', '0012_event_source_group'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'UPDATE entity_event_event SET source_group_id = entity_event_source.group_id '
+            'FROM entity_event_source '
+            'WHERE entity_event_source.id = entity_event_event.source_id '
+            'AND entity_event_event.source_group_id IS NULL',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
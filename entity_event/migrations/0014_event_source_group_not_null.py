@@ -0,0 +1,18 @@
+from django.db import migrations
+import django.db.models.deletion
+import entity_event.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entity_event', '0013_backfill_event_source_group'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='source_group',
+            field=entity_event.fields.SourceGroupField(on_delete=django.db.models.deletion.CASCADE, to='entity_event.sourcegroup'),
+        ),
+    ]
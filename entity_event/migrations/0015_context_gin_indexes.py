@@ -0,0 +1,34 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.core.serializers.json
+from django.db import migrations
+import entity_event.fields
+
+
+class Migration(migrations.Migration):
+    """
+    Adds the GIN indexes that the context filters use. They are built concurrently so that events
+    can still be created while the indexes of a large table are built, which cannot happen in a
+    transaction.
+    """
+    atomic = False
+
+    dependencies = [
+        ('entity_event', '0014_event_source_group_not_null'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventcontext',
+            name='context',
+            field=entity_event.fields.ContextField(codec_field=None, data_field=None, encoder=django.core.serializers.json.DjangoJSONEncoder, shared_field=None),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['context'], name='entity_event_context_gin', opclasses=['jsonb_path_ops']),
+        ),
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='eventcontext',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['context'], name='entity_event_eventcontext_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
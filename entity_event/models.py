@@ -1,19 +1,89 @@
-from collections import defaultdict
+from collections import ChainMap, defaultdict
 from datetime import datetime
 from operator import or_
 from functools import reduce
 
 from cached_property import cached_property
+import django
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db.models import JSONField
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models, transaction
-from django.db.models import Q
+from django.db import connections, models, transaction
+from django.db.models import Exists, OuterRef, Q, Subquery, sql
 from django.db.models.query import QuerySet
 from django.template.loader import render_to_string
 from django.template import Context, Template
 from entity.models import Entity, EntityRelationship
 
 from entity_event.context_serializer import DefaultContextSerializer
+from entity_event.fields import ContextField, hash_context, hash_uuid, SourceGroupField, UuidHashField
+from entity_event.uuid_filter import get_uuid_filter
+
+
+def uses_actor_ids():
+    """
+    Returns ``True`` if events are filtered by their ``actor_ids`` array rather than by joining
+    ``EventActor``. See the ``ENTITY_EVENT_ACTOR_IDS`` setting.
+    """
+    return getattr(settings, 'ENTITY_EVENT_ACTOR_IDS', False)
+
+
+def get_actor_ids(actors):
+    """
+    Returns the unique ids of a list of entities or entity ids, in order.
+    """
+    return list(dict.fromkeys(actor.id if hasattr(actor, 'id') else actor for actor in actors or []))
+
+
+def get_context_filter(lookup, value):
+    """
+    Returns a filter on a lookup of the event context, such as ``contains`` or ``path_exists``. Shared
+    contexts are matched as well when ``ENTITY_EVENT_SHARED_CONTEXTS`` is enabled, but contexts that
+    are encoded by a codec cannot be filtered on.
+    """
+    lookups = {'context__{0}'.format(lookup): value}
+    context_filter = Q(**lookups)
+    if getattr(settings, 'ENTITY_EVENT_SHARED_CONTEXTS', False):
+        context_filter |= Q(shared_context__in=EventContext.objects.filter(**lookups))
+    return context_filter
+
+
+class ArraySubquery(Subquery):
+    """
+    A subquery of a single column collected into a Postgres array.
+    """
+    template = 'ARRAY(%(subquery)s)'
+
+    def __init__(self, queryset, **kwargs):
+        kwargs.setdefault('output_field', ArrayField(models.IntegerField()))
+        super(ArraySubquery, self).__init__(queryset, **kwargs)
+
+
+class MediumManager(models.Manager):
+    """
+    A custom Manager for Mediums.
+    """
+    def render_many(self, events, mediums):
+        """
+        Renders a list of events for each of the mediums. The contexts of the events are loaded once for
+        the context renderers of all of the mediums, instead of once per medium as when calling
+        :py:meth:`Medium.render <entity_event.models.Medium.render>` for each of them.
+
+        :type events: list
+        :param events: A list or queryset of Event models.
+
+        :type mediums: list
+        :param mediums: The mediums to render the events for.
+
+        :rtype: dict
+        :returns: A dictionary keyed on the mediums, each pointing to a dictionary of rendered text and html
+            tuples keyed on the provided events.
+        """
+        from entity_event import context_loader
+        events = context_loader.load_contexts_and_renderers(events, mediums)
+        return {medium: {e: e.render(medium) for e in events} for medium in mediums}
 
 
 class Medium(models.Model):
@@ -84,6 +154,8 @@ class Medium(models.Model):
     # These values are passed in as additional context to whatever event is being rendered.
     additional_context = JSONField(null=True, default=None, encoder=DjangoJSONEncoder)
 
+    objects = MediumManager()
+
     def __str__(self):
         """
         Readable representation of ``Medium`` objects.
@@ -160,6 +232,24 @@ class Medium(models.Model):
             marks all the returned events as having been seen by this
             medium.
 
+        :type defer_context: Boolean (optional)
+        :param defer_context: Do not fetch the ``context`` of the
+            events. The contexts are loaded in one query when the
+            events are rendered, or per event when accessed directly.
+
+        :type source_group: SourceGroup (optional)
+        :param source_group: Only include events from sources in the
+            given group.
+
+        :type context_contains: dict (optional)
+        :param context_contains: Only include events whose context
+            contains the given JSON, such as ``{'project': 42}``.
+
+        :type context_path: str (optional)
+        :param context_path: Only include events whose context has a
+            match for the given jsonpath, such as
+            ``'$.projects[*] ? (@ == 42)'``.
+
         :rtype: EventQuerySet
         :returns: A queryset of events.
         """
@@ -169,10 +259,7 @@ class Medium(models.Model):
         )
 
         subscription_q_objects = [
-            Q(
-                eventactor__entity__in=self.followed_by(sub.subscribed_entities()),
-                source_id=sub.source_id
-            )
+            self.get_actor_filter(self.followed_by(sub.subscribed_entities())) & Q(source_id=sub.source_id)
             for sub in subscriptions if sub.only_following
         ]
         subscription_q_objects.append(
@@ -262,6 +349,24 @@ class Medium(models.Model):
             marks all the returned events as having been seen by this
             medium.
 
+        :type defer_context: Boolean (optional)
+        :param defer_context: Do not fetch the ``context`` of the
+            events. The contexts are loaded in one query when the
+            events are rendered, or per event when accessed directly.
+
+        :type source_group: SourceGroup (optional)
+        :param source_group: Only include events from sources in the
+            given group.
+
+        :type context_contains: dict (optional)
+        :param context_contains: Only include events whose context
+            contains the given JSON, such as ``{'project': 42}``.
+
+        :type context_path: str (optional)
+        :param context_path: Only include events whose context has a
+            match for the given jsonpath, such as
+            ``'$.projects[*] ? (@ == 42)'``.
+
         :rtype: EventQuerySet
         :returns: A queryset of events.
         """
@@ -271,10 +376,7 @@ class Medium(models.Model):
         subscriptions = self.subset_subscriptions(subscriptions, entity)
 
         subscription_q_objects = [
-            Q(
-                eventactor__entity__in=self.followed_by(entity),
-                source_id=sub.source_id
-            )
+            self.get_actor_filter(self.followed_by(entity)) & Q(source_id=sub.source_id)
             for sub in subscriptions if sub.only_following
         ]
         subscription_q_objects.append(
@@ -342,6 +444,21 @@ class Medium(models.Model):
         :param mark_seen: Create a side effect in the database that marks all the returned events as having been seen
             by this medium.
 
+        :type defer_context: Boolean (optional)
+        :param defer_context: Do not fetch the ``context`` of the events. The contexts are loaded in one query when the
+            events are rendered, or per event when accessed directly.
+
+        :type source_group: SourceGroup (optional)
+        :param source_group: Only include events from sources in the given group.
+
+        :type context_contains: dict (optional)
+        :param context_contains: Only include events whose context contains the given JSON, such as
+            ``{'project': 42}``.
+
+        :type context_path: str (optional)
+        :param context_path: Only include events whose context has a match for the given jsonpath, such as
+            ``'$.projects[*] ? (@ == 42)'``.
+
         :rtype: List of tuples
         :returns: A list of tuples in the form ``(event, targets)`` where ``targets`` is a list of entities.
         """
@@ -368,9 +485,11 @@ class Medium(models.Model):
                 subscribed = subscribed_cache[sub.id]
 
                 if sub.only_following:
-                    potential_targets = self.followers_of(
-                        event.eventactor_set.values_list('entity__id', flat=True)
-                    )
+                    if uses_actor_ids():
+                        actor_ids = event.actor_ids
+                    else:
+                        actor_ids = event.eventactor_set.values_list('entity__id', flat=True)
+                    potential_targets = self.followers_of(actor_ids)
                     subscription_targets = list(Entity.objects.filter(
                         Q(id__in=subscribed),
                         Q(id__in=potential_targets)
@@ -390,6 +509,18 @@ class Medium(models.Model):
         # Return the event pairs
         return event_pairs
 
+    def get_actor_filter(self, entities):
+        """
+        Returns a filter for events with any of the given entities as an actor. The entities can
+        be a queryset of entities, or a list of entities or entity ids.
+        """
+        if not uses_actor_ids():
+            return Q(eventactor__entity__in=entities)
+
+        if isinstance(entities, QuerySet):
+            return Q(actor_ids__overlap=ArraySubquery(entities.values('id')))
+        return Q(actor_ids__overlap=get_actor_ids(entities))
+
     def subset_subscriptions(self, subscriptions, entity=None):
         """
         Return only subscriptions the given entity is a part of.
@@ -448,7 +579,10 @@ class Medium(models.Model):
         unsubscriptions = self.unsubscriptions
         return [t for t in targets if t.id not in unsubscriptions[source_id]]
 
-    def get_filtered_events_queryset(self, start_time, end_time, seen, include_expired, actor, queryset=None):
+    def get_filtered_events_queryset(
+        self, start_time, end_time, seen, include_expired, actor, queryset=None, source_group=None,
+        context_contains=None, context_path=None
+    ):
         """
         Return a filtered events queryset to relevant events for the passed arguments.
 
@@ -501,9 +635,22 @@ class Medium(models.Model):
             filters.append(Q(event_seen_medium__id__isnull=True))
 
         # Filter by actor
-        if actor is not None:
+        if actor is not None and uses_actor_ids():
+            filters.append(Q(actor_ids__contains=get_actor_ids([actor])))
+        elif actor is not None:
             filters.append(Q(eventactor__entity=actor))
 
+        # Filter by source group
+        if source_group is not None:
+            filters.append(Q(source_group=source_group))
+
+        # Filter by context
+        filters.extend(
+            get_context_filter(lookup, value)
+            for lookup, value in [('contains', context_contains), ('path_exists', context_path)]
+            if value is not None
+        )
+
         # Return the filtered queryset
         return queryset.filter(*filters)
 
@@ -514,7 +661,11 @@ class Medium(models.Model):
         seen=None,
         mark_seen=False,
         include_expired=False,
-        actor=None
+        actor=None,
+        defer_context=False,
+        source_group=None,
+        context_contains=None,
+        context_path=None
     ):
         """
         Retrieves events, filters by event level filters, and marks them as
@@ -531,7 +682,10 @@ class Medium(models.Model):
             seen=seen,
             include_expired=include_expired,
             actor=actor,
-            queryset=Event.objects
+            queryset=Event.objects,
+            source_group=source_group,
+            context_contains=context_contains,
+            context_path=context_path
         )
 
         if seen is False and mark_seen:
@@ -542,6 +696,9 @@ class Medium(models.Model):
             events = Event.objects.filter(id__in=list(events.values_list('id', flat=True)))
             events.mark_seen(self)
 
+        if defer_context:
+            events = events.defer_context()
+
         # Return the events
         return events
 
@@ -910,10 +1067,42 @@ class EventQuerySet(QuerySet):
         """
         return self.select_related(
             'source'
-        ).prefetch_related(
-            'source__group'
         )
 
+    def refresh_actor_ids(self):
+        """
+        Recomputes the denormalized ``actor_ids`` of the events from their ``EventActor``
+        objects, such as after actors have been deleted.
+        """
+        return self.update(actor_ids=ArraySubquery(
+            EventActor.objects.filter(event=OuterRef('pk')).order_by('entity_id').values('entity_id').distinct()
+        ))
+
+    def refresh_source_groups(self):
+        """
+        Recomputes the denormalized ``source_group`` of the events from their sources, such as after
+        sources have been moved to another group with ``QuerySet.update``.
+        """
+        return self.update(source_group_id=Subquery(
+            Source.objects.filter(id=OuterRef('source_id')).values('group_id')
+        ))
+
+    def defer_context(self):
+        """
+        Defers loading the ``context`` of the events, which can be large,
+        for when only their other fields are needed. Rendering the events
+        loads the deferred contexts in one query.
+        """
+        return self.defer('context', 'context_data')
+
+    def with_uuids(self, uuids):
+        """
+        Filters the events to the given uuids. The lookup goes through the
+        indexed ``uuid_hash`` field, so this should be used in place of
+        filtering on ``uuid`` directly.
+        """
+        return self.filter(uuid_hash__in=[hash_uuid(uuid) for uuid in uuids])
+
     def mark_seen(self, medium):
         """
         Creates EventSeen objects for the provided medium for every event
@@ -930,7 +1119,7 @@ class EventQuerySet(QuerySet):
 
     def load_contexts_and_renderers(self, medium):
         """
-        Loads context data into the event ``context`` variable. This method
+        Loads context data into the event ``loaded_context`` variable. This method
         destroys the queryset and returns a list of events.
         """
         from entity_event import context_loader
@@ -954,6 +1143,20 @@ class EventManager(models.Manager):
         """
         return self.get_queryset().cache_related()
 
+    def defer_context(self):
+        """
+        Return a queryset of events without their ``context`` loaded.
+        """
+        return self.get_queryset().defer_context()
+
+    def with_uuids(self, uuids):
+        """
+        Filters the events to the given uuids. The lookup goes through the
+        indexed ``uuid_hash`` field, so this should be used in place of
+        filtering on ``uuid`` directly.
+        """
+        return self.get_queryset().with_uuids(uuids)
+
     def mark_seen(self, medium):
         """
         Creates EventSeen objects for the provided medium for every event
@@ -968,12 +1171,11 @@ class EventManager(models.Manager):
 
     def load_contexts_and_renderers(self, medium):
         """
-        Loads context data into the event ``context`` variable. This method
+        Loads context data into the event ``loaded_context`` variable. This method
         destroys the queryset and returns a list of events.
         """
         return self.get_queryset().load_contexts_and_renderers(medium)
 
-    @transaction.atomic
     def create_event(self, actors=None, ignore_duplicates=False, **kwargs):
         """
         Create events with actors.
@@ -1026,12 +1228,20 @@ class EventManager(models.Manager):
         :rtype: Event
         :returns: The created event. Alternatively if a duplicate
             event already exists and ``ignore_duplicates`` is
-            ``True``, it will return ``None``.
+            ``True``, it will return ``None``. Inside of
+            ``entity_event.producers.defer_events``, the event is
+            created later in a batch and ``None`` is returned.
         """
+        from entity_event import producers
+
         kwargs['actors'] = actors
         kwargs['ignore_duplicates'] = ignore_duplicates
 
-        events = self.create_events([kwargs])
+        if producers.defer_event(kwargs):
+            return None
+
+        with transaction.atomic():
+            events = self.create_events([kwargs])
 
         if events:
             return events[0]
@@ -1056,22 +1266,22 @@ class EventManager(models.Manager):
             for kwargs in kwargs_list
         }
 
-        # Check for uuids
-        uuid_set = set(Event.objects.filter(uuid__in=uuid_map.keys()).values_list('uuid', flat=True))
+        # Only events that ignore duplicates need to know whether their uuid already exists
+        lookup_uuids = [uuid for uuid, event_dict in uuid_map.items() if event_dict['ignore_duplicates']]
 
-        # Set a flag for whether each uuid exists
-        for uuid, event_dict in uuid_map.items():
-            event_dict['exists'] = uuid in uuid_set
+        uuid_filter = get_uuid_filter()
+        possible_uuids = uuid_filter.get_possible(lookup_uuids) if uuid_filter is not None else lookup_uuids
 
-        # Build list of events to bulk create
-        events_to_create = []
-        for uuid, event_dict in uuid_map.items():
-            # If the event doesn't already exist or the event does exist but we are allowing duplicates
-            if not event_dict['exists'] or not event_dict['ignore_duplicates']:
-                events_to_create.append(Event(**event_dict['event_kwargs']))
+        # The filter only knows the uuids of this process, so a uuid it ruled out may still have been
+        # created elsewhere. Those events are inserted while skipping conflicting uuids instead.
+        new_uuids = set(lookup_uuids) - set(possible_uuids)
+        created_events, uuid_set = self._bulk_create_new_events(uuid_map, possible_uuids, new_uuids)
 
-        # Bulk create the events
-        created_events = Event.objects.bulk_create(events_to_create)
+        if uuid_filter is not None:
+            uuid_filter.stats.num_false_positives += len(set(possible_uuids) - uuid_set)
+            uuid_filter.stats.num_conflicts += len(new_uuids) - sum(
+                created_event.uuid in new_uuids for created_event in created_events)
+            uuid_filter.add(uuid_map)
 
         # Build list of EventActor objects to bulk create
         event_actors_to_create = []
@@ -1086,6 +1296,142 @@ class EventManager(models.Manager):
 
         return created_events
 
+    def _bulk_create_new_events(self, uuid_map, lookup_uuids, new_uuids=()):
+        """
+        Bulk creates the events of the uuid map, skipping the ones that ignore duplicates and
+        whose uuid exists. Only the given uuids are looked up, while the events of the new uuids
+        are inserted without a lookup, skipping any that conflict. Returns the created events and
+        the set of uuids that were found to exist.
+        """
+        uuid_set = set(Event.objects.with_uuids(lookup_uuids).values_list('uuid', flat=True)) if lookup_uuids else set()
+
+        # Build list of events to bulk create
+        events_to_create = []
+        new_events_to_create = []
+        for uuid, event_dict in uuid_map.items():
+            # If the event doesn't already exist or the event does exist but we are allowing duplicates
+            if uuid not in uuid_set or not event_dict['ignore_duplicates']:
+                event = Event(actor_ids=get_actor_ids(event_dict['actors']), **event_dict['event_kwargs'])
+                (new_events_to_create if uuid in new_uuids else events_to_create).append(event)
+
+        # The source of each event is read for its group, so fetch the ones only given by id together
+        all_events = events_to_create + new_events_to_create
+        sources = Source.objects.in_bulk({
+            event.source_id for event in all_events if not Event.source.is_cached(event)
+        })
+        for event in all_events:
+            if event.source_id in sources:
+                event.source = sources[event.source_id]
+
+        if getattr(settings, 'ENTITY_EVENT_SHARED_CONTEXTS', False):
+            EventContext.objects.share_contexts(all_events)
+
+        created_events = Event.objects.bulk_create(events_to_create)
+        return created_events + self._bulk_create_ignoring_conflicts(new_events_to_create), uuid_set
+
+    def _bulk_create_ignoring_conflicts(self, events):
+        """
+        Inserts the events in one ``INSERT ... ON CONFLICT DO NOTHING`` statement and returns the
+        ones that were created. Unlike ``bulk_create(ignore_conflicts=True)``, the ids of the created
+        events are read back with ``RETURNING``, so no savepoint or lookup is needed to find them.
+        """
+        if not events:
+            return []
+
+        if django.VERSION < (4, 1):  # pragma: no cover
+            query = sql.InsertQuery(Event, ignore_conflicts=True)
+        else:
+            from django.db.models.constants import OnConflict
+            query = sql.InsertQuery(Event, on_conflict=OnConflict.IGNORE)
+
+        opts = Event._meta
+        query.insert_values([field for field in opts.concrete_fields if field is not opts.pk], events)
+        compiler = query.get_compiler(using=self.db)
+        compiler.returning_fields = [opts.pk, opts.get_field('uuid')]
+
+        created_ids = {}
+        with connections[self.db].cursor() as cursor:
+            for insert_sql, params in compiler.as_sql():
+                cursor.execute(insert_sql, params)
+                created_ids.update((uuid, pk) for pk, uuid in cursor.fetchall())
+
+        created_events = []
+        for event in events:
+            if event.uuid in created_ids:
+                event.pk = created_ids[event.uuid]
+                event._state.adding = False
+                event._state.db = self.db
+                created_events.append(event)
+
+        return created_events
+
+    def copy_events(self, kwargs_list, batch_size=None):
+        """
+        Create events in bulk with Postgres ``COPY``. This is meant for loading very large numbers
+        of events, such as in migrations or replays, where ``create_events`` is too slow. Each element
+        in the kwargs list should be a dict with the same set of arguments you would normally pass to
+        create_event. Events with a uuid that already exists are always skipped, and each batch is
+        committed in its own transaction.
+        :param kwargs_list: iterable of kwargs dicts
+        :param batch_size: the number of events to stream to the database at a time
+        :return: the number of events created
+        """
+        from entity_event import bulk_copy
+        return bulk_copy.copy_events(kwargs_list, batch_size=batch_size)
+
+
+class EventContextManager(models.Manager):
+    """
+    A custom Manager for EventContexts.
+    """
+    def share_contexts(self, events):
+        """
+        Points unsaved events at shared contexts instead of storing their own, creating
+        a shared context for each distinct context that does not have one yet.
+        """
+        context_hashes = [hash_context(event.context) for event in events]
+        contexts = dict(zip(context_hashes, (event.context for event in events)))
+        if not contexts:
+            return
+
+        self.bulk_create([
+            EventContext(hash=context_hash, context=context) for context_hash, context in contexts.items()
+        ], ignore_conflicts=True)
+        context_ids = dict(self.filter(hash__in=contexts.keys()).values_list('hash', 'id'))
+
+        context_field = Event._meta.get_field('context')
+        for event, context_hash in zip(events, context_hashes):
+            event.shared_context_id = context_ids[context_hash]
+            context_field.set_shared_context(event, context_hash, event.context)
+
+    def delete_unreferenced(self):
+        """
+        Deletes the shared contexts that no event references any more, such as after their events
+        expired and were deleted, and returns the number of contexts deleted. The contexts are deleted
+        with one statement rather than loaded to check for protected events. A context that is being
+        shared by events created in a concurrent transaction can still be deleted, which fails that
+        transaction on commit, so this is best run periodically while few events are being created.
+        """
+        unreferenced = self.filter(~Exists(Event.objects.filter(shared_context=OuterRef('pk'))))
+        return unreferenced._raw_delete(unreferenced.db)
+
+
+class EventContext(models.Model):
+    """
+    A context that is stored once and shared by every event created with it, when
+    the ``ENTITY_EVENT_SHARED_CONTEXTS`` setting is enabled. Shared contexts are
+    looked up by the ``hash_context`` of their ``context``.
+    """
+    hash = models.UUIDField(unique=True)
+    context = ContextField(encoder=DjangoJSONEncoder)
+
+    objects = EventContextManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['context'], opclasses=['jsonb_path_ops'], name='entity_event_eventcontext_gin'),
+        ]
+
 
 class Event(models.Model):
     """
@@ -1113,13 +1459,39 @@ class Event(models.Model):
     is further documented in the ``Source`` documentation.
     """
     source = models.ForeignKey('entity_event.Source', on_delete=models.CASCADE)
-    context = JSONField(encoder=DjangoJSONEncoder)
+    context = ContextField(
+        encoder=DjangoJSONEncoder, null=True,
+        shared_field='shared_context', data_field='context_data', codec_field='context_codec'
+    )
     time = models.DateTimeField(auto_now_add=True, db_index=True)
     time_expires = models.DateTimeField(default=datetime.max, db_index=True)
-    uuid = models.CharField(max_length=512, unique=True)
+    uuid = models.CharField(max_length=512)
+
+    # A fixed width hash of the uuid that carries the unique index, since uuids can be long
+    # composite strings that would otherwise make for a very large index
+    uuid_hash = UuidHashField(unique=True)
+
+    # The shared context read in place of the context column when that column is null
+    shared_context = models.ForeignKey('entity_event.EventContext', null=True, on_delete=models.PROTECT)
+
+    # The context encoded by a codec, read in place of the context column when the codec is set
+    context_data = models.BinaryField(null=True)
+    context_codec = models.CharField(max_length=32, null=True)
+
+    # The ids of the event's actors, denormalized from EventActor for filtering on a single table
+    actor_ids = ArrayField(models.IntegerField(), default=list, blank=True)
+
+    # The group of the source, denormalized for filtering and looking up renderers without the source
+    source_group = SourceGroupField('entity_event.SourceGroup', on_delete=models.CASCADE)
 
     objects = EventManager()
 
+    class Meta:
+        indexes = [
+            GinIndex(fields=['actor_ids'], name='entity_event_actor_ids_gin'),
+            GinIndex(fields=['context'], opclasses=['jsonb_path_ops'], name='entity_event_context_gin'),
+        ]
+
     def __init__(self, *args, **kwargs):
         super(Event, self).__init__(*args, **kwargs)
         # A dictionary that is populated with renderers after the contexts have been
@@ -1127,17 +1499,27 @@ class Event(models.Model):
         # called with a medium and optional observer
         self._context_renderers = {}
 
-    def _merge_medium_additional_context_with_context(self, medium):
+        # The context with its hinted objects loaded, which is layered over the raw context when the
+        # contexts are loaded so that the raw context is never modified
+        self._loaded_context = None
+
+    @property
+    def loaded_context(self):
         """
-        If the medium has additional context properties, merge those together here in the
-        main context before rendering.
+        The context of the event with the objects of its context hints in place of their ids once the contexts
+        of the events have been loaded, and otherwise the context itself. Unlike ``context``, which is left as
+        it is, the loaded context should not be modified, since it shares the parts of the context that hold
+        no hinted objects.
         """
-        if medium.additional_context:
-            context = self.context.copy()
-            context.update(medium.additional_context)
-            return context
-        else:
-            return self.context
+        return self.context if self._loaded_context is None else self._loaded_context
+
+    def _get_medium_context(self, medium):
+        """
+        Layers the additional context properties of the medium over the loaded context before
+        rendering, without copying it. Templates write variables, such as those of ``as`` tags, into
+        the top layer, so a new one is added on top to keep the medium and the context unchanged.
+        """
+        return ChainMap({}, medium.additional_context or {}, self.loaded_context)
 
     def render(self, medium, observing_entity=None):
         """
@@ -1149,7 +1531,7 @@ class Event(models.Model):
         if medium not in self._context_renderers:
             raise RuntimeError('Context and renderer for medium {0} has not or cannot been fetched'.format(medium))
         else:
-            context = self._merge_medium_additional_context_with_context(medium)
+            context = self._get_medium_context(medium)
             return self._context_renderers[medium].render_context_to_text_html_templates(context)
 
     def get_serialized_context(self, medium):
@@ -1161,7 +1543,7 @@ class Event(models.Model):
         if medium not in self._context_renderers:
             raise RuntimeError('Context and renderer for medium {0} has not or cannot been fetched'.format(medium))
         else:
-            context = self._merge_medium_additional_context_with_context(medium)
+            context = self._get_medium_context(medium)
             return self._context_renderers[medium].get_serialized_context(context)
 
     def __str__(self):
@@ -1328,7 +1710,20 @@ class ContextRenderer(models.Model):
         }
 
     In the above case, `User` objects with the PKs 1, 3, 5, and 10 will be fetched and loaded into
-    the event context whenever rendering is performed.
+    the `loaded_context` of the event whenever rendering is performed, leaving its `context` as it is.
+    If the keys are always in the same place, a `paths` option such as `['my_context.user']` can
+    declare where they are, so that the context does not need to be searched for them.
+
+    The `only` and `defer` options limit the fields of the hinted models that are loaded, and the `values`
+    and `values_list` options load them as dictionaries or named tuples of the listed fields instead.
+    A `prefetch_related` lookup may also be a dictionary that declares a filtered, ordered or limited
+    `Prefetch`, see `PrefetchHint` in `entity_event.context_loader`.
+
+    Values that are not model ids can be loaded by naming a `resolver` function in place of the `app_name`
+    and `model_name`, which is called once with every value of the hinted key across the rendered events
+    and returns a dictionary of the values to what replaces them.
+    References to objects of different models, such as `{"type": "project", "id": 5}`, can be loaded
+    with a `polymorphic` hint whose `types` map the type of each reference to the label of its model.
     """
     name = models.CharField(max_length=256, unique=True)
 
@@ -1371,7 +1766,8 @@ class ContextRenderer(models.Model):
         template_path = getattr(self, '{0}_template_path'.format('text' if is_text else 'html'))
         template = getattr(self, '{0}_template'.format('text' if is_text else 'html'))
         if template_path:
-            return render_to_string(template_path, context)
+            # Template backends only take dictionaries, so the layers of a medium's context are flattened
+            return render_to_string(template_path, context if isinstance(context, dict) else dict(context))
         elif template:
             return Template(template).render(Context(context))
         else:
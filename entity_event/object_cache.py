@@ -0,0 +1,197 @@
+"""
+A process-local cache of the models that are loaded into contexts by context hints, used by the context
+loader to avoid fetching the same objects on every render. See the ``ENTITY_EVENT_OBJECT_CACHE`` setting.
+"""
+from collections import OrderedDict
+from time import monotonic
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+# The process-wide cache, built on first use when ENTITY_EVENT_OBJECT_CACHE is set
+_object_cache = None
+_object_cache_lock = threading.Lock()
+
+
+class ObjectCacheStats(object):
+    """
+    Counters describing how well an ``ObjectCache`` is working.
+    """
+    def __init__(self):
+        # The number of objects looked up, and how many of those were cached
+        self.num_lookups = 0
+        self.num_hits = 0
+
+        # The number of objects dropped because the cache was full, and because they were saved or deleted
+        self.num_evictions = 0
+        self.num_invalidations = 0
+
+    @property
+    def num_misses(self):
+        return self.num_lookups - self.num_hits
+
+    @property
+    def hit_rate(self):
+        """
+        The fraction of looked up objects that were cached.
+        """
+        return self.num_hits / self.num_lookups if self.num_lookups else 0
+
+
+class ObjectCache(object):
+    """
+    A least recently used cache of model instances keyed on their model and primary key. Objects expire
+    after a timeout, and are dropped when their model is saved or deleted. Objects that are changed in
+    bulk are not dropped, so the timeout bounds how stale a cached object can be.
+
+    The objects of a model can be fetched in different shapes, such as with fewer fields, as dictionaries
+    or with other related objects, so objects are also keyed on a hashable ``shape`` that describes how
+    they were fetched. Objects are only shared by lookups of the same shape.
+
+    :type max_size: int
+    :param max_size: The most objects that are cached. The least recently used objects are evicted to
+        make room for new ones.
+
+    :type timeout: float
+    :param timeout: The default number of seconds that an object is cached for.
+    """
+    def __init__(self, max_size=10000, timeout=60):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.stats = ObjectCacheStats()
+
+        self._objects = OrderedDict()
+        self._model_shapes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get_model_key(self, model):
+        # Proxy models share the objects of their concrete model
+        return model._meta.concrete_model._meta.label_lower
+
+    def holds(self, model):
+        """
+        Returns ``True`` if objects of the model have been cached.
+        """
+        return self.get_model_key(model) in self._model_shapes
+
+    def get_many(self, model, ids, shape=None):
+        """
+        Returns a dictionary of the primary keys that are cached in the shape to their objects.
+        """
+        model_key = self.get_model_key(model)
+        now = monotonic()
+        objects = {}
+        with self._lock:
+            for pk in ids:
+                key = (model_key, shape, pk)
+                cached = self._objects.get(key)
+                if cached is None:
+                    continue
+                if cached[0] <= now:
+                    del self._objects[key]
+                    continue
+                self._objects.move_to_end(key)
+                objects[pk] = cached[1]
+
+            self.stats.num_lookups += len(ids)
+            self.stats.num_hits += len(objects)
+
+        return objects
+
+    def set_many(self, model, objects, timeout=None, shape=None):
+        """
+        Caches a dictionary of primary keys to objects of the model in the shape for ``timeout`` seconds, or for
+        the default timeout of the cache.
+        """
+        model_key = self.get_model_key(model)
+        expires = monotonic() + (self.timeout if timeout is None else timeout)
+        with self._lock:
+            is_new_model = model_key not in self._model_shapes
+            self._model_shapes.setdefault(model_key, set()).add(shape)
+            for pk, obj in objects.items():
+                key = (model_key, shape, pk)
+                self._objects[key] = (expires, obj)
+                self._objects.move_to_end(key)
+
+            while len(self._objects) > self.max_size:
+                self._objects.popitem(last=False)
+                self.stats.num_evictions += 1
+
+        if is_new_model:
+            connect_invalidation(model)
+
+    def delete(self, model, pk):
+        """
+        Drops an object from the cache in all of its shapes.
+        """
+        model_key = self.get_model_key(model)
+        with self._lock:
+            for shape in self._model_shapes.get(model_key, ()):
+                if self._objects.pop((model_key, shape, pk), None) is not None:
+                    self.stats.num_invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+
+
+def invalidate_cached_object(sender, instance, using, **kwargs):
+    """
+    Drops a saved or deleted object from the object cache. The object is dropped again once the transaction
+    commits, in case it was cached by another thread in the meantime.
+    """
+    object_cache = get_object_cache()
+    if object_cache is not None and object_cache.holds(sender):
+        # Deleting an object clears its primary key by the time the transaction commits
+        pk = instance.pk
+        object_cache.delete(sender, pk)
+        transaction.on_commit(lambda: object_cache.delete(sender, pk), using=using)
+
+
+def connect_invalidation(model):
+    """
+    Connects ``invalidate_cached_object`` to the saves and deletes of the model once its objects are cached.
+    Only cached models are connected, since a ``post_delete`` receiver stops Django from deleting the objects
+    of a model in bulk without loading them.
+    """
+    for sender in {model, model._meta.concrete_model}:
+        post_save.connect(invalidate_cached_object, sender=sender, dispatch_uid='entity_event_invalidate_cached_object')
+        post_delete.connect(
+            invalidate_cached_object, sender=sender, dispatch_uid='entity_event_invalidate_cached_object')
+
+
+def get_object_cache():
+    """
+    Returns the object cache of the process, or ``None`` if the ``ENTITY_EVENT_OBJECT_CACHE`` setting
+    is not configured. The setting is a dict of ``ObjectCache`` arguments.
+    """
+    global _object_cache
+
+    config = getattr(settings, 'ENTITY_EVENT_OBJECT_CACHE', None)
+    if not config:
+        return None
+
+    with _object_cache_lock:
+        if _object_cache is None:
+            _object_cache = ObjectCache(**config)
+
+    return _object_cache
+
+
+@receiver(setting_changed)
+def reset_object_cache(setting=None, **kwargs):
+    """
+    Discards the cache of the process so that it is rebuilt on next use.
+    """
+    global _object_cache
+
+    if setting in (None, 'ENTITY_EVENT_OBJECT_CACHE'):
+        _object_cache = None
@@ -0,0 +1,276 @@
+"""
+A module for producing events without paying for a database round trip per event.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from queue import Empty, Queue
+from time import monotonic
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections, connection, transaction
+
+from entity_event.models import Event
+
+
+logger = logging.getLogger(__name__)
+
+# The list collecting deferred create_event kwargs while inside of defer_events
+_deferred_events = ContextVar('entity_event_deferred_events', default=None)
+
+
+class EventBufferStats(object):
+    """
+    Counters and recent samples describing the flushes of an ``EventBuffer``.
+    """
+    def __init__(self, max_samples=1000):
+        self.num_flushes = 0
+        self.num_events = 0
+        self.num_failed_flushes = 0
+        self.num_failed_events = 0
+
+        # The sizes and latencies (in seconds) of the most recent successful flushes
+        self.batch_sizes = deque(maxlen=max_samples)
+        self.flush_latencies = deque(maxlen=max_samples)
+
+    def record_flush(self, batch_size, latency):
+        self.num_flushes += 1
+        self.num_events += batch_size
+        self.batch_sizes.append(batch_size)
+        self.flush_latencies.append(latency)
+
+    def record_failure(self, batch_size):
+        self.num_failed_flushes += 1
+        self.num_failed_events += batch_size
+
+    @property
+    def mean_batch_size(self):
+        return sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0
+
+    @property
+    def mean_flush_latency(self):
+        return sum(self.flush_latencies) / len(self.flush_latencies) if self.flush_latencies else 0
+
+    @property
+    def max_flush_latency(self):
+        return max(self.flush_latencies) if self.flush_latencies else 0
+
+
+class EventBuffer(object):
+    """
+    Collects events in memory and creates them in batches with ``Event.objects.create_events``
+    from a background thread. This is useful in request handlers that would otherwise create
+    events one at a time, each in its own transaction with a uuid lookup and two inserts.
+
+    .. code-block:: python
+
+        event_buffer = EventBuffer(max_batch_size=500, max_latency=1.0)
+        event_buffer.start()
+
+        # Takes the same arguments as Event.objects.create_event
+        event_buffer.create_event(source=source, context={'user': user.id}, uuid=uuid, actors=[entity])
+
+    A batch is flushed when it reaches ``max_batch_size`` events or when its oldest event has been
+    buffered for ``max_latency`` seconds. At most ``max_buffered_events`` events are held in memory.
+    When the buffer is full, ``create_event`` blocks until there is room, or raises ``queue.Full``
+    after ``put_timeout`` seconds if a timeout is given. Once started, the buffer is flushed when the
+    process shuts down, and ``stop`` may be called to flush it earlier.
+
+    Since events are created in the background, ``create_event`` does not return the event, and
+    events are created outside of the transaction of the caller. A batch that fails to be created is
+    logged and counted in ``stats``. Note that ``create_events`` keeps only the last event of a batch
+    for any given uuid, so buffered events should be given unique uuids.
+
+    :type on_flush: callable (optional)
+    :param on_flush: Called with the batch size and flush latency in seconds after every successful
+        flush, for reporting the numbers to a metrics system.
+    """
+    def __init__(
+        self, max_batch_size=500, max_latency=1.0, max_buffered_events=10000, put_timeout=None, on_flush=None
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.put_timeout = put_timeout
+        self.on_flush = on_flush
+        self.stats = EventBufferStats()
+
+        self._queue = Queue(maxsize=max_buffered_events)
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        """
+        The approximate number of buffered events.
+        """
+        return self._queue.qsize()
+
+    def create_event(self, actors=None, ignore_duplicates=False, **kwargs):
+        """
+        Buffers an event. Takes the same arguments as ``Event.objects.create_event``.
+        """
+        kwargs['actors'] = actors
+        kwargs['ignore_duplicates'] = ignore_duplicates
+        self._queue.put(kwargs, timeout=self.put_timeout)
+
+    def get_batch(self, block):
+        """
+        Takes the next batch of events off of the queue. When blocking, this waits up to ``max_latency``
+        seconds for the first event and then until ``max_latency`` seconds after the first event for the
+        rest of the batch.
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.max_batch_size:
+            try:
+                if block:
+                    timeout = self.max_latency if deadline is None else deadline - monotonic()
+                    if deadline is not None and timeout <= 0:
+                        break
+                    kwargs = self._queue.get(timeout=timeout)
+                else:
+                    kwargs = self._queue.get_nowait()
+            except Empty:
+                break
+
+            if deadline is None:
+                deadline = monotonic() + self.max_latency
+            batch.append(kwargs)
+
+        return batch
+
+    def flush_batch(self, batch):
+        """
+        Creates the events in the batch, recording the outcome in ``stats``.
+        """
+        if not batch:
+            return
+
+        with self._flush_lock:
+            start = monotonic()
+            try:
+                with transaction.atomic():
+                    Event.objects.create_events(batch)
+            except Exception:
+                logger.exception('Failed to create a batch of %s buffered events', len(batch))
+                self.stats.record_failure(len(batch))
+            else:
+                latency = monotonic() - start
+                self.stats.record_flush(len(batch), latency)
+                if self.on_flush:
+                    self.on_flush(len(batch), latency)
+
+    def flush(self):
+        """
+        Creates all buffered events in the calling thread.
+        """
+        batch = self.get_batch(block=False)
+        while batch:
+            self.flush_batch(batch)
+            batch = self.get_batch(block=False)
+
+    def run(self):
+        """
+        The loop of the background thread. The thread has its own database connection, which,
+        like that of a request, is closed around each batch once it is unusable or older than
+        ``CONN_MAX_AGE``, and is closed when the thread stops.
+        """
+        try:
+            while not self._stopping.is_set():
+                batch = self.get_batch(block=True)
+                close_old_connections()
+                try:
+                    self.flush_batch(batch)
+                finally:
+                    close_old_connections()
+            self.flush()
+        finally:
+            connection.close()
+
+    def start(self):
+        """
+        Starts flushing events from a background thread and registers the buffer to be flushed
+        when the process exits.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run, name='entity-event-buffer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread and flushes any remaining events.
+        """
+        if self._thread:
+            self._stopping.set()
+            self._thread.join(timeout)
+            self._thread = None
+            atexit.unregister(self.stop)
+
+        self.flush()
+
+
+def defer_event(kwargs):
+    """
+    Collects the ``create_event`` kwargs if events are currently being deferred. The event
+    is only collected once the transaction it was created in commits, so events created in a
+    transaction or savepoint that rolls back are dropped.
+
+    :rtype: bool
+    :returns: ``True`` if the event was deferred.
+    """
+    deferred = _deferred_events.get()
+    if deferred is None:
+        return False
+
+    transaction.on_commit(partial(deferred.append, kwargs))
+    return True
+
+
+def create_deferred_events(deferred):
+    """
+    Creates the deferred events in one ``create_events`` batch, along with their actors.
+    """
+    if deferred:
+        with transaction.atomic():
+            Event.objects.create_events(deferred)
+
+
+@contextmanager
+def defer_events():
+    """
+    A context manager (or decorator) that collects every ``Event.objects.create_event`` call
+    made inside of it and creates the events with a single ``create_events`` batch once the
+    current transaction commits, or right away if there is no transaction.
+
+    .. code-block:: python
+
+        with defer_events():
+            for user in users:
+                Event.objects.create_event(source=source, context={'user': user.id}, uuid=...)
+
+    While deferring, ``create_event`` returns ``None``. Events are only created for the transactions
+    that commit, so if the block raises inside of a transaction that rolls back, nothing is created,
+    while the events of writes that were already committed are still created. Nesting is allowed,
+    in which case the outermost block creates the events. Note that ``create_events`` keeps only
+    the last event of a batch for any given uuid, so deferred events should be given unique uuids.
+    """
+    if _deferred_events.get() is not None:
+        yield
+        return
+
+    deferred = []
+    token = _deferred_events.set(deferred)
+    try:
+        yield
+    finally:
+        _deferred_events.reset(token)
+
+        # Rolling back discards this callback along with the events collected in the transaction
+        transaction.on_commit(partial(create_deferred_events, deferred))
@@ -0,0 +1,144 @@
+"""
+A process-wide registry of context renderers and rendering styles, used by the context loader in place
+of querying them on every render. See the ``ENTITY_EVENT_RENDERER_REGISTRY`` setting.
+"""
+from collections import defaultdict
+from uuid import uuid4
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+# The key of the registry version in the shared cache. Changing the version makes every process reload
+# its registry on next use.
+VERSION_CACHE_KEY = 'entity_event_renderer_registry_version'
+
+# The most sets of context renderers whose compiled context hints are memoized by a registry
+MAX_COMPILED_CONTEXT_HINTS = 1024
+
+# The process-wide registry, loaded on first use when ENTITY_EVENT_RENDERER_REGISTRY is set
+_registry = None
+_registry_lock = threading.Lock()
+
+
+class RendererRegistry(object):
+    """
+    Every ``ContextRenderer``, along with the sources of its source group, and every ``RenderingStyle``,
+    loaded from the database at once. The renderers are never modified after they are loaded, so the
+    registry can be shared by threads.
+
+    :type version: str
+    :param version: The version of the registry in the shared cache, if one is configured.
+    """
+    def __init__(self, version=None):
+        from entity_event.models import ContextRenderer, RenderingStyle
+
+        self.version = version
+        self.rendering_styles = {rs.name: rs for rs in RenderingStyle.objects.all()}
+
+        self.context_renderers = defaultdict(list)
+        for cr in ContextRenderer.objects.select_related(
+            'source', 'rendering_style'
+        ).prefetch_related(
+            'source_group__source_set'
+        ):
+            self.context_renderers[cr.rendering_style_id].append(cr)
+
+        # The compiled context hints of each set of context renderers, keyed on their ids. A change to any
+        # renderer replaces the registry, so the memoized hints never outlive the renderers they came from.
+        self.compiled_context_hints = {}
+
+    def get_rendering_style(self, name):
+        """
+        Returns the rendering style with the given name, or raises ``RenderingStyle.DoesNotExist``.
+        """
+        from entity_event.models import RenderingStyle
+
+        try:
+            return self.rendering_styles[name]
+        except KeyError:
+            raise RenderingStyle.DoesNotExist('No rendering style is named {0}'.format(name))
+
+    def get_context_renderers(self, source_ids, source_group_ids, rendering_style_ids):
+        """
+        Returns the context renderers of any of the rendering styles that are for any of the sources or
+        source groups.
+        """
+        return [
+            cr
+            for rendering_style_id in rendering_style_ids
+            for cr in self.context_renderers.get(rendering_style_id, [])
+            if cr.source_id in source_ids or cr.source_group_id in source_group_ids
+        ]
+
+    def get_compiled_context_hints(self, context_renderers, compile_context_hints):
+        """
+        Returns ``compile_context_hints(context_renderers)``, memoized on the ids of the context renderers.
+        """
+        key = frozenset(cr.id for cr in context_renderers)
+        compiled = self.compiled_context_hints.get(key)
+        if compiled is None:
+            if len(self.compiled_context_hints) >= MAX_COMPILED_CONTEXT_HINTS:
+                self.compiled_context_hints.clear()
+            compiled = self.compiled_context_hints[key] = compile_context_hints(context_renderers)
+        return compiled
+
+
+def get_shared_cache():
+    config = getattr(settings, 'ENTITY_EVENT_RENDERER_REGISTRY', None)
+    cache_alias = config.get('cache') if isinstance(config, dict) else None
+    return caches[cache_alias] if cache_alias else None
+
+
+def get_renderer_registry():
+    """
+    Returns the renderer registry of the process, or ``None`` if the ``ENTITY_EVENT_RENDERER_REGISTRY``
+    setting is not enabled. The setting is either ``True`` or a dict with the name of a shared ``cache``
+    that holds the version of the registry, so that changes made by one process reload the registries
+    of the others.
+    """
+    global _registry
+
+    if not getattr(settings, 'ENTITY_EVENT_RENDERER_REGISTRY', None):
+        return None
+
+    version = None
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        version = shared_cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            shared_cache.add(VERSION_CACHE_KEY, uuid4().hex, None)
+            version = shared_cache.get(VERSION_CACHE_KEY)
+
+    with _registry_lock:
+        if _registry is None or _registry.version != version:
+            _registry = RendererRegistry(version)
+        return _registry
+
+
+def invalidate_renderer_registry():
+    """
+    Discards the registry of the process, and of every other process when a shared cache is configured,
+    so that it is reloaded on next use. This is called whenever a context renderer, rendering style,
+    source or source group is saved or deleted, but must be called after changing them in bulk.
+    """
+    global _registry
+
+    _registry = None
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.set(VERSION_CACHE_KEY, uuid4().hex, None)
+
+
+@receiver(setting_changed)
+def reset_renderer_registry(setting=None, **kwargs):
+    """
+    Discards the registry of the process so that it is reloaded on next use.
+    """
+    global _registry
+
+    if setting in (None, 'ENTITY_EVENT_RENDERER_REGISTRY'):
+        _registry = None
@@ -0,0 +1,46 @@
+"""
+Signal handlers that are connected when the app is ready.
+"""
+from django.db import transaction
+from django.db.models import F, Func, Value
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from entity_event.models import ContextRenderer, Event, EventActor, RenderingStyle, Source, SourceGroup
+from entity_event.renderer_registry import invalidate_renderer_registry
+
+
+@receiver(post_save, sender=EventActor, dispatch_uid='entity_event_add_actor_id')
+def add_actor_id(sender, instance, **kwargs):
+    """
+    Adds the actor of a saved ``EventActor`` to the ``actor_ids`` of its event. Actors that are
+    bulk created or deleted are not tracked, see ``EventQuerySet.refresh_actor_ids``.
+    """
+    Event.objects.filter(id=instance.event_id).exclude(actor_ids__contains=[instance.entity_id]).update(
+        actor_ids=Func(F('actor_ids'), Value(instance.entity_id), function='array_append')
+    )
+
+
+@receiver(post_save, sender=Source, dispatch_uid='entity_event_update_source_group')
+def update_source_group(sender, instance, created, **kwargs):
+    """
+    Moves the events of a saved ``Source`` to its group when the group has changed. Sources
+    that are updated in bulk are not tracked, see ``EventQuerySet.refresh_source_groups``.
+    """
+    if not created:
+        Event.objects.filter(source=instance).exclude(source_group_id=instance.group_id).update(
+            source_group_id=instance.group_id
+        )
+
+
+@receiver([post_save, post_delete], sender=ContextRenderer, dispatch_uid='entity_event_invalidate_renderer_registry')
+@receiver([post_save, post_delete], sender=RenderingStyle, dispatch_uid='entity_event_invalidate_renderer_registry')
+@receiver([post_save, post_delete], sender=Source, dispatch_uid='entity_event_invalidate_renderer_registry')
+@receiver([post_save, post_delete], sender=SourceGroup, dispatch_uid='entity_event_invalidate_renderer_registry')
+def renderers_changed(sender, **kwargs):
+    """
+    Invalidates the renderer registry when a model that it holds changes. The registry is invalidated
+    again once the transaction commits, in case it was reloaded by another thread in the meantime.
+    """
+    invalidate_renderer_registry()
+    transaction.on_commit(invalidate_renderer_registry)
@@ -1,8 +1,10 @@
-from django.test import TestCase
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
 from django_dynamic_fixture import G
 
 from entity_event.admin import AdminEventForm
-from entity_event.models import Source, Event
+from entity_event.models import AdminEvent, Source, Event, EventSeen
 
 
 class AdminEventFormSaveTest(TestCase):
@@ -32,3 +34,30 @@ class AdminEventFormSaveM2MTest(TestCase):
         form = AdminEventForm(self.form_data)
         form.save_m2m()
         self.assertEqual(Event.objects.count(), 0)
+
+
+class DeferredFieldsChangeListTest(TestCase):
+    def setUp(self):
+        super(DeferredFieldsChangeListTest, self).setUp()
+        self.request = RequestFactory().get('/')
+        self.request.user = G(User, is_superuser=True, is_staff=True)
+        self.event = G(Event, context={'large': 'context'})
+        G(EventSeen, event=self.event)
+
+    def test_event_context_deferred(self):
+        changelist = admin.site._registry[Event].get_changelist_instance(self.request)
+        changelist.get_results(self.request)
+
+        self.assertEqual(changelist.result_list[0].get_deferred_fields(), {'context', 'context_data'})
+
+    def test_admin_event_context_deferred(self):
+        changelist = admin.site._registry[AdminEvent].get_changelist_instance(self.request)
+        changelist.get_results(self.request)
+
+        self.assertEqual(changelist.result_list[0].get_deferred_fields(), {'context', 'context_data'})
+
+    def test_event_seen_event_context_deferred(self):
+        changelist = admin.site._registry[EventSeen].get_changelist_instance(self.request)
+        changelist.get_results(self.request)
+
+        self.assertEqual(changelist.result_list[0].event.get_deferred_fields(), {'context', 'context_data'})
@@ -0,0 +1,182 @@
+from datetime import datetime
+from io import StringIO
+from tempfile import NamedTemporaryFile
+import json
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django_dynamic_fixture import G
+from entity.models import Entity
+from unittest.mock import patch
+
+from entity_event import bulk_copy
+from entity_event.fields import hash_uuid
+from entity_event.models import Event, EventActor, Source
+
+
+class EscapeCopyValueTest(TestCase):
+    def test_none(self):
+        self.assertEqual(bulk_copy.escape_copy_value(None), '\\N')
+
+    def test_special_characters(self):
+        self.assertEqual(bulk_copy.escape_copy_value('a\tb\nc\rd\\e'), 'a\\tb\\nc\\rd\\\\e')
+
+    def test_number(self):
+        self.assertEqual(bulk_copy.escape_copy_value(10), '10')
+
+
+class FormatCopyArrayTest(TestCase):
+    def test_empty(self):
+        self.assertEqual(bulk_copy.format_copy_array([]), '{}')
+
+    def test_values(self):
+        self.assertEqual(bulk_copy.format_copy_array([1, 2, 3]), '{1,2,3}')
+
+
+class CopyStreamTest(TestCase):
+    def test_read_sizes(self):
+        stream = bulk_copy.CopyStream(['ab\n', 'cd\n', 'ef\n'])
+        self.assertEqual(stream.read(4), b'ab\nc')
+        self.assertEqual(stream.read(), b'd\nef\n')
+        self.assertEqual(stream.read(4), b'')
+
+
+class CopyEventsTest(TestCase):
+    def setUp(self):
+        super(CopyEventsTest, self).setUp()
+        self.source = G(Source)
+        self.actor1 = G(Entity)
+        self.actor2 = G(Entity)
+
+    def test_none(self):
+        self.assertEqual(Event.objects.copy_events([]), 0)
+        self.assertFalse(Event.objects.exists())
+
+    def test_events_and_actors(self):
+        num_created = Event.objects.copy_events([{
+            'context': {'one': 'one'},
+            'source': self.source,
+            'actors': [self.actor1, self.actor2.id],
+            'uuid': '1',
+        }, {
+            'context': {'two': 'tab\tnew\nline\\'},
+            'source_id': self.source.id,
+            'uuid': '2',
+            'time_expires': datetime(2030, 1, 1),
+        }])
+
+        self.assertEqual(num_created, 2)
+        e1 = Event.objects.get(uuid='1')
+        e2 = Event.objects.get(uuid='2')
+        self.assertEqual(e1.context, {'one': 'one'})
+        self.assertEqual(e1.source, self.source)
+        self.assertEqual(e1.source_group_id, self.source.group_id)
+        self.assertEqual(e1.time_expires, datetime.max)
+        self.assertEqual(
+            set(EventActor.objects.filter(event=e1).values_list('entity_id', flat=True)),
+            {self.actor1.id, self.actor2.id})
+        self.assertEqual(e1.uuid_hash, hash_uuid('1'))
+        self.assertEqual(set(e1.actor_ids), {self.actor1.id, self.actor2.id})
+        self.assertEqual(e2.actor_ids, [])
+        self.assertEqual(e2.context, {'two': 'tab\tnew\nline\\'})
+        self.assertEqual(e2.time_expires, datetime(2030, 1, 1))
+        self.assertFalse(EventActor.objects.filter(event=e2).exists())
+
+    def test_skips_existing_and_repeated_uuids(self):
+        Event.objects.create_event(context={'hi': 'hi'}, source=self.source, uuid='1')
+
+        num_created = Event.objects.copy_events([{
+            'context': {'one': 'one'},
+            'source': self.source,
+            'actors': [self.actor1],
+            'uuid': '1',
+        }, {
+            'context': {'first': 'first'},
+            'source': self.source,
+            'actors': [self.actor1],
+            'uuid': '2',
+        }, {
+            'context': {'last': 'last'},
+            'source': self.source,
+            'actors': [self.actor2],
+            'uuid': '2',
+        }])
+
+        self.assertEqual(num_created, 1)
+        self.assertEqual(Event.objects.get(uuid='1').context, {'hi': 'hi'})
+        self.assertFalse(EventActor.objects.filter(event__uuid='1').exists())
+        self.assertEqual(Event.objects.get(uuid='2').context, {'last': 'last'})
+        self.assertEqual(
+            list(EventActor.objects.filter(event__uuid='2').values_list('entity_id', flat=True)), [self.actor2.id])
+
+    def test_batches_from_generator(self):
+        kwargs_list = (
+            {'context': {'i': i}, 'source': self.source, 'actors': [self.actor1], 'uuid': str(i)}
+            for i in range(5)
+        )
+
+        self.assertEqual(Event.objects.copy_events(kwargs_list, batch_size=2), 5)
+        self.assertEqual(Event.objects.count(), 5)
+        self.assertEqual(EventActor.objects.count(), 5)
+
+    def test_repeated_uuids_across_batches_keep_first(self):
+        num_created = Event.objects.copy_events([
+            {'context': {'first': 'first'}, 'source': self.source, 'uuid': '1'},
+            {'context': {'other': 'other'}, 'source': self.source, 'uuid': '2'},
+            {'context': {'last': 'last'}, 'source': self.source, 'uuid': '1'},
+        ], batch_size=2)
+
+        self.assertEqual(num_created, 2)
+        self.assertEqual(Event.objects.get(uuid='1').context, {'first': 'first'})
+
+    def test_failure_keeps_committed_batches(self):
+        def get_kwargs_list():
+            for i in range(2):
+                yield {'context': {'i': i}, 'source': self.source, 'uuid': str(i)}
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            Event.objects.copy_events(get_kwargs_list(), batch_size=2)
+
+        self.assertEqual(set(Event.objects.values_list('uuid', flat=True)), {'0', '1'})
+
+
+class CopyEventsCommandTest(TestCase):
+    def setUp(self):
+        super(CopyEventsCommandTest, self).setUp()
+        self.source = G(Source, name='source')
+        self.actor = G(Entity)
+        self.lines = [
+            json.dumps({'context': {'one': 'one'}, 'source': 'source', 'uuid': '1', 'actors': [self.actor.id]}),
+            '',
+            json.dumps({
+                'context': {'two': 'two'}, 'source_id': self.source.id, 'uuid': '2',
+                'time': '2020-01-01T00:00:00', 'time_expires': '2030-01-01T00:00:00',
+            }),
+        ]
+
+    def test_from_file(self):
+        with NamedTemporaryFile('w', suffix='.jsonl') as f:
+            f.write('\n'.join(self.lines))
+            f.flush()
+
+            stdout = StringIO()
+            call_command('copy_events', f.name, stdout=stdout)
+
+        self.assertIn('Created 2 events', stdout.getvalue())
+        self.assertEqual(Event.objects.get(uuid='1').eventactor_set.get().entity_id, self.actor.id)
+        e2 = Event.objects.get(uuid='2')
+        self.assertEqual(e2.time, datetime(2020, 1, 1))
+        self.assertEqual(e2.time_expires, datetime(2030, 1, 1))
+
+    def test_from_stdin(self):
+        stdout = StringIO()
+        with patch('sys.stdin', StringIO('\n'.join(self.lines))):
+            call_command('copy_events', '-', '--batch-size', '1', stdout=stdout)
+
+        self.assertIn('Created 2 events', stdout.getvalue())
+
+    def test_unknown_source(self):
+        with patch('sys.stdin', StringIO(json.dumps({'context': {}, 'source': 'missing', 'uuid': '1'}))):
+            with self.assertRaises(CommandError):
+                call_command('copy_events', '-', stdout=StringIO())
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+
+from entity_event.codecs import ContextCodec, get_codec, MsgpackCodec, register_codec, ZlibJsonCodec
+
+
+class ContextCodecTest(TestCase):
+    def test_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            ContextCodec().encode({})
+        with self.assertRaises(NotImplementedError):
+            ContextCodec().decode(b'')
+
+
+class ZlibJsonCodecTest(TestCase):
+    def test_round_trip(self):
+        codec = ZlibJsonCodec()
+        context = {'text': 'hello ' * 100, 'ids': [1, 2, 3], 'time': datetime(2020, 1, 1)}
+
+        data = codec.encode(context)
+        self.assertLess(len(data), 100)
+        self.assertEqual(
+            codec.decode(memoryview(data)), {'text': 'hello ' * 100, 'ids': [1, 2, 3], 'time': '2020-01-01T00:00:00'})
+
+
+class MsgpackCodecTest(TestCase):
+    def test_round_trip(self):
+        codec = MsgpackCodec()
+        context = {'nested': {'ids': [1, 2, 3]}, 'time': datetime(2020, 1, 1)}
+
+        self.assertEqual(
+            codec.decode(memoryview(codec.encode(context))),
+            {'nested': {'ids': [1, 2, 3]}, 'time': '2020-01-01T00:00:00'})
+
+
+class GetCodecTest(TestCase):
+    def test_registered(self):
+        self.assertIsInstance(get_codec('zlib-json'), ZlibJsonCodec)
+        self.assertIsInstance(get_codec('msgpack'), MsgpackCodec)
+
+    def test_register(self):
+        class UpperCodec(ContextCodec):
+            name = 'test-upper'
+
+        codec = UpperCodec()
+        register_codec(codec)
+        self.assertIs(get_codec('test-upper'), codec)
+
+    def test_not_registered(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_codec('missing')
@@ -1,14 +1,23 @@
+from copy import copy, deepcopy
+from unittest import skipIf
+
 from django import VERSION
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
 from django.test import TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django_dynamic_fixture import N, G
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 from entity_event import context_loader
 from entity_event import models
 from entity_event.tests import models as test_models
 
 
+def resolve_avatars(keys):
+    return {key: 'avatar {0}'.format(key) for key in keys if key != 'missing'}
+
+
 class TestGetDefaultRenderingStyle(TestCase):
     def test_none_defined(self):
         self.assertIsNone(context_loader.get_default_rendering_style())
@@ -24,6 +33,137 @@ class TestGetContextHintsFromSource(TestCase):
         res = context_loader.get_context_hints_per_source([])
         self.assertEqual(res, {})
 
+    def test_merged_paths(self):
+        source = N(models.Source, id=1)
+        res = context_loader.get_context_hints_per_source([
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'paths': ['key'],
+                },
+            }),
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'paths': ['items.*.key'],
+                },
+            }),
+        ])
+        self.assertEqual(res[source.id]['key']['paths'], {'key', 'items.*.key'})
+
+    def test_merged_cache(self):
+        source = N(models.Source, id=1)
+        res = context_loader.get_context_hints_per_source([
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'cache': True,
+                },
+            }),
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'cache': 30,
+                },
+            }),
+        ])
+        self.assertEqual(res[source.id]['key']['cache'], 30)
+
+    def test_merged_polymorphic(self):
+        source = N(models.Source, id=1)
+        res = context_loader.get_context_hints_per_source([
+            N(models.ContextRenderer, source=source, context_hints={
+                'target': {
+                    'polymorphic': True,
+                    'types': {'project': 'projects.Project'},
+                },
+            }),
+        ])
+        self.assertEqual(res[source.id]['target']['polymorphic'], True)
+        self.assertEqual(res[source.id]['target']['types'], {'project': 'projects.Project'})
+
+    def test_merged_resolver(self):
+        source = N(models.Source, id=1)
+        res = context_loader.get_context_hints_per_source([
+            N(models.ContextRenderer, source=source, context_hints={
+                'avatar': {
+                    'resolver': 'json.loads',
+                },
+            }),
+        ])
+        self.assertEqual(res[source.id]['avatar']['resolver'], 'json.loads')
+        self.assertIsNone(res[source.id]['avatar']['app_name'])
+
+    def test_merged_prefetch_hints(self):
+        source = N(models.Source, id=1)
+        spec = {'lookup': 'fk_m2m', 'app_name': 'tests', 'model_name': 'TestFKModel', 'to_attr': 'recent'}
+        res = context_loader.get_context_hints_per_source([
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'prefetch_related': ['fk', spec],
+                },
+            }),
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'prefetch_related': [dict(spec)],
+                },
+            }),
+        ])
+        self.assertEqual(res[source.id]['key']['prefetch_related'], {'fk', context_loader.PrefetchHint(spec)})
+
+    def test_merged_field_hints(self):
+        source = N(models.Source, id=1)
+        res = context_loader.get_context_hints_per_source([
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'values': ['value'],
+                    'defer': ['fk', 'fk2'],
+                },
+                'key2': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'only': ['value'],
+                },
+            }),
+            N(models.ContextRenderer, source=source, context_hints={
+                'key': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'values': ['fk'],
+                    'defer': ['fk2'],
+                },
+                'key2': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                },
+            }),
+            N(models.ContextRenderer, source=source, context_hints={
+                'key2': {
+                    'app_name': 'entity_event.tests',
+                    'model_name': 'TestModel',
+                    'only': ['fk'],
+                },
+            }),
+        ])
+
+        self.assertEqual(res[source.id]['key']['values'], {'value', 'fk'})
+        self.assertEqual(res[source.id]['key']['only'], {'value', 'fk'})
+        self.assertEqual(res[source.id]['key']['defer'], {'fk2'})
+        self.assertNotIn('values_list', res[source.id]['key'])
+
+        # Every field is loaded when any of the hints needs every field
+        self.assertNotIn('only', res[source.id]['key2'])
+
     @patch.object(models.ContextRenderer, 'get_sources', spec_set=True)
     def test_one_context_renderer(self, mock_get_sources):
         source = N(models.Source, id=1)
@@ -38,7 +178,7 @@ class TestGetContextHintsFromSource(TestCase):
             })
         ])
         self.assertEqual(res, {
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'entity_event.tests',
                     'model_name': 'TestModel',
@@ -78,7 +218,7 @@ class TestGetContextHintsFromSource(TestCase):
             })
         ])
         self.assertEqual(res, {
-            source1: {
+            source1.id: {
                 'key': {
                     'app_name': 'entity_event.tests',
                     'model_name': 'TestModel',
@@ -86,7 +226,7 @@ class TestGetContextHintsFromSource(TestCase):
                     'prefetch_related': set(['prefetch1', 'prefetch2', 'prefetch3']),
                 }
             },
-            source2: {
+            source2.id: {
                 'key2': {
                     'app_name': 'entity_event.tests2',
                     'model_name': 'TestModel2',
@@ -105,7 +245,7 @@ class TestGetQuerysetsForContextHints(TestCase):
     def test_one_context_hint_no_select_related(self):
         source = N(models.Source, id=1)
         qsets = context_loader.get_querysets_for_context_hints({
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -119,7 +259,7 @@ class TestGetQuerysetsForContextHints(TestCase):
     def test_one_context_hint_w_select_related(self):
         source = N(models.Source, id=1)
         qsets = context_loader.get_querysets_for_context_hints({
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -145,14 +285,14 @@ class TestGetQuerysetsForContextHints(TestCase):
         source = N(models.Source, id=1)
         source2 = N(models.Source, id=2)
         qsets = context_loader.get_querysets_for_context_hints({
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
                     'select_related': ['fk'],
                 },
             },
-            source2: {
+            source2.id: {
                 'key2': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -181,7 +321,7 @@ class TestGetQuerysetsForContextHints(TestCase):
         source = N(models.Source, id=1)
         source2 = N(models.Source, id=2)
         qsets = context_loader.get_querysets_for_context_hints({
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -189,7 +329,7 @@ class TestGetQuerysetsForContextHints(TestCase):
                     'prefetch_related': ['fk_m2m'],
                 },
             },
-            source2: {
+            source2.id: {
                 'key2': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -217,12 +357,247 @@ class TestGetQuerysetsForContextHints(TestCase):
         self.assertEqual(actual_sql, expected_sql)
 
 
+class GetQuerysetsForContextHintsWithFieldHintsTest(TestCase):
+    def get_queryset(self, *hints):
+        return context_loader.get_querysets_for_context_hints({
+            source_id: {
+                'key': dict(hints, app_name='tests', model_name='TestModel'),
+            }
+            for source_id, hints in enumerate(hints)
+        })[test_models.TestModel]
+
+    def test_only(self):
+        queryset = self.get_queryset({'only': ['value']}, {'only': ['fk'], 'select_related': ['fk']})
+        self.assertEqual(queryset.query.deferred_loading, (frozenset({'value', 'fk'}), False))
+
+    def test_only_and_every_field(self):
+        self.assertEqual(self.get_queryset({'only': ['value']}, {}), test_models.TestModel.objects)
+
+    def test_defer(self):
+        queryset = self.get_queryset({'defer': ['value', 'fk']}, {'defer': ['fk', 'fk2'], 'select_related': ['fk']})
+        self.assertEqual(queryset.query.deferred_loading, (frozenset(), True))
+
+        queryset = self.get_queryset({'defer': ['value', 'fk2']}, {'defer': ['value']})
+        self.assertEqual(queryset.query.deferred_loading, (frozenset({'value'}), True))
+
+    def test_values(self):
+        fk = G(test_models.TestFKModel, value='fk')
+        o = G(test_models.TestModel, value='value', fk=fk)
+        queryset = self.get_queryset({'values': ['value']}, {'values': ['fk__value'], 'select_related': ['fk']})
+
+        self.assertEqual(list(queryset), [{'id': o.id, 'value': 'value', 'fk__value': 'fk'}])
+
+    def test_values_list(self):
+        o = G(test_models.TestModel, value='value')
+        queryset = self.get_queryset(
+            {'values_list': ['value']}, {'values_list': ['fk'], 'prefetch_related': ['fk_m2m']})
+
+        row = queryset.get()
+        self.assertEqual((row.id, row.value, row.fk), (o.id, 'value', o.fk_id))
+
+    def test_values_and_instances(self):
+        o = G(test_models.TestModel, value='value')
+        queryset = self.get_queryset({'values': ['value']}, {'values_list': ['fk']})
+
+        # The hints disagree on the type of the objects, so instances with the fields of both are loaded
+        self.assertEqual(queryset.query.deferred_loading, (frozenset({'value', 'fk'}), False))
+        self.assertEqual(context_loader.fetch_model_data(
+            {test_models.TestModel: queryset}, {test_models.TestModel: [o.id]}
+        ), {test_models.TestModel: {o.id: o}})
+
+    def test_fetch_values(self):
+        o = G(test_models.TestModel, value='value')
+        queryset = self.get_queryset({'values': ['value']})
+
+        self.assertEqual(context_loader.fetch_model_data(
+            {test_models.TestModel: queryset}, {test_models.TestModel: [o.id]}
+        ), {test_models.TestModel: {o.id: {'id': o.id, 'value': 'value'}}})
+
+
+class BatchResolverTest(TestCase):
+    def test_resolver(self):
+        resolver = context_loader.BatchResolver('entity_event.tests.context_loader_tests.resolve_avatars')
+        self.assertIs(resolver.resolve, resolve_avatars)
+        self.assertEqual(resolver, context_loader.BatchResolver(resolver.path))
+        self.assertEqual(len({resolver, context_loader.BatchResolver(resolver.path)}), 1)
+        self.assertNotEqual(resolver, context_loader.BatchResolver('json.loads'))
+        self.assertNotEqual(resolver, test_models.TestModel)
+        self.assertEqual(repr(context_loader.BatchResolver('json.loads')), 'BatchResolver(json.loads)')
+
+    def test_get_hinted_model(self):
+        self.assertEqual(
+            context_loader.get_hinted_model({'resolver': 'json.loads'}), context_loader.BatchResolver('json.loads'))
+        self.assertEqual(
+            context_loader.get_hinted_model({'app_name': 'tests', 'model_name': 'TestModel'}), test_models.TestModel)
+
+    def test_resolvers_not_queried_or_cached(self):
+        hints = {
+            1: {
+                'avatar': {'resolver': 'json.loads', 'cache': True},
+            },
+        }
+        self.assertEqual(context_loader.get_querysets_for_context_hints(hints), {})
+        self.assertEqual(context_loader.get_cache_timeouts_for_context_hints(hints), {})
+
+
+class PolymorphicHintTest(TestCase):
+    def setUp(self):
+        super(PolymorphicHintTest, self).setUp()
+        self.hint = context_loader.PolymorphicHint({'model': 'tests.TestModel', 'fk': 'tests.TestFKModel'})
+
+    def test_equal(self):
+        same_hint = context_loader.PolymorphicHint({'fk': 'tests.TestFKModel', 'model': 'tests.testmodel'})
+        self.assertEqual(self.hint, same_hint)
+        self.assertEqual(len({self.hint, same_hint}), 1)
+        self.assertNotEqual(self.hint, context_loader.PolymorphicHint({'model': 'tests.TestModel'}))
+        self.assertNotEqual(self.hint, test_models.TestModel)
+        self.assertEqual(repr(self.hint), "PolymorphicHint(['fk', 'model'])")
+
+    def test_get_model_with_types(self):
+        self.assertEqual(self.hint.get_model({'type': 'model', 'id': 1}), test_models.TestModel)
+        self.assertIsNone(self.hint.get_model({'type': 'tests.TestModel', 'id': 1}))
+        self.assertIsNone(self.hint.get_model(1))
+
+    def test_get_model_not_allowed(self):
+        # Models that are not in the types are never loaded, even when referenced by label
+        self.assertIsNone(self.hint.get_model({'type': 'auth.User', 'id': 1}))
+        self.assertIsNone(self.hint.get_model({'type': 1, 'id': 1}))
+        self.assertIsNone(self.hint.get_model({'type': ['model'], 'id': 1}))
+
+    def test_types_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            context_loader.PolymorphicHint(None)
+        with self.assertRaises(ImproperlyConfigured):
+            context_loader.get_hinted_model({'polymorphic': True})
+
+    def test_get_model_ids(self):
+        self.assertEqual(list(self.hint.get_model_ids([
+            {'type': 'model', 'id': 1}, {'type': 'fk', 'id': 2}, {'type': 'fk', 'id': '3'}, {'type': 'other', 'id': 4},
+            5,
+        ])), [(test_models.TestModel, 1), (test_models.TestFKModel, 2)])
+
+    def test_load(self):
+        model_data = {test_models.TestModel: {1: 'one'}}
+        self.assertEqual(self.hint.load({'type': 'model', 'id': 1}, model_data), 'one')
+        self.assertEqual(self.hint.load([
+            {'type': 'model', 'id': 1}, {'type': 'model', 'id': 2}, {'type': 'fk', 'id': 1}, {'type': 'other'}, 'other',
+        ], model_data), ['one', None, None, None, None])
+
+    def test_not_queried_or_cached(self):
+        hints = {
+            1: {
+                'target': {'polymorphic': True, 'types': {'model': 'tests.TestModel'}, 'cache': True},
+            },
+        }
+        self.assertEqual(context_loader.get_querysets_for_context_hints(hints), {})
+        self.assertEqual(context_loader.get_cache_timeouts_for_context_hints(hints), {})
+        self.assertEqual(
+            context_loader.get_hinted_model(hints[1]['target']),
+            context_loader.PolymorphicHint({'model': 'tests.TestModel'}))
+
+
+class PrefetchHintTest(TestCase):
+    def test_equal(self):
+        spec = {'lookup': 'fk_m2m', 'app_name': 'tests', 'model_name': 'TestFKModel', 'limit': 3}
+        self.assertEqual(context_loader.PrefetchHint(spec), context_loader.PrefetchHint(dict(spec)))
+        self.assertEqual(len({context_loader.PrefetchHint(spec), context_loader.PrefetchHint(dict(spec))}), 1)
+        self.assertNotEqual(context_loader.PrefetchHint(spec), context_loader.PrefetchHint(dict(spec, limit=2)))
+        self.assertNotEqual(context_loader.PrefetchHint(spec), 'fk_m2m')
+        self.assertEqual(repr(context_loader.PrefetchHint({'lookup': 'a'})), 'PrefetchHint({"lookup": "a"})')
+
+    @patch('django.VERSION', (4, 1, 0, 'final', 0))
+    def test_limit_requires_django_4_2(self):
+        with self.assertRaises(ImproperlyConfigured):
+            context_loader.PrefetchHint({
+                'lookup': 'fk_m2m', 'app_name': 'tests', 'model_name': 'TestFKModel', 'limit': 3,
+            }).get_prefetch()
+
+    def test_prefetch_to(self):
+        self.assertEqual(context_loader.PrefetchHint({'lookup': 'fk__set'}).prefetch_to, 'fk__set')
+        self.assertEqual(
+            context_loader.PrefetchHint({'lookup': 'fk__set', 'to_attr': 'recent'}).prefetch_to, 'fk__recent')
+
+    def test_get_prefetch(self):
+        prefetch = context_loader.PrefetchHint({
+            'lookup': 'testmodel_set',
+            'app_name': 'tests',
+            'model_name': 'TestModel',
+            'filter': {'value__startswith': 'a'},
+            'exclude': {'value': 'ab'},
+            'select_related': ['fk2'],
+            'order_by': ['-value'],
+            'to_attr': 'recent',
+        }).get_prefetch()
+
+        self.assertEqual(prefetch.prefetch_through, 'testmodel_set')
+        self.assertEqual(prefetch.prefetch_to, 'recent')
+        self.assertEqual(prefetch.queryset.model, test_models.TestModel)
+        self.assertEqual(prefetch.queryset.query.select_related, {'fk2': {}})
+        self.assertEqual(prefetch.queryset.query.order_by, ('-value',))
+
+
+class GetPrefetchesTest(TestCase):
+    def test_ordered(self):
+        prefetch_hint = context_loader.PrefetchHint({
+            'lookup': 'fk_m2m', 'app_name': 'tests', 'model_name': 'TestFKModel',
+        })
+        prefetches = context_loader.get_prefetches(
+            test_models.TestModel, {'fk__other', 'fk_m2m__fk', 'fk', prefetch_hint})
+
+        self.assertEqual(prefetches[0].prefetch_to, 'fk_m2m')
+        self.assertEqual(prefetches[1:], ['fk', 'fk__other', 'fk_m2m__fk'])
+
+    def test_conflict(self):
+        with self.assertRaisesRegex(ValueError, 'TestModel prefetch different objects into fk_m2m'):
+            context_loader.get_prefetches(test_models.TestModel, {'fk_m2m', context_loader.PrefetchHint({
+                'lookup': 'fk_m2m', 'app_name': 'tests', 'model_name': 'TestFKModel', 'limit': 1,
+            })})
+
+
+class GetQuerysetsForContextHintsWithPrefetchesTest(TestCase):
+    @skipIf(VERSION < (4, 2), 'Prefetching a sliced queryset requires Django 4.2')
+    def test_prefetch_limited(self):
+        recent_spec = {
+            'lookup': 'fk_m2m',
+            'app_name': 'tests',
+            'model_name': 'TestFKModel',
+            'order_by': ['-value'],
+            'limit': 2,
+            'to_attr': 'recent',
+        }
+        qsets = context_loader.get_querysets_for_context_hints({
+            1: {
+                'key': {
+                    'app_name': 'tests',
+                    'model_name': 'TestModel',
+                    'prefetch_related': [recent_spec, 'fk_m2m'],
+                },
+            },
+            2: {
+                'key': {
+                    'app_name': 'tests',
+                    'model_name': 'TestModel',
+                    'prefetch_related': [dict(recent_spec)],
+                },
+            },
+        })
+
+        o = G(test_models.TestModel)
+        m2ms = [G(test_models.TestFKModel, value=value) for value in ['a', 'b', 'c']]
+        o.fk_m2m.add(*m2ms)
+
+        with self.assertNumQueries(3):
+            v = qsets[test_models.TestModel].get(id=o.id)
+            self.assertEqual(v.recent, [m2ms[2], m2ms[1]])
+            self.assertEqual(set(v.fk_m2m.all()), set(m2ms))
+
+
 class TestGetQuerysetsForContextHintsDbTests(TestCase):
     def test_multiple_context_hints_w_multiple_select_related_multiple_prefetch_related(self):
         source = N(models.Source, id=1)
         source2 = N(models.Source, id=2)
         qsets = context_loader.get_querysets_for_context_hints({
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -230,7 +605,7 @@ class TestGetQuerysetsForContextHintsDbTests(TestCase):
                     'prefetch_related': ['fk_m2m'],
                 },
             },
-            source2: {
+            source2.id: {
                 'key2': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -308,7 +683,7 @@ class GetModelIdsToFetchTest(TestCase):
     def test_w_one_event_one_context_hint_single_pk(self):
         source = N(models.Source, id=1)
         hints = {
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -323,7 +698,7 @@ class GetModelIdsToFetchTest(TestCase):
     def test_w_one_event_one_context_hint_list_pks(self):
         source = N(models.Source, id=1)
         hints = {
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -338,7 +713,7 @@ class GetModelIdsToFetchTest(TestCase):
     def test_w_multiple_events_one_context_hint_list_pks(self):
         source = N(models.Source, id=1)
         hints = {
-            source: {
+            source.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -355,13 +730,13 @@ class GetModelIdsToFetchTest(TestCase):
         source1 = N(models.Source, id=1)
         source2 = N(models.Source, id=2)
         hints = {
-            source1: {
+            source1.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
                 },
             },
-            source2: {
+            source2.id: {
                 'key': {
                     'app_name': 'tests',
                     'model_name': 'TestModel',
@@ -382,6 +757,223 @@ class GetModelIdsToFetchTest(TestCase):
         })
 
 
+class FindKeysTest(TestCase):
+    def test_matches_dict_find(self):
+        d = {'a': 1, 'b': [{'a': 2, 'c': {'b': 3}}], 'c': {'a': {'a': 4}}}
+        self.assertEqual(
+            list(context_loader.find_keys(d, {'a'})),
+            [(dd, 'a') for dd, v in context_loader.dict_find(d, 'a')])
+
+    def test_multiple_keys(self):
+        d = {'a': 1, 'b': [{'c': 2}]}
+        self.assertEqual(list(context_loader.find_keys(d, {'a', 'c'})), [(d, 'a'), (d['b'][0], 'c')])
+
+
+class ContextHintPlanTest(TestCase):
+    def setUp(self):
+        super(ContextHintPlanTest, self).setUp()
+        self.plan = context_loader.ContextHintPlan({
+            'owner': {
+                'app_name': 'tests',
+                'model_name': 'TestModel',
+                'paths': {'owner', 'items.*.owner'},
+            },
+            'key': {
+                'app_name': 'tests',
+                'model_name': 'TestFKModel',
+            },
+        })
+
+    def test_models_resolved(self):
+        self.assertEqual(self.plan.models, {'owner': test_models.TestModel, 'key': test_models.TestFKModel})
+        self.assertEqual(self.plan.walked_keys, {'key'})
+
+    @patch.object(context_loader, 'find_keys', wraps=context_loader.find_keys)
+    def test_declared_paths(self, mock_find_keys):
+        plan = context_loader.ContextHintPlan({
+            'owner': {
+                'app_name': 'tests',
+                'model_name': 'TestModel',
+                'paths': {'owner', 'items.*.owner'},
+            },
+        })
+        context = {'owner': 1, 'items': [{'owner': 2}, {'owner': 3}], 'other': {'owner': 4}}
+
+        slots = plan.find_slots(context)
+
+        self.assertEqual(sorted(d['owner'] for d, key, model in slots), [1, 2, 3])
+        self.assertEqual({(key, model) for d, key, model in slots}, {('owner', test_models.TestModel)})
+        self.assertFalse(mock_find_keys.called)
+
+    def test_declared_paths_and_walked_keys(self):
+        context = {'owner': 1, 'items': [], 'nested': {'key': 2}}
+
+        slots = self.plan.find_slots(context)
+
+        self.assertEqual(slots, [
+            (context, 'owner', test_models.TestModel),
+            (context['nested'], 'key', test_models.TestFKModel),
+        ])
+
+    def test_context_without_declared_path_walked(self):
+        context = {'items': [{'owner': 2}, {'other': 3}], 'key': 4}
+
+        slots = self.plan.find_slots(context)
+
+        self.assertEqual(slots, [
+            (context['items'][0], 'owner', test_models.TestModel),
+            (context, 'key', test_models.TestFKModel),
+        ])
+
+    def test_follow_path_wrong_types(self):
+        self.assertIsNone(self.plan.follow_path({'items': {'owner': 1}}, ['items', '*', 'owner']))
+        self.assertIsNone(self.plan.follow_path({'items': [1]}, ['items', '*', 'owner']))
+
+
+class CompileContextHintsTest(TestCase):
+    def test_compiled(self):
+        source = G(models.Source)
+        cr = G(models.ContextRenderer, source=source, context_hints={
+            'key': {
+                'app_name': 'tests',
+                'model_name': 'TestModel',
+                'select_related': ['fk'],
+            },
+        })
+
+        context_hints_per_source, model_querysets, context_hint_plans, model_cache_timeouts = (
+            context_loader.compile_context_hints([cr]))
+
+        self.assertEqual(context_hints_per_source, {
+            source.id: {
+                'key': {
+                    'app_name': 'tests',
+                    'model_name': 'TestModel',
+                    'select_related': {'fk'},
+                    'prefetch_related': set(),
+                },
+            },
+        })
+        self.assertEqual(type(context_hints_per_source[source.id]), dict)
+        self.assertEqual(list(model_querysets), [test_models.TestModel])
+        self.assertEqual(context_hint_plans[source.id].models, {'key': test_models.TestModel})
+        self.assertEqual(model_cache_timeouts, {})
+
+    def test_not_memoized_without_registry(self):
+        self.assertIsNot(context_loader.get_compiled_context_hints([]), context_loader.get_compiled_context_hints([]))
+
+
+class LazyObjectsTest(TestCase):
+    def test_fetched_once(self):
+        fetch = Mock(return_value={1: 'one', 2: 'two'})
+        lazy_objects = context_loader.LazyObjects(fetch, {1, 2, 3})
+
+        self.assertIsNone(lazy_objects.get(4))
+        proxies = [lazy_objects.get(1), lazy_objects.get(2), lazy_objects.get(3)]
+        self.assertFalse(fetch.called)
+
+        self.assertEqual(str(proxies[0]), 'one')
+        self.assertEqual(proxies[1].upper(), 'TWO')
+        self.assertFalse(proxies[2])
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_copy(self):
+        fetch = Mock(return_value={1: 'one'})
+        proxy = context_loader.LazyObjects(fetch, {1}).get(1)
+
+        self.assertEqual(str(copy(proxy)), 'one')
+        self.assertEqual(str(deepcopy([proxy])[0]), 'one')
+        self.assertEqual(fetch.call_count, 1)
+
+
+class GetLoadedContextTest(TestCase):
+    def test_no_slots(self):
+        context = {'key': 1}
+        self.assertIs(context_loader.get_loaded_context(context, [], {}), context)
+
+    def test_model_not_fetched(self):
+        context = {'key': 'not an id', 'list': [1]}
+        loaded_context = context_loader.get_loaded_context(context, [
+            (context, 'key', test_models.TestModel),
+            (context, 'list', test_models.TestModel),
+        ], {})
+        self.assertEqual(loaded_context, {'key': None, 'list': [None]})
+        self.assertEqual(context, {'key': 'not an id', 'list': [1]})
+
+    def test_nested_slots(self):
+        context = {
+            'items': [{'owner': 1}, {'other': 2}],
+            'pairs': ({'owner': 2},),
+            'other': {'owner': 'not hinted'},
+            'tags': ['a'],
+        }
+        slots = [(d, k, test_models.TestModel) for d, k in context_loader.find_keys(context['items'], {'owner'})]
+        slots.append((context['pairs'][0], 'owner', test_models.TestModel))
+
+        loaded_context = context_loader.get_loaded_context(context, slots, {test_models.TestModel: {1: 'one'}})
+        self.assertEqual(loaded_context, {
+            'items': [{'owner': 'one'}, {'other': 2}],
+            'pairs': ({'owner': None},),
+            'other': {'owner': 'not hinted'},
+            'tags': ['a'],
+        })
+
+        # Only the parts of the context that lead to a slot are copied
+        self.assertEqual(context['items'], [{'owner': 1}, {'other': 2}])
+        self.assertEqual(context['pairs'], ({'owner': 2},))
+        self.assertIs(loaded_context['items'][1], context['items'][1])
+        self.assertIs(loaded_context['other'], context['other'])
+        self.assertIs(loaded_context['tags'], context['tags'])
+
+
+class MergeCacheTimeoutsTest(TestCase):
+    def test_merge(self):
+        self.assertEqual(context_loader.merge_cache_timeouts(None, True), True)
+        self.assertEqual(context_loader.merge_cache_timeouts(True, True), True)
+        self.assertEqual(context_loader.merge_cache_timeouts(True, 30), 30)
+        self.assertEqual(context_loader.merge_cache_timeouts(30, True), 30)
+        self.assertEqual(context_loader.merge_cache_timeouts(30, 10), 10)
+
+
+class GetCacheTimeoutsForContextHintsTest(TestCase):
+    def test_cached_models(self):
+        self.assertEqual(context_loader.get_cache_timeouts_for_context_hints({
+            1: {
+                'key': {'app_name': 'tests', 'model_name': 'TestModel', 'cache': True},
+                'key2': {'app_name': 'tests', 'model_name': 'TestFKModel', 'cache': 60},
+                'key3': {'app_name': 'tests', 'model_name': 'TestFKModel2'},
+            },
+            2: {
+                'key2': {'app_name': 'tests', 'model_name': 'TestFKModel', 'cache': 30},
+            },
+        }), {
+            test_models.TestModel: None,
+            test_models.TestFKModel: 30,
+        })
+
+
+class GetQuerysetShapeTest(TestCase):
+    def test_shapes(self):
+        def get_shape(hints):
+            return context_loader.get_queryset_shape(context_loader.get_querysets_for_context_hints({
+                1: {'key': dict(hints, app_name='tests', model_name='TestModel')},
+            })[test_models.TestModel])
+
+        prefetch = {'lookup': 'fk_m2m', 'app_name': 'tests', 'model_name': 'TestFKModel', 'to_attr': 'fks'}
+        shapes = [
+            get_shape({}),
+            get_shape({'only': ['value']}),
+            get_shape({'values': ['value']}),
+            get_shape({'values_list': ['value']}),
+            get_shape({'select_related': ['fk']}),
+            get_shape({'prefetch_related': ['fk_m2m']}),
+            get_shape({'prefetch_related': [prefetch]}),
+            get_shape({'prefetch_related': [dict(prefetch, filter={'value': 'a'})]}),
+        ]
+        self.assertEqual(len(set(shapes)), len(shapes))
+        self.assertEqual(get_shape({'select_related': ['fk']}), shapes[4])
+
+
 class FetchModelDataTest(TestCase):
     def test_none(self):
         self.assertEqual({}, context_loader.fetch_model_data({}, {}))
@@ -411,6 +1003,91 @@ class FetchModelDataTest(TestCase):
             test_models.TestFKModel: [m3.id],
         }))
 
+    def test_ids_sent_as_array(self):
+        m1 = G(test_models.TestModel)
+        m2 = G(test_models.TestModel)
+        with CaptureQueriesContext(connection) as queries:
+            model_data = context_loader.fetch_model_data({
+                test_models.TestModel: test_models.TestModel.objects
+            }, {
+                test_models.TestModel: {m1.id, m2.id, 0}
+            })
+
+        self.assertEqual(model_data, {test_models.TestModel: {m1.id: m1, m2.id: m2}})
+        self.assertEqual(len(queries), 1)
+        self.assertIn('= ANY(', queries[0]['sql'])
+
+    @override_settings(ENTITY_EVENT_FETCH_CHUNK_SIZE=2)
+    def test_chunked(self):
+        ms = [G(test_models.TestModel) for i in range(3)]
+        with self.assertNumQueries(2):
+            model_data = context_loader.fetch_model_data({
+                test_models.TestModel: test_models.TestModel.objects
+            }, {
+                test_models.TestModel: [m.id for m in ms]
+            })
+
+        self.assertEqual(model_data, {test_models.TestModel: {m.id: m for m in ms}})
+
+    def test_chunked_to_parameter_limit_without_postgres(self):
+        ms = [G(test_models.TestModel) for i in range(3)]
+        with patch.object(connection, 'vendor', 'sqlite'):
+            with patch.object(connection.ops, 'bulk_batch_size', return_value=2):
+                with CaptureQueriesContext(connection) as queries:
+                    model_data = context_loader.fetch_model_data({
+                        test_models.TestModel: test_models.TestModel.objects
+                    }, {
+                        test_models.TestModel: [m.id for m in ms]
+                    })
+
+        self.assertEqual(model_data, {test_models.TestModel: {m.id: m for m in ms}})
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('ANY', queries[0]['sql'])
+
+    def test_cache_not_enabled(self):
+        m1 = G(test_models.TestModel)
+        with self.assertNumQueries(1):
+            context_loader.fetch_model_data({
+                test_models.TestModel: test_models.TestModel.objects
+            }, {
+                test_models.TestModel: [m1.id]
+            }, {
+                test_models.TestModel: None
+            })
+
+    @override_settings(ENTITY_EVENT_OBJECT_CACHE={'max_size': 10})
+    def test_cached_models(self):
+        m1 = G(test_models.TestModel)
+        m2 = G(test_models.TestModel)
+        m3 = G(test_models.TestFKModel)
+        model_querysets = {
+            test_models.TestModel: test_models.TestModel.objects,
+            test_models.TestFKModel: test_models.TestFKModel.objects,
+        }
+        model_cache_timeouts = {test_models.TestModel: None}
+
+        with self.assertNumQueries(2):
+            context_loader.fetch_model_data(model_querysets, {
+                test_models.TestModel: [m1.id],
+                test_models.TestFKModel: [m3.id],
+            }, model_cache_timeouts)
+
+        # Only the uncached objects are fetched, and models without a cache timeout are not cached
+        with self.assertNumQueries(2):
+            model_data = context_loader.fetch_model_data(model_querysets, {
+                test_models.TestModel: [m1.id, m2.id],
+                test_models.TestFKModel: [m3.id],
+            }, model_cache_timeouts)
+        self.assertEqual(model_data, {
+            test_models.TestModel: {m1.id: m1, m2.id: m2},
+            test_models.TestFKModel: {m3.id: m3},
+        })
+
+        with self.assertNumQueries(0):
+            context_loader.fetch_model_data(model_querysets, {
+                test_models.TestModel: [m1.id, m2.id],
+            }, model_cache_timeouts)
+
 
 class LoadFetchedObjectsIntoContextsTest(TestCase):
     def test_none(self):
@@ -425,7 +1102,7 @@ class LoadFetchedObjectsIntoContextsTest(TestCase):
         m = N(test_models.TestModel, id=2)
         s = N(models.Source, id=1)
         hints = {
-            s: {
+            s.id: {
                 'key': {
                     'model_name': 'TestModel',
                     'app_name': 'tests',
@@ -434,14 +1111,14 @@ class LoadFetchedObjectsIntoContextsTest(TestCase):
         }
         e = N(models.Event, context={'key': m.id}, source=s)
         context_loader.load_fetched_objects_into_contexts([e], {test_models.TestModel: {m.id: m}}, hints)
-        self.assertEqual(e.context, {'key': m})
+        self.assertEqual(e.loaded_context, {'key': m})
 
     def test_one_event_w_list_model_data(self):
         m1 = N(test_models.TestModel, id=2)
         m2 = N(test_models.TestModel, id=3)
         s = N(models.Source, id=1)
         hints = {
-            s: {
+            s.id: {
                 'key': {
                     'model_name': 'TestModel',
                     'app_name': 'tests',
@@ -450,7 +1127,7 @@ class LoadFetchedObjectsIntoContextsTest(TestCase):
         }
         e = N(models.Event, context={'key': [m1.id, m2.id]}, source=s)
         context_loader.load_fetched_objects_into_contexts([e], {test_models.TestModel: {m1.id: m1, m2.id: m2}}, hints)
-        self.assertEqual(e.context, {'key': [m1, m2]})
+        self.assertEqual(e.loaded_context, {'key': [m1, m2]})
 
 
 class TestLoadRenderersIntoEvents(TestCase):
@@ -560,6 +1237,31 @@ class TestLoadRenderersIntoEvents(TestCase):
         })
 
 
+class LoadDeferredContextsTest(TestCase):
+    def test_none(self):
+        with self.assertNumQueries(0):
+            context_loader.load_deferred_contexts([])
+
+    def test_not_deferred(self):
+        G(models.Event, context={'key': 'value'})
+        events = list(models.Event.objects.all())
+
+        with self.assertNumQueries(0):
+            context_loader.load_deferred_contexts(events)
+        self.assertEqual(events[0].context, {'key': 'value'})
+
+    def test_deferred(self):
+        e1 = G(models.Event, context={'key': 1})
+        e2 = G(models.Event, context={'key': 2})
+        events = list(models.Event.objects.defer_context().order_by('id'))
+
+        with self.assertNumQueries(1):
+            context_loader.load_deferred_contexts(events)
+            self.assertEqual(events, [e1, e2])
+            self.assertEqual([e.context for e in events], [{'key': 1}, {'key': 2}])
+            self.assertEqual(events[0].get_deferred_fields(), set())
+
+
 class LoadContextsAndRenderersTest(TestCase):
     """
     Integration tests for loading contexts and renderers into events.
@@ -570,7 +1272,7 @@ class LoadContextsAndRenderersTest(TestCase):
     def test_no_mediums(self):
         e = G(models.Event, context={})
         context_loader.load_contexts_and_renderers([e], [])
-        self.assertEqual(e.context, {})
+        self.assertEqual(e.loaded_context, {})
 
     def test_one_render_target_one_event(self):
         m1 = G(test_models.TestModel)
@@ -586,7 +1288,162 @@ class LoadContextsAndRenderersTest(TestCase):
         })
 
         context_loader.load_contexts_and_renderers([e], [medium])
-        self.assertEqual(e.context, {'key': m1})
+        self.assertEqual(e.loaded_context, {'key': m1})
+
+    def test_loaded_again(self):
+        m1 = G(test_models.TestModel)
+        s = G(models.Source)
+        rg = G(models.RenderingStyle)
+        e = G(models.Event, context={'key': m1.id}, source=s)
+        medium = G(models.Medium, rendering_style=rg)
+        G(models.ContextRenderer, rendering_style=rg, source=s, context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+            }
+        })
+
+        # The raw context is left as it is, so a loaded event can be loaded again
+        context_loader.load_contexts_and_renderers([e], [medium])
+        context_loader.load_contexts_and_renderers([e], [medium])
+        self.assertEqual(e.context, {'key': m1.id})
+        self.assertEqual(e.loaded_context, {'key': m1})
+
+    def test_batch_resolver(self):
+        m1 = G(test_models.TestModel)
+        s = G(models.Source)
+        rg = G(models.RenderingStyle)
+        events = [
+            G(models.Event, context={'key': m1.id, 'avatar': 'a'}, source=s),
+            G(models.Event, context={'key': m1.id, 'avatars': {'avatar': ['b', 'missing']}}, source=s),
+        ]
+        medium = G(models.Medium, rendering_style=rg)
+        G(models.ContextRenderer, rendering_style=rg, source=s, context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+            },
+            'avatar': {
+                'resolver': 'entity_event.tests.context_loader_tests.resolve_avatars',
+            },
+        })
+
+        with patch(__name__ + '.resolve_avatars', wraps=resolve_avatars) as mock_resolve_avatars:
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        mock_resolve_avatars.assert_called_once_with({'a', 'b', 'missing'})
+        self.assertEqual(events[0].loaded_context, {'key': m1, 'avatar': 'avatar a'})
+        self.assertEqual(events[1].loaded_context, {'key': m1, 'avatars': {'avatar': ['avatar b', None]}})
+
+    def test_polymorphic(self):
+        m1 = G(test_models.TestModel)
+        fk = G(test_models.TestFKModel)
+        s = G(models.Source)
+        rg = G(models.RenderingStyle)
+        events = [
+            G(models.Event, context={'target': {'type': 'model', 'id': m1.id}}, source=s),
+            G(models.Event, context={'targets': {'target': [
+                {'type': 'fk', 'id': fk.id}, {'type': 'model', 'id': 0},
+            ]}}, source=s),
+        ]
+        medium = G(models.Medium, rendering_style=rg)
+        G(models.ContextRenderer, rendering_style=rg, source=s, context_hints={
+            'target': {
+                'polymorphic': True,
+                'types': {'model': 'tests.TestModel', 'fk': 'tests.TestFKModel'},
+            },
+        })
+
+        # The renderers and one query for each model
+        with self.assertNumQueries(3):
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        self.assertEqual(events[0].loaded_context, {'target': m1})
+        self.assertEqual(events[1].loaded_context, {'targets': {'target': [fk, None]}})
+
+    @override_settings(ENTITY_EVENT_LAZY_CONTEXTS=True)
+    def test_lazy(self):
+        m1 = G(test_models.TestModel, value='one')
+        m2 = G(test_models.TestModel, value='two')
+        fk = G(test_models.TestFKModel)
+        s = G(models.Source)
+        rg = G(models.RenderingStyle)
+        events = [
+            G(models.Event, context={'key': m1.id, 'fk': fk.id}, source=s),
+            G(models.Event, context={'key': [m2.id, 0], 'fk': fk.id}, source=s),
+        ]
+        medium = G(models.Medium, rendering_style=rg)
+        G(models.ContextRenderer, rendering_style=rg, source=s, text_template='{{ key.value }}', context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+            },
+            'fk': {
+                'model_name': 'TestFKModel',
+                'app_name': 'tests',
+            },
+        })
+
+        # Only the renderers are fetched
+        with self.assertNumQueries(1):
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        # The test models of every event are fetched when the first is used, and the fk model is never fetched
+        with self.assertNumQueries(1):
+            self.assertEqual(events[0].render(medium), ('one', ''))
+            self.assertEqual(events[1].loaded_context['key'][0].value, 'two')
+            self.assertFalse(events[1].loaded_context['key'][1])
+
+    @override_settings(ENTITY_EVENT_LAZY_CONTEXTS=True)
+    def test_lazy_values_and_resolvers_fetched(self):
+        m1 = G(test_models.TestModel, value='one')
+        fk = G(test_models.TestFKModel, value='fk')
+        s = G(models.Source)
+        rg = G(models.RenderingStyle)
+        events = [G(models.Event, context={'key': m1.id, 'fk': fk.id, 'avatar': 'a'}, source=s)]
+        medium = G(models.Medium, rendering_style=rg)
+        G(models.ContextRenderer, rendering_style=rg, source=s, text_template='{{ avatar }} {{ fk.value }}',
+          context_hints={
+              'key': {
+                  'model_name': 'TestModel',
+                  'app_name': 'tests',
+              },
+              'fk': {
+                  'model_name': 'TestFKModel',
+                  'app_name': 'tests',
+                  'values': ['value'],
+              },
+              'avatar': {
+                  'resolver': 'entity_event.tests.context_loader_tests.resolve_avatars',
+              },
+          })
+
+        # The renderers and the fk values, while the test models are proxied
+        with self.assertNumQueries(2):
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        self.assertEqual(events[0].loaded_context['avatar'], 'avatar a')
+        self.assertEqual(events[0].loaded_context['fk'], {'id': fk.id, 'value': 'fk'})
+        self.assertIsInstance(events[0].loaded_context['key'], context_loader.ContextProxy)
+        with self.assertNumQueries(0):
+            self.assertEqual(events[0].render(medium), ('avatar a fk', ''))
+
+    def test_one_render_target_one_deferred_event(self):
+        m1 = G(test_models.TestModel)
+        s = G(models.Source)
+        rg = G(models.RenderingStyle)
+        G(models.Event, context={'key': m1.id}, source=s)
+        medium = G(models.Medium, rendering_style=rg)
+        G(models.ContextRenderer, rendering_style=rg, source=s, context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+            }
+        })
+
+        events = context_loader.load_contexts_and_renderers(
+            models.Event.objects.defer_context().select_related('source'), [medium])
+        self.assertEqual(events[0].loaded_context, {'key': m1})
 
     @override_settings(DEFAULT_ENTITY_EVENT_RENDERING_STYLE='short')
     def test_one_render_target_one_event_no_style_with_default(self):
@@ -603,7 +1460,7 @@ class LoadContextsAndRenderersTest(TestCase):
         })
 
         context_loader.load_contexts_and_renderers([e], [medium])
-        self.assertEqual(e.context, {'key': m1})
+        self.assertEqual(e.loaded_context, {'key': m1})
 
     def test_multiple_render_targets_multiple_events(self):
         test_m1 = G(test_models.TestModel)
@@ -641,10 +1498,10 @@ class LoadContextsAndRenderersTest(TestCase):
         e4 = G(models.Event, context={'key2': test_fk_m2.id}, source=s2)
 
         context_loader.load_contexts_and_renderers([e1, e2, e3, e4], [medium1, medium2])
-        self.assertEqual(e1.context, {'key': test_m1, 'key2': 'haha'})
-        self.assertEqual(e2.context, {'key': [test_m2, test_m3]})
-        self.assertEqual(e3.context, {'key2': test_fk_m1, 'key': test_m1})
-        self.assertEqual(e4.context, {'key2': test_fk_m2})
+        self.assertEqual(e1.loaded_context, {'key': test_m1, 'key2': 'haha'})
+        self.assertEqual(e2.loaded_context, {'key': [test_m2, test_m3]})
+        self.assertEqual(e3.loaded_context, {'key2': test_fk_m1, 'key': test_m1})
+        self.assertEqual(e4.loaded_context, {'key2': test_fk_m2})
 
         # Verify context renderers are put into the events properly
         self.assertEqual(e1._context_renderers, {
@@ -701,10 +1558,10 @@ class LoadContextsAndRenderersTest(TestCase):
         e4 = G(models.Event, context={'key2': test_fk_m2.id}, source=s2)
 
         context_loader.load_contexts_and_renderers([e1, e2, e3, e4], [medium1, medium2])
-        self.assertEqual(e1.context, {'key': test_m1, 'key2': 'haha'})
-        self.assertEqual(e2.context, {'key': [test_m2, test_m3]})
-        self.assertEqual(e3.context, {'key2': test_fk_m1, 'key': test_m1})
-        self.assertEqual(e4.context, {'key2': test_fk_m2})
+        self.assertEqual(e1.loaded_context, {'key': test_m1, 'key2': 'haha'})
+        self.assertEqual(e2.loaded_context, {'key': [test_m2, test_m3]})
+        self.assertEqual(e3.loaded_context, {'key2': test_fk_m1, 'key': test_m1})
+        self.assertEqual(e4.loaded_context, {'key2': test_fk_m2})
 
         # Verify context renderers are put into the events properly
         self.assertEqual(e1._context_renderers, {
@@ -724,6 +1581,31 @@ class LoadContextsAndRenderersTest(TestCase):
             medium2: cr2,
         })
 
+    def test_sources_not_loaded(self):
+        s = G(models.Source)
+        rs = G(models.RenderingStyle)
+        medium = G(models.Medium, rendering_style=rs)
+        cr = G(models.ContextRenderer, rendering_style=rs, source_group=s.group, source=None)
+        G(models.Event, context={}, source=s)
+        events = list(models.Event.objects.all())
+
+        # The context renderers and the sources of their group, but not the sources of the events
+        with self.assertNumQueries(3):
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        self.assertEqual(events[0]._context_renderers, {medium: cr})
+
+    def test_unsaved_event_source_group(self):
+        s = G(models.Source)
+        rs = G(models.RenderingStyle)
+        medium = G(models.Medium, rendering_style=rs)
+        cr = G(models.ContextRenderer, rendering_style=rs, source_group=s.group, source=None)
+        event = models.Event(context={}, source=s)
+
+        context_loader.load_contexts_and_renderers([event], [medium])
+
+        self.assertEqual(event._context_renderers, {medium: cr})
+
     def test_optimal_queries(self):
         fk1 = G(test_models.TestFKModel)
         fk11 = G(test_models.TestFKModel)
@@ -777,10 +1659,10 @@ class LoadContextsAndRenderersTest(TestCase):
 
         with self.assertNumQueries(num_queries):
             context_loader.load_contexts_and_renderers([e1, e2, e3, e4], [medium1, medium2])
-            self.assertEqual(e1.context['key'].fk, fk1)
-            self.assertEqual(e2.context['key'][0].fk, fk1)
-            self.assertEqual(e1.context['key'].fk2, fk2)
-            self.assertEqual(e2.context['key'][0].fk2, fk2)
-            self.assertEqual(set(e1.context['key'].fk_m2m.all()), set([fk1, fk11]))
-            self.assertEqual(set(e2.context['key'][0].fk_m2m.all()), set([fk1, fk11]))
-            self.assertEqual(e3.context['key'].fk, fk1)
+            self.assertEqual(e1.loaded_context['key'].fk, fk1)
+            self.assertEqual(e2.loaded_context['key'][0].fk, fk1)
+            self.assertEqual(e1.loaded_context['key'].fk2, fk2)
+            self.assertEqual(e2.loaded_context['key'][0].fk2, fk2)
+            self.assertEqual(set(e1.loaded_context['key'].fk_m2m.all()), set([fk1, fk11]))
+            self.assertEqual(set(e2.loaded_context['key'][0].fk_m2m.all()), set([fk1, fk11]))
+            self.assertEqual(e3.loaded_context['key'].fk, fk1)
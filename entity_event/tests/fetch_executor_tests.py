@@ -0,0 +1,125 @@
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django_dynamic_fixture import G
+from unittest.mock import Mock, patch
+
+from entity_event import context_loader, fetch_executor
+from entity_event.fetch_executor import (
+    close_unusable_connections, fetch_concurrently, get_fetch_executor, reset_fetch_executor, run_fetch
+)
+from entity_event.tests import models as test_models
+
+
+def get_thread_name():
+    return threading.current_thread().name
+
+
+class GetFetchExecutorTest(TestCase):
+    def tearDown(self):
+        reset_fetch_executor()
+        super(GetFetchExecutorTest, self).tearDown()
+
+    def test_not_configured(self):
+        self.assertIsNone(get_fetch_executor())
+
+    def test_started_once(self):
+        with override_settings(ENTITY_EVENT_CONCURRENT_FETCH={'max_workers': 2}):
+            executor = get_fetch_executor()
+            self.assertEqual(executor._max_workers, 2)
+            self.assertIs(get_fetch_executor(), executor)
+
+            with override_settings(DEBUG=True):
+                self.assertIs(get_fetch_executor(), executor)
+
+        # Changing the setting shuts down the executor
+        self.assertIsNone(fetch_executor._fetch_executor)
+        self.assertTrue(executor._shutdown)
+
+
+class CloseUnusableConnectionsTest(TestCase):
+    def get_connection(self, conn_max_age, connected=True):
+        return Mock(connection=Mock() if connected else None, settings_dict={'CONN_MAX_AGE': conn_max_age}, close_at=1)
+
+    def test_close_unusable_connections(self):
+        kept_open = self.get_connection(0)
+        max_age = self.get_connection(60)
+        not_connected = self.get_connection(0, connected=False)
+
+        with patch.object(fetch_executor.connections, 'all', return_value=[kept_open, max_age, not_connected]):
+            close_unusable_connections()
+
+        # Without a max age, the connection only closes once it is unusable
+        self.assertIsNone(kept_open.close_at)
+        self.assertEqual(max_age.close_at, 1)
+        self.assertEqual(not_connected.close_at, 1)
+        for conn in [kept_open, max_age, not_connected]:
+            conn.close_if_unusable_or_obsolete.assert_called_once_with()
+
+
+class RunFetchTest(TestCase):
+    @patch.object(fetch_executor, 'close_unusable_connections', spec_set=True)
+    def test_connections_closed(self, mock_close_unusable_connections):
+        self.assertEqual(run_fetch(lambda: 1), 1)
+        self.assertEqual(mock_close_unusable_connections.call_count, 2)
+
+    @patch.object(fetch_executor, 'close_unusable_connections', spec_set=True)
+    def test_connections_closed_on_error(self, mock_close_unusable_connections):
+        with self.assertRaises(ValueError):
+            run_fetch(Mock(side_effect=ValueError))
+        self.assertEqual(mock_close_unusable_connections.call_count, 2)
+
+
+@override_settings(ENTITY_EVENT_CONCURRENT_FETCH={'max_workers': 2})
+class FetchConcurrentlyInTransactionTest(TestCase):
+    def test_run_in_current_thread(self):
+        self.assertTrue(connection.in_atomic_block)
+        self.assertEqual(
+            fetch_concurrently({1: get_thread_name, 2: get_thread_name}, {'default'}),
+            {1: get_thread_name(), 2: get_thread_name()})
+
+
+class FetchConcurrentlyTest(TransactionTestCase):
+    def test_not_enabled(self):
+        self.assertEqual(
+            fetch_concurrently({1: get_thread_name, 2: get_thread_name}, {'default'}),
+            {1: get_thread_name(), 2: get_thread_name()})
+
+    @override_settings(ENTITY_EVENT_CONCURRENT_FETCH={'max_workers': 2})
+    def test_one_fetch_run_in_current_thread(self):
+        self.assertEqual(fetch_concurrently({1: get_thread_name}, {'default'}), {1: get_thread_name()})
+
+    @override_settings(ENTITY_EVENT_CONCURRENT_FETCH={'max_workers': 2})
+    def test_run_by_workers(self):
+        results = fetch_concurrently({1: get_thread_name, 2: get_thread_name}, {'default'})
+        self.assertEqual(set(results), {1, 2})
+        for thread_name in results.values():
+            self.assertTrue(thread_name.startswith('entity-event-fetch'))
+
+    @override_settings(ENTITY_EVENT_CONCURRENT_FETCH={'max_workers': 1})
+    def test_worker_connection_kept_open(self):
+        def get_connection():
+            connection.ensure_connection()
+            return connection.connection
+
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 0)
+        results = fetch_concurrently({1: get_connection, 2: get_connection}, {'default'})
+        self.assertIs(results[1], results[2])
+        self.assertFalse(results[1].closed)
+
+    @override_settings(ENTITY_EVENT_CONCURRENT_FETCH={'max_workers': 2})
+    def test_fetch_model_data(self):
+        m1 = G(test_models.TestModel)
+        m2 = G(test_models.TestFKModel)
+
+        self.assertEqual(context_loader.fetch_model_data({
+            test_models.TestModel: test_models.TestModel.objects,
+            test_models.TestFKModel: test_models.TestFKModel.objects,
+        }, {
+            test_models.TestModel: [m1.id],
+            test_models.TestFKModel: [m2.id],
+        }), {
+            test_models.TestModel: {m1.id: m1},
+            test_models.TestFKModel: {m2.id: m2},
+        })
@@ -0,0 +1,253 @@
+from uuid import UUID
+
+from datetime import datetime
+
+from django.db import connection, IntegrityError
+from django.test import override_settings, TestCase
+from django_dynamic_fixture import G
+
+from entity_event import context_loader
+from entity_event.fields import ContextDescriptor, hash_context, hash_uuid
+from entity_event.models import Event, EventContext, Source
+
+
+class HashUuidTest(TestCase):
+    def test_hash_uuid(self):
+        self.assertEqual(hash_uuid('abc'), UUID('900150983cd24fb0d6963f7d28e17f72'))
+
+    def test_matches_postgres(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT md5(%s)::uuid', ['üñîcødé uuid'])
+            self.assertEqual(cursor.fetchone()[0], hash_uuid('üñîcødé uuid'))
+
+
+class HashContextTest(TestCase):
+    def test_key_order_ignored(self):
+        self.assertEqual(hash_context({'a': 1, 'b': [1, 2]}), hash_context({'b': [1, 2], 'a': 1}))
+
+    def test_different_contexts(self):
+        self.assertNotEqual(hash_context({'a': 1}), hash_context({'a': '1'}))
+
+    def test_encodes_datetimes(self):
+        self.assertEqual(hash_context({'a': datetime(2020, 1, 1)}), hash_context({'a': '2020-01-01T00:00:00'}))
+
+
+class UuidHashFieldTest(TestCase):
+    def setUp(self):
+        super(UuidHashFieldTest, self).setUp()
+        self.source = G(Source)
+
+    def test_set_on_save(self):
+        e = Event.objects.create(source=self.source, context={}, uuid='1')
+        self.assertEqual(e.uuid_hash, hash_uuid('1'))
+
+        e.uuid = '2'
+        e.save()
+        self.assertEqual(Event.objects.get(id=e.id).uuid_hash, hash_uuid('2'))
+
+    def test_set_on_bulk_create(self):
+        Event.objects.bulk_create([
+            Event(source=self.source, context={}, uuid='1'),
+            Event(source=self.source, context={}, uuid='2'),
+        ])
+        self.assertEqual(
+            set(Event.objects.values_list('uuid_hash', flat=True)), {hash_uuid('1'), hash_uuid('2')})
+
+    def test_unique(self):
+        Event.objects.create(source=self.source, context={}, uuid='1')
+        with self.assertRaises(IntegrityError):
+            Event.objects.create(source=self.source, context={}, uuid='1')
+
+    def test_not_editable(self):
+        self.assertFalse(Event._meta.get_field('uuid_hash').editable)
+
+
+class JsonPathExistsTest(TestCase):
+    def test_path_exists(self):
+        source = G(Source)
+        e1 = G(Event, source=source, context={'projects': [1, 42]})
+        G(Event, source=source, context={'projects': [2]})
+        G(Event, source=source, context={'project': 42})
+
+        events = Event.objects.filter(context__path_exists='$.projects[*] ? (@ == 42)')
+
+        self.assertEqual(list(events), [e1])
+        self.assertIn('@? ', str(events.query))
+
+    def test_shared_context(self):
+        context = G(EventContext, hash=hash_context({'project': 42}), context={'project': 42})
+        self.assertEqual(list(EventContext.objects.filter(context__path_exists='$.project')), [context])
+
+
+@override_settings(ENTITY_EVENT_SHARED_CONTEXTS=True)
+class ContextFieldTest(TestCase):
+    def setUp(self):
+        super(ContextFieldTest, self).setUp()
+        self.source = G(Source)
+
+    def create_events(self, contexts, first_uuid=0):
+        return Event.objects.create_events([
+            {'source': self.source, 'context': context, 'uuid': str(i)}
+            for i, context in enumerate(contexts, first_uuid)
+        ])
+
+    def test_contexts_stored_once(self):
+        # Inserting the new shared contexts, looking up their ids and inserting the events
+        with self.assertNumQueries(3):
+            events = self.create_events([{'a': 1}, {'a': 1}, {'b': 2}])
+
+        self.assertEqual(EventContext.objects.count(), 2)
+        self.assertEqual(Event.objects.filter(context__isnull=True).count(), 3)
+        self.assertEqual(events[0].shared_context_id, events[1].shared_context_id)
+        self.assertEqual([e.context for e in events], [{'a': 1}, {'a': 1}, {'b': 2}])
+
+        # Existing shared contexts are reused
+        self.create_events([{'c': 3}, {'a': 1}], first_uuid=3)
+        self.assertEqual(EventContext.objects.count(), 3)
+
+    def test_descriptor(self):
+        self.assertIsInstance(Event.context, ContextDescriptor)
+
+    def test_no_events(self):
+        with self.assertNumQueries(0):
+            EventContext.objects.share_contexts([])
+
+    def test_read_transparently(self):
+        self.create_events([{'a': 1}])
+        event = Event.objects.get()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(event.context, {'a': 1})
+            self.assertEqual(event.context, {'a': 1})
+
+    def test_deferred(self):
+        self.create_events([{'a': 1}])
+        event = Event.objects.defer_context().get()
+
+        with self.assertNumQueries(2):
+            self.assertEqual(event.context, {'a': 1})
+
+    def test_loaded_in_bulk_as_copies(self):
+        self.create_events([{'a': 1}, {'a': 1}, {'b': 2}, {'a': 1}])
+        events = list(Event.objects.order_by('uuid'))
+        own_event = G(Event, context={'own': 'context'})
+        events.append(Event.objects.get(id=own_event.id))
+
+        with self.assertNumQueries(1):
+            context_loader.load_deferred_contexts(events)
+            self.assertEqual(
+                [e.context for e in events], [{'a': 1}, {'a': 1}, {'b': 2}, {'a': 1}, {'own': 'context'}])
+
+        events[0].context['a'] = 2
+        self.assertEqual(events[1].context, {'a': 1})
+
+    def test_save_unchanged_keeps_sharing(self):
+        self.create_events([{'a': 1}])
+        event = Event.objects.get()
+        event.context
+        event.save()
+
+        self.assertIsNone(Event.objects.values_list('context', flat=True).get())
+        self.assertEqual(Event.objects.get().context, {'a': 1})
+
+    def test_save_changed_stores_own_context(self):
+        self.create_events([{'a': 1}])
+        event = Event.objects.get()
+        event.context['a'] = 2
+        event.save()
+
+        self.assertEqual(Event.objects.values_list('context', flat=True).get(), {'a': 2})
+        self.assertEqual(Event.objects.get().context, {'a': 2})
+        self.assertEqual(EventContext.objects.get().context, {'a': 1})
+
+    def test_delete_unreferenced(self):
+        events = self.create_events([{'a': 1}, {'a': 1}, {'b': 2}])
+        Event.objects.filter(id__in=[events[0].id, events[2].id]).delete()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(EventContext.objects.delete_unreferenced(), 1)
+
+        self.assertEqual(EventContext.objects.get().context, {'a': 1})
+        self.assertEqual(Event.objects.get().context, {'a': 1})
+
+        # The last event sharing the context lets it be deleted
+        Event.objects.all().delete()
+        self.assertEqual(EventContext.objects.delete_unreferenced(), 1)
+        self.assertFalse(EventContext.objects.exists())
+
+    def test_not_shared(self):
+        with override_settings(ENTITY_EVENT_SHARED_CONTEXTS=False):
+            self.create_events([{'a': 1}])
+
+        self.assertFalse(EventContext.objects.exists())
+        self.assertEqual(Event.objects.values_list('context', flat=True).get(), {'a': 1})
+
+
+@override_settings(ENTITY_EVENT_CONTEXT_CODEC='zlib-json')
+class EncodedContextFieldTest(TestCase):
+    def setUp(self):
+        super(EncodedContextFieldTest, self).setUp()
+        self.source = G(Source)
+
+    def test_encoded_by_create_events(self):
+        events = Event.objects.create_events([
+            {'source': self.source, 'context': {'i': i, 'text': 'large ' * 100}, 'uuid': str(i)} for i in range(3)
+        ])
+        self.assertEqual(events[0].context, {'i': 0, 'text': 'large ' * 100})
+
+        self.assertEqual(
+            list(Event.objects.values_list('context', 'context_codec')), [(None, 'zlib-json')] * 3)
+        self.assertLess(len(Event.objects.values_list('context_data', flat=True)[0]), 100)
+
+    def test_decoded_on_access(self):
+        G(Event, context={'a': 1})
+        event = Event.objects.get()
+
+        self.assertIsNone(event.__dict__['context'])
+        with self.assertNumQueries(0):
+            self.assertEqual(event.context, {'a': 1})
+            self.assertEqual(event.__dict__['context'], {'a': 1})
+
+    def test_deferred(self):
+        G(Event, context={'a': 1})
+        events = list(Event.objects.defer_context())
+
+        with self.assertNumQueries(1):
+            context_loader.load_deferred_contexts(events)
+        with self.assertNumQueries(0):
+            self.assertEqual(events[0].context, {'a': 1})
+
+    def test_save_changed(self):
+        G(Event, context={'a': 1})
+        event = Event.objects.get()
+        event.context['a'] = 2
+        event.save()
+
+        self.assertEqual(Event.objects.get().context, {'a': 2})
+        self.assertIsNone(Event.objects.values_list('context', flat=True).get())
+
+    def test_save_not_accessed(self):
+        G(Event, context={'a': 1})
+        event = Event.objects.get()
+        event.save()
+
+        self.assertEqual(Event.objects.get().context, {'a': 1})
+
+    def test_existing_contexts_still_read(self):
+        G(Event, context={'a': 1}, uuid='1')
+        with override_settings(ENTITY_EVENT_CONTEXT_CODEC=None):
+            G(Event, context={'b': 2}, uuid='2')
+        with override_settings(ENTITY_EVENT_CONTEXT_CODEC='msgpack'):
+            G(Event, context={'c': 3}, uuid='3')
+
+        self.assertEqual([e.context for e in Event.objects.order_by('uuid')], [{'a': 1}, {'b': 2}, {'c': 3}])
+        self.assertEqual(
+            list(Event.objects.order_by('uuid').values_list('context_codec', flat=True)),
+            ['zlib-json', None, 'msgpack'])
+
+    @override_settings(ENTITY_EVENT_SHARED_CONTEXTS=True)
+    def test_shared_contexts_not_encoded(self):
+        Event.objects.create_events([{'source': self.source, 'context': {'a': 1}, 'uuid': '1'}])
+
+        self.assertIsNone(Event.objects.values_list('context_codec', flat=True).get())
+        self.assertEqual(Event.objects.get().context, {'a': 1})
@@ -1,13 +1,16 @@
 from datetime import datetime
 
+from django.db import connection
 from django.template import Template
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django_dynamic_fixture import N, G
 from entity.models import Entity, EntityKind, EntityRelationship
 from freezegun import freeze_time
 from unittest.mock import patch, call, Mock
 from six import text_type
 
+from entity_event import context_loader
 from entity_event.models import (
     Medium, Source, SourceGroup, Unsubscription, Subscription, Event, EventActor, EventSeen,
     RenderingStyle, ContextRenderer, _unseen_event_ids, SubscriptionQuerySet,
@@ -42,6 +45,29 @@ class EventRenderTest(TestCase):
         self.assertEqual(txt, 'Test text template with value 100')
         self.assertEqual(html, 'Test html template with value suppressed')
 
+    @freeze_time('2020-01-01')
+    def test_template_assignments_not_kept(self):
+        rg = G(RenderingStyle)
+        s = G(Source)
+        G(
+            ContextRenderer, source=s, rendering_style=rg, text_template='{{ value }}{{ year }}{% now "Y" as year %}',
+            html_template='{{ value }}', context_hints={})
+        m = G(Medium, rendering_style=rg, additional_context={'value': 'medium'})
+        m2 = G(Medium, rendering_style=rg, additional_context=None)
+        G(Event, source=s, context={'value': 'event'})
+
+        # The year assigned by a render is not seen by the next one
+        events = Event.objects.all().load_contexts_and_renderers(m)
+        self.assertEqual(events[0].render(m), ('medium', 'medium'))
+        self.assertEqual(events[0].render(m), ('medium', 'medium'))
+        self.assertEqual(m.additional_context, {'value': 'medium'})
+
+        # Without additional context, the variables are not written into the raw context either
+        events = Event.objects.all().load_contexts_and_renderers(m2)
+        self.assertEqual(events[0].render(m2), ('event', 'event'))
+        self.assertEqual(events[0].render(m2), ('event', 'event'))
+        self.assertEqual(events[0].context, {'value': 'event'})
+
     def test_one_context_renderer_one_medium(self):
         rg = G(RenderingStyle)
         s = G(Source)
@@ -64,6 +90,32 @@ class EventRenderTest(TestCase):
         self.assertEqual(txt, 'Test text template with value 100')
         self.assertEqual(html, 'Test html template with value 100')
 
+    def test_multiple_mediums(self):
+        rg = G(RenderingStyle)
+        s = G(Source)
+        G(
+            ContextRenderer, source=s, rendering_style=rg, text_template='{{ fk_model.value }}',
+            html_template='{% if suppress_value %}suppressed{% else %}{{ fk_model.value }}{% endif %}',
+            context_hints={
+                'fk_model': {
+                    'app_name': 'tests',
+                    'model_name': 'TestFKModel',
+                }
+            })
+        m1 = G(Medium, rendering_style=rg)
+        m2 = G(Medium, rendering_style=rg, additional_context={'suppress_value': True})
+
+        fkm = G(TestFKModel, value=100)
+        G(Event, source=s, context={'fk_model': fkm.id})
+
+        events = context_loader.load_contexts_and_renderers(list(Event.objects.all()), [m1, m2])
+
+        # The additional context of a medium is layered over the loaded context without modifying it
+        self.assertEqual(events[0].render(m2), ('100', 'suppressed'))
+        self.assertEqual(events[0].render(m1), ('100', '100'))
+        self.assertEqual(events[0].loaded_context, {'fk_model': fkm})
+        self.assertEqual(events[0].context, {'fk_model': fkm.id})
+
     def test_wo_fetching_contexts(self):
         rg = G(RenderingStyle)
         s = G(Source)
@@ -269,6 +321,110 @@ class EventManagerCreateEventTest(TestCase):
         self.assertEqual(len(events), 0)
 
 
+class EventManagerDeferContextTest(TestCase):
+    def test_defer_context(self):
+        e = G(Event, context={'large': 'context'})
+
+        with self.assertNumQueries(1):
+            event = Event.objects.defer_context().get()
+        self.assertEqual(event, e)
+        self.assertEqual(event.get_deferred_fields(), {'context', 'context_data'})
+
+        # Accessing the context directly loads it
+        with self.assertNumQueries(1):
+            self.assertEqual(event.context, {'large': 'context'})
+
+
+class EventActorIdsTest(TestCase):
+    def setUp(self):
+        super(EventActorIdsTest, self).setUp()
+        self.source = G(Source)
+        self.actor1 = G(Entity)
+        self.actor2 = G(Entity)
+
+    def test_filled_by_create_events(self):
+        events = Event.objects.create_events([
+            {'source': self.source, 'context': {}, 'uuid': '1', 'actors': [self.actor1, self.actor2.id, self.actor1]},
+            {'source': self.source, 'context': {}, 'uuid': '2'},
+        ])
+
+        self.assertEqual(events[0].actor_ids, [self.actor1.id, self.actor2.id])
+        self.assertEqual(
+            list(Event.objects.order_by('uuid').values_list('actor_ids', flat=True)),
+            [[self.actor1.id, self.actor2.id], []])
+
+    def test_saved_event_actor_added(self):
+        event = G(Event, context={})
+        G(EventActor, event=event, entity=self.actor1)
+        EventActor.objects.get().save()
+
+        self.assertEqual(Event.objects.get().actor_ids, [self.actor1.id])
+
+    def test_refresh_actor_ids(self):
+        event = Event.objects.create_event(source=self.source, context={}, uuid='1', actors=[self.actor1, self.actor2])
+        Event.objects.create_event(source=self.source, context={}, uuid='2')
+        EventActor.objects.filter(entity=self.actor1).delete()
+        G(EventActor, event=event, entity=self.actor2)
+
+        Event.objects.all().refresh_actor_ids()
+
+        self.assertEqual(
+            list(Event.objects.order_by('uuid').values_list('actor_ids', flat=True)), [[self.actor2.id], []])
+
+
+class EventSourceGroupTest(TestCase):
+    def setUp(self):
+        super(EventSourceGroupTest, self).setUp()
+        self.source = G(Source)
+        self.group = G(SourceGroup)
+
+    def test_filled_on_save(self):
+        event = G(Event, context={}, source=self.source)
+        self.assertEqual(Event.objects.get(id=event.id).source_group_id, self.source.group_id)
+
+    def test_filled_by_create_events_from_source_ids(self):
+        source2 = G(Source)
+
+        # The sources are fetched in one query before the events are inserted
+        with self.assertNumQueries(2):
+            Event.objects.create_events([
+                {'source_id': self.source.id, 'context': {}, 'uuid': '1'},
+                {'source_id': source2.id, 'context': {}, 'uuid': '2'},
+                {'source': self.source, 'context': {}, 'uuid': '3'},
+            ])
+
+        self.assertEqual(
+            list(Event.objects.order_by('uuid').values_list('source_group_id', flat=True)),
+            [self.source.group_id, source2.group_id, self.source.group_id])
+
+    def test_source_group_changed(self):
+        Event.objects.create_event(source=self.source, context={}, uuid='1')
+
+        self.source.group = self.group
+        self.source.save()
+
+        self.assertEqual(Event.objects.get().source_group, self.group)
+
+    def test_refresh_source_groups(self):
+        Event.objects.create_event(source=self.source, context={}, uuid='1')
+        Source.objects.filter(id=self.source.id).update(group=self.group)
+
+        Event.objects.all().refresh_source_groups()
+
+        self.assertEqual(Event.objects.get().source_group, self.group)
+
+
+class EventManagerWithUuidsTest(TestCase):
+    def test_with_uuids(self):
+        source = G(Source)
+        e1 = Event.objects.create_event(context={}, source=source, uuid='1')
+        e2 = Event.objects.create_event(context={}, source=source, uuid='2')
+        Event.objects.create_event(context={}, source=source, uuid='3')
+
+        self.assertEqual(set(Event.objects.with_uuids(['1', '2', '4'])), {e1, e2})
+        self.assertEqual(list(Event.objects.all().with_uuids([])), [])
+
+
 class EventManagerQuerySetTest(TestCase):
     def setUp(self):
         # Call the super setup
@@ -441,6 +597,26 @@ class MediumEventsInterfacesTest(TestCase):
         self.assertEqual(len(events_targets[0][1]), 1)
 
 
+@override_settings(ENTITY_EVENT_ACTOR_IDS=True)
+class MediumEventsInterfacesActorIdsTest(MediumEventsInterfacesTest):
+    """
+    Runs the event interface tests with events filtered on their actor ids.
+    """
+    def test_events_only_following_without_event_actors(self):
+        self.assertNotIn('eventactor', str(self.medium_y.events().query))
+
+    def test_actor_filter_from_list(self):
+        self.assertEqual(
+            list(Event.objects.filter(self.medium_y.get_actor_filter([self.p1])).values_list('actor_ids', flat=True)),
+            [[self.p1.id]])
+
+    def test_entity_targets_only_following_reads_actor_ids(self):
+        with CaptureQueriesContext(connection) as queries:
+            events_targets = self.medium_z.events_targets(entity_kind=self.person_kind)
+        self.assertEqual(len(events_targets[0][1]), 1)
+        self.assertFalse([query for query in queries if 'entity_event_eventactor' in query['sql']])
+
+
 class MediumTest(TestCase):
 
     def test_events_targets_start_time(self):
@@ -497,6 +673,36 @@ class MediumRenderTest(TestCase):
         e2.render.assert_called_once_with(medium)
 
 
+class MediumManagerRenderManyTest(TestCase):
+    def test_render_many(self):
+        s = G(Source)
+        rs1 = G(RenderingStyle)
+        rs2 = G(RenderingStyle)
+        context_hints = {
+            'fk_model': {
+                'app_name': 'tests',
+                'model_name': 'TestFKModel',
+            }
+        }
+        G(ContextRenderer, source=s, rendering_style=rs1, text_template='short {{ fk_model.value }}',
+          context_hints=context_hints)
+        G(ContextRenderer, source=s, rendering_style=rs2, text_template='long {{ fk_model.value }}',
+          html_template='<p>long {{ fk_model.value }}</p>', context_hints=context_hints)
+        m1 = G(Medium, rendering_style=rs1)
+        m2 = G(Medium, rendering_style=rs2)
+        e = G(Event, source=s, context={'fk_model': G(TestFKModel, value=100).id})
+        events = list(Event.objects.all())
+
+        # The context renderers of both mediums and the hinted models are fetched once
+        with self.assertNumQueries(2):
+            res = Medium.objects.render_many(events, [m1, m2])
+
+        self.assertEqual(res, {
+            m1: {e: ('short 100', '')},
+            m2: {e: ('long 100', '<p>long 100</p>')},
+        })
+
+
 class MediumSubsetSubscriptionsTest(TestCase):
     def setUp(self):
         person = G(EntityKind, name='person', display_name='Person')
@@ -553,6 +759,26 @@ class MediumGetFilteredEventsTest(TestCase):
         events = self.medium.get_filtered_events(seen=False)
         self.assertEqual(set(events), {unseen_e, seen_from_medium_event, seen_from_other_medium_e})
 
+    def test_defer_context(self):
+        e = G(Event, context={'large': 'context'}, source=self.source)
+
+        events = list(self.medium.get_filtered_events(defer_context=True))
+        self.assertEqual(events, [e])
+        self.assertEqual(events[0].get_deferred_fields(), {'context', 'context_data'})
+
+    def test_defer_context_mark_seen(self):
+        G(Event, context={'large': 'context'}, source=self.source)
+
+        events = list(self.medium.get_filtered_events(seen=False, mark_seen=True, defer_context=True))
+        self.assertEqual(events[0].get_deferred_fields(), {'context', 'context_data'})
+        self.assertTrue(EventSeen.objects.filter(event=events[0], medium=self.medium).exists())
+
+    def test_events_defer_context(self):
+        G(Event, context={'large': 'context'}, source=self.source)
+
+        events = list(self.medium.events(defer_context=True))
+        self.assertEqual(events[0].get_deferred_fields(), {'context', 'context_data'})
+
 
 class MediumGetEventFiltersTest(TestCase):
     def setUp(self):
@@ -784,6 +1010,77 @@ class MediumGetEventFiltersTest(TestCase):
         )
         self.assertEqual(events.count(), 1)
 
+    @override_settings(ENTITY_EVENT_ACTOR_IDS=True)
+    def test_actor_ids(self):
+        events = self.medium.get_filtered_events_queryset(
+            start_time=None,
+            end_time=None,
+            seen=None,
+            include_expired=True,
+            actor=self.actor
+        )
+        self.assertEqual(list(events), [self.event1])
+        self.assertNotIn('eventactor', str(events.query))
+
+    def test_source_group(self):
+        events = self.medium.get_filtered_events_queryset(
+            start_time=None,
+            end_time=None,
+            seen=None,
+            include_expired=True,
+            actor=None,
+            source_group=self.source2.group
+        )
+        self.assertEqual(set(events), {self.event4, self.event5})
+        self.assertNotIn('entity_event_source', str(events.query))
+
+    def test_context_contains(self):
+        event = G(Event, context={'project': 42, 'name': 'event'}, source=self.source)
+        G(Event, context={'project': 43}, source=self.source)
+
+        events = self.medium.get_filtered_events_queryset(
+            start_time=None,
+            end_time=None,
+            seen=None,
+            include_expired=True,
+            actor=None,
+            context_contains={'project': 42}
+        )
+        self.assertEqual(list(events), [event])
+
+    def test_context_path(self):
+        event = G(Event, context={'projects': [1, 42]}, source=self.source)
+        G(Event, context={'projects': [43]}, source=self.source)
+
+        events = self.medium.get_filtered_events_queryset(
+            start_time=None,
+            end_time=None,
+            seen=None,
+            include_expired=True,
+            actor=None,
+            context_path='$.projects[*] ? (@ == 42)'
+        )
+        self.assertEqual(list(events), [event])
+        self.assertNotIn('entity_event_eventcontext', str(events.query))
+
+    @override_settings(ENTITY_EVENT_SHARED_CONTEXTS=True)
+    def test_context_path_shared_contexts(self):
+        Event.objects.create_events([
+            {'source': self.source, 'context': {'projects': [42]}, 'uuid': '1'},
+            {'source': self.source, 'context': {'projects': [42]}, 'uuid': '2'},
+            {'source': self.source, 'context': {'projects': [43]}, 'uuid': '3'},
+        ])
+
+        events = self.medium.get_filtered_events_queryset(
+            start_time=None,
+            end_time=None,
+            seen=None,
+            include_expired=True,
+            actor=None,
+            context_path='$.projects[*] ? (@ == 42)'
+        )
+        self.assertEqual({e.uuid for e in events}, {'1', '2'})
+
 
 class MediumFollowedByTest(TestCase):
     def setUp(self):
@@ -0,0 +1,212 @@
+from django.db.models.signals import post_delete, post_save
+from django.test import TestCase, override_settings
+from django_dynamic_fixture import G
+from unittest.mock import patch
+
+from entity_event import context_loader, object_cache
+from entity_event.models import ContextRenderer, Event, Medium, RenderingStyle, Source
+from entity_event.object_cache import get_object_cache, ObjectCache, ObjectCacheStats, reset_object_cache
+from entity_event.tests import models as test_models
+
+
+class ObjectCacheStatsTest(TestCase):
+    def test_no_lookups(self):
+        self.assertEqual(ObjectCacheStats().hit_rate, 0)
+
+    def test_hit_rate(self):
+        stats = ObjectCacheStats()
+        stats.num_lookups = 4
+        stats.num_hits = 3
+        self.assertEqual(stats.num_misses, 1)
+        self.assertEqual(stats.hit_rate, 0.75)
+
+
+class ObjectCacheTest(TestCase):
+    def setUp(self):
+        super(ObjectCacheTest, self).setUp()
+        self.cache = ObjectCache(max_size=2, timeout=60)
+
+    def test_get_and_set(self):
+        self.assertFalse(self.cache.holds(test_models.TestModel))
+        self.cache.set_many(test_models.TestModel, {1: 'one', 2: 'two'})
+
+        self.assertTrue(self.cache.holds(test_models.TestModel))
+        self.assertFalse(self.cache.holds(test_models.TestFKModel))
+        self.assertEqual(self.cache.get_many(test_models.TestModel, [1, 2, 3]), {1: 'one', 2: 'two'})
+        self.assertEqual(self.cache.get_many(test_models.TestFKModel, [1]), {})
+        self.assertEqual(self.cache.stats.num_lookups, 4)
+        self.assertEqual(self.cache.stats.num_hits, 2)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.set_many(test_models.TestModel, {1: 'one', 2: 'two'})
+        self.cache.get_many(test_models.TestModel, [1])
+        self.cache.set_many(test_models.TestModel, {3: 'three'})
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get_many(test_models.TestModel, [1, 2, 3]), {1: 'one', 3: 'three'})
+        self.assertEqual(self.cache.stats.num_evictions, 1)
+
+    @patch.object(object_cache, 'monotonic')
+    def test_expired(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.cache.set_many(test_models.TestModel, {1: 'one'})
+        self.cache.set_many(test_models.TestModel, {2: 'two'}, timeout=10)
+
+        mock_monotonic.return_value = 110
+        self.assertEqual(self.cache.get_many(test_models.TestModel, [1, 2]), {1: 'one'})
+        self.assertEqual(len(self.cache), 1)
+
+    def test_shapes(self):
+        self.cache.set_many(test_models.TestModel, {1: 'one'})
+        self.cache.set_many(test_models.TestModel, {1: {'id': 1}}, shape='values')
+
+        self.assertEqual(self.cache.get_many(test_models.TestModel, [1]), {1: 'one'})
+        self.assertEqual(self.cache.get_many(test_models.TestModel, [1], 'values'), {1: {'id': 1}})
+        self.assertEqual(self.cache.get_many(test_models.TestModel, [1], 'only'), {})
+
+        # Deleting an object drops it in all of its shapes
+        self.cache.delete(test_models.TestModel, 1)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats.num_invalidations, 2)
+
+    def test_delete_and_clear(self):
+        self.cache.set_many(test_models.TestModel, {1: 'one', 2: 'two'})
+        self.cache.delete(test_models.TestModel, 1)
+        self.cache.delete(test_models.TestModel, 3)
+
+        self.assertEqual(self.cache.get_many(test_models.TestModel, [1, 2]), {2: 'two'})
+        self.assertEqual(self.cache.stats.num_invalidations, 1)
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+
+class GetObjectCacheTest(TestCase):
+    def tearDown(self):
+        reset_object_cache()
+        super(GetObjectCacheTest, self).tearDown()
+
+    def test_not_configured(self):
+        self.assertIsNone(get_object_cache())
+
+    def test_built_once(self):
+        with override_settings(ENTITY_EVENT_OBJECT_CACHE={'max_size': 5, 'timeout': 10}):
+            cache = get_object_cache()
+            self.assertEqual(cache.max_size, 5)
+            self.assertEqual(cache.timeout, 10)
+            self.assertIs(get_object_cache(), cache)
+
+            with override_settings(DEBUG=True):
+                self.assertIs(get_object_cache(), cache)
+
+        # Changing the setting discards the cache
+        self.assertIsNone(object_cache._object_cache)
+
+    @override_settings(ENTITY_EVENT_OBJECT_CACHE={'max_size': 5})
+    def test_invalidated_by_changes(self):
+        m1 = G(test_models.TestModel)
+        m2 = G(test_models.TestModel)
+        cache = get_object_cache()
+        cache.set_many(test_models.TestModel, {m1.id: m1, m2.id: m2})
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            m1.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(cache.get_many(test_models.TestModel, [m1.id, m2.id]), {m2.id: m2})
+
+        # The object is dropped again on commit, in case another thread cached it in the meantime
+        m2_id = m2.id
+        with self.captureOnCommitCallbacks(execute=True):
+            m2.delete()
+            self.assertEqual(cache.get_many(test_models.TestModel, [m2_id]), {})
+            cache.set_many(test_models.TestModel, {m2_id: m2})
+        self.assertEqual(cache.get_many(test_models.TestModel, [m2_id]), {})
+
+    @override_settings(ENTITY_EVENT_OBJECT_CACHE={'max_size': 5})
+    def test_only_cached_models_connected(self):
+        def is_connected(signal, model):
+            lookup_key = ('entity_event_invalidate_cached_object', id(model))
+            return any(receiver[0] == lookup_key for receiver in signal.receivers)
+
+        for signal in (post_save, post_delete):
+            self.addCleanup(
+                signal.disconnect,
+                sender=test_models.TestFKModel2, dispatch_uid='entity_event_invalidate_cached_object')
+        self.assertFalse(is_connected(post_delete, test_models.TestFKModel2))
+
+        get_object_cache().set_many(test_models.TestFKModel2, {})
+
+        self.assertTrue(is_connected(post_save, test_models.TestFKModel2))
+        self.assertTrue(is_connected(post_delete, test_models.TestFKModel2))
+        self.assertFalse(is_connected(post_delete, Event))
+        self.assertFalse(is_connected(post_delete, None))
+
+    @override_settings(ENTITY_EVENT_OBJECT_CACHE={'max_size': 5})
+    def test_uncached_models_not_tracked(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            G(test_models.TestModel)
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(ENTITY_EVENT_OBJECT_CACHE={'max_size': 10})
+class LoadContextsAndRenderersWithObjectCacheTest(TestCase):
+    def test_cached_hints(self):
+        m1 = G(test_models.TestModel)
+        m2 = G(test_models.TestFKModel)
+        s = G(Source)
+        rs = G(RenderingStyle)
+        medium = G(Medium, rendering_style=rs)
+        G(ContextRenderer, rendering_style=rs, source=s, context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+                'cache': True,
+            },
+            'key2': {
+                'model_name': 'TestFKModel',
+                'app_name': 'tests',
+            },
+        })
+        G(Event, context={'key': m1.id, 'key2': m2.id}, source=s)
+        context_loader.load_contexts_and_renderers(list(Event.objects.all()), [medium])
+
+        # Only the uncached model is fetched along with the context renderers
+        events = list(Event.objects.all())
+        with self.assertNumQueries(2):
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        self.assertEqual(events[0].loaded_context, {'key': m1, 'key2': m2})
+        self.assertEqual(get_object_cache().stats.hit_rate, 0.5)
+
+    def test_shapes_not_shared(self):
+        fk = G(test_models.TestFKModel, value='fk')
+        m1 = G(test_models.TestModel, fk=fk)
+        s = G(Source)
+        rs1 = G(RenderingStyle)
+        rs2 = G(RenderingStyle)
+        medium1 = G(Medium, rendering_style=rs1)
+        medium2 = G(Medium, rendering_style=rs2)
+        G(ContextRenderer, rendering_style=rs1, source=s, context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+                'values': ['value'],
+                'cache': True,
+            },
+        })
+        G(ContextRenderer, rendering_style=rs2, source=s, context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+                'cache': True,
+            },
+        })
+        G(Event, context={'key': m1.id}, source=s)
+
+        events = context_loader.load_contexts_and_renderers(list(Event.objects.all()), [medium1])
+        self.assertEqual(events[0].loaded_context, {'key': {'id': m1.id, 'value': m1.value}})
+
+        # The instances hinted by the other renderer are not the cached dictionaries
+        events = context_loader.load_contexts_and_renderers(list(Event.objects.all()), [medium2])
+        self.assertEqual(events[0].loaded_context, {'key': m1})
+        self.assertEqual(events[0].loaded_context['key'].fk.value, 'fk')
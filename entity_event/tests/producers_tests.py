@@ -0,0 +1,255 @@
+from queue import Full
+from time import monotonic, sleep
+
+from django.db import close_old_connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django_dynamic_fixture import G
+from entity.models import Entity
+from unittest.mock import Mock, patch
+
+from entity_event.middleware import DeferredEventsMiddleware
+from entity_event.models import Event, EventActor, Source
+from entity_event.producers import (
+    create_deferred_events, defer_event, defer_events, EventBuffer, EventBufferStats
+)
+
+
+class EventBufferStatsTest(TestCase):
+    def test_empty(self):
+        stats = EventBufferStats()
+        self.assertEqual(stats.mean_batch_size, 0)
+        self.assertEqual(stats.mean_flush_latency, 0)
+        self.assertEqual(stats.max_flush_latency, 0)
+
+    def test_record(self):
+        stats = EventBufferStats(max_samples=2)
+        stats.record_flush(10, 0.5)
+        stats.record_flush(20, 0.1)
+        stats.record_flush(30, 0.3)
+        stats.record_failure(5)
+
+        self.assertEqual(stats.num_flushes, 3)
+        self.assertEqual(stats.num_events, 60)
+        self.assertEqual(stats.num_failed_flushes, 1)
+        self.assertEqual(stats.num_failed_events, 5)
+        self.assertEqual(list(stats.batch_sizes), [20, 30])
+        self.assertEqual(stats.mean_batch_size, 25)
+        self.assertAlmostEqual(stats.mean_flush_latency, 0.2)
+        self.assertEqual(stats.max_flush_latency, 0.3)
+
+
+class EventBufferTest(TestCase):
+    def setUp(self):
+        super(EventBufferTest, self).setUp()
+        self.source = G(Source)
+
+    def test_flush(self):
+        actor = G(Entity)
+        on_flush = Mock()
+        event_buffer = EventBuffer(max_batch_size=2, on_flush=on_flush)
+        for i in range(3):
+            event_buffer.create_event(source=self.source, context={'i': i}, uuid=str(i), actors=[actor])
+        self.assertEqual(len(event_buffer), 3)
+
+        # Each batch is created in a savepoint
+        with self.assertNumQueries(8):
+            event_buffer.flush()
+
+        self.assertEqual(len(event_buffer), 0)
+        self.assertEqual(set(Event.objects.values_list('uuid', flat=True)), {'0', '1', '2'})
+        self.assertEqual(EventActor.objects.filter(entity=actor).count(), 3)
+        self.assertEqual(event_buffer.stats.num_flushes, 2)
+        self.assertEqual(list(event_buffer.stats.batch_sizes), [2, 1])
+        self.assertEqual([c[0][0] for c in on_flush.call_args_list], [2, 1])
+
+    def test_flush_ignore_duplicates(self):
+        Event.objects.create_event(source=self.source, context={}, uuid='1')
+        event_buffer = EventBuffer()
+        event_buffer.create_event(source=self.source, context={}, uuid='1', ignore_duplicates=True)
+        event_buffer.create_event(source=self.source, context={}, uuid='2', ignore_duplicates=True)
+        event_buffer.flush()
+
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_flush_failure(self):
+        Event.objects.create_event(source=self.source, context={}, uuid='1')
+        event_buffer = EventBuffer()
+        event_buffer.create_event(source=self.source, context={}, uuid='1')
+        event_buffer.create_event(source=self.source, context={}, uuid='2')
+
+        with patch('entity_event.producers.logger') as mock_logger:
+            event_buffer.flush()
+
+        self.assertEqual(mock_logger.exception.call_count, 1)
+        self.assertEqual(event_buffer.stats.num_failed_flushes, 1)
+        self.assertEqual(event_buffer.stats.num_failed_events, 2)
+        self.assertEqual(event_buffer.stats.num_flushes, 0)
+        self.assertEqual(Event.objects.count(), 1)
+
+    def test_backpressure(self):
+        event_buffer = EventBuffer(max_buffered_events=1, put_timeout=0.01)
+        event_buffer.create_event(source=self.source, context={}, uuid='1')
+        with self.assertRaises(Full):
+            event_buffer.create_event(source=self.source, context={}, uuid='2')
+
+    def test_get_batch_blocking_waits_for_latency(self):
+        event_buffer = EventBuffer(max_batch_size=10, max_latency=0.01)
+        self.assertEqual(event_buffer.get_batch(block=True), [])
+
+        event_buffer.create_event(source=self.source, context={}, uuid='1')
+        self.assertEqual(len(event_buffer.get_batch(block=True)), 1)
+
+    def test_get_batch_blocking_stops_at_deadline(self):
+        event_buffer = EventBuffer(max_batch_size=10, max_latency=0)
+        event_buffer.create_event(source=self.source, context={}, uuid='1')
+        event_buffer.create_event(source=self.source, context={}, uuid='2')
+        self.assertEqual(len(event_buffer.get_batch(block=True)), 1)
+
+    def test_flush_empty_batch(self):
+        event_buffer = EventBuffer()
+        with self.assertNumQueries(0):
+            event_buffer.flush_batch([])
+
+    def test_stop_without_start_flushes(self):
+        event_buffer = EventBuffer()
+        event_buffer.create_event(source=self.source, context={}, uuid='1')
+        event_buffer.stop()
+        self.assertTrue(Event.objects.filter(uuid='1').exists())
+
+
+class EventBufferThreadTest(TransactionTestCase):
+    def test_background_flush_and_stop(self):
+        source = G(Source)
+        event_buffer = EventBuffer(max_batch_size=2, max_latency=0.05)
+
+        with patch('entity_event.producers.atexit') as mock_atexit, patch(
+            'entity_event.producers.close_old_connections', wraps=close_old_connections
+        ) as mock_close_old_connections:
+            event_buffer.start()
+            # Starting an already running buffer does nothing
+            event_buffer.start()
+            self.assertEqual(mock_atexit.register.call_count, 1)
+
+            event_buffer.create_event(source=source, context={}, uuid='1')
+            deadline = monotonic() + 5
+            while not event_buffer.stats.num_flushes and monotonic() < deadline:
+                sleep(0.01)
+            self.assertEqual(event_buffer.stats.num_flushes, 1)
+
+            event_buffer.create_event(source=source, context={}, uuid='2')
+            event_buffer.create_event(source=source, context={}, uuid='3')
+            event_buffer.stop()
+            mock_atexit.unregister.assert_called_once_with(event_buffer.stop)
+
+            # Old connections are closed around each batch of the thread
+            self.assertGreaterEqual(mock_close_old_connections.call_count, 2)
+
+        self.assertEqual(set(Event.objects.values_list('uuid', flat=True)), {'1', '2', '3'})
+        self.assertEqual(event_buffer.stats.num_events, 3)
+
+
+class DeferEventsTest(TestCase):
+    def setUp(self):
+        super(DeferEventsTest, self).setUp()
+        self.source = G(Source)
+        self.actor = G(Entity)
+
+    def test_not_deferring(self):
+        self.assertFalse(defer_event({}))
+
+    def test_events_created_in_one_batch_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(0):
+                with defer_events():
+                    for i in range(10):
+                        e = Event.objects.create_event(
+                            source=self.source, context={'i': i}, uuid=str(i), actors=[self.actor])
+                        self.assertIsNone(e)
+
+        self.assertFalse(Event.objects.exists())
+
+        # The batch insert and actor insert, wrapped in a savepoint
+        with self.assertNumQueries(4):
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(Event.objects.count(), 10)
+        self.assertEqual(EventActor.objects.filter(entity=self.actor).count(), 10)
+
+    def test_rolled_back_events_are_dropped(self):
+        class RollbackException(Exception):
+            pass
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with defer_events():
+                Event.objects.create_event(source=self.source, context={}, uuid='1')
+                try:
+                    with transaction.atomic():
+                        Event.objects.create_event(source=self.source, context={}, uuid='2')
+                        raise RollbackException()
+                except RollbackException:
+                    pass
+
+        self.assertEqual(list(Event.objects.values_list('uuid', flat=True)), ['1'])
+
+    def test_exception_keeps_committed_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                with defer_events():
+                    Event.objects.create_event(source=self.source, context={}, uuid='1')
+                    raise ValueError()
+
+        # The transaction of the event still committed
+        self.assertEqual(list(Event.objects.values_list('uuid', flat=True)), ['1'])
+
+        # Events are created right away again after leaving the block
+        self.assertIsNotNone(Event.objects.create_event(source=self.source, context={}, uuid='2'))
+
+    def test_exception_in_rolled_back_transaction_drops_events(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(ValueError):
+                with transaction.atomic(), defer_events():
+                    Event.objects.create_event(source=self.source, context={}, uuid='1')
+                    raise ValueError()
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Event.objects.exists())
+
+    def test_created_atomically(self):
+        with patch('entity_event.producers.transaction.atomic', wraps=transaction.atomic) as mock_atomic:
+            create_deferred_events([{'source': self.source, 'context': {}, 'uuid': '1', 'actors': [self.actor]}])
+
+        mock_atomic.assert_any_call()
+        self.assertEqual(EventActor.objects.filter(entity=self.actor).count(), 1)
+
+    def test_nested(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with defer_events():
+                Event.objects.create_event(source=self.source, context={}, uuid='1')
+                with defer_events():
+                    Event.objects.create_event(source=self.source, context={}, uuid='2')
+                self.assertFalse(Event.objects.exists())
+
+        self.assertEqual(len([c for c in callbacks if c.func == create_deferred_events]), 1)
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_nothing_deferred(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(0):
+                with defer_events():
+                    pass
+
+
+class DeferredEventsMiddlewareTest(TestCase):
+    def test_call(self):
+        source = G(Source)
+
+        def get_response(request):
+            Event.objects.create_event(source=source, context={}, uuid='1')
+            self.assertFalse(Event.objects.exists())
+            return 'response'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(DeferredEventsMiddleware(get_response)(Mock()), 'response')
+
+        self.assertTrue(Event.objects.filter(uuid='1').exists())
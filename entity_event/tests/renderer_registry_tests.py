@@ -0,0 +1,184 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django_dynamic_fixture import G
+from unittest.mock import Mock, patch
+
+from entity_event import context_loader, renderer_registry
+from entity_event.models import ContextRenderer, Event, Medium, RenderingStyle, Source, SourceGroup
+from entity_event.renderer_registry import (
+    get_renderer_registry, invalidate_renderer_registry, reset_renderer_registry, RendererRegistry,
+    VERSION_CACHE_KEY
+)
+from entity_event.tests import models as test_models
+
+
+class RendererRegistryTest(TestCase):
+    def setUp(self):
+        super(RendererRegistryTest, self).setUp()
+        self.source = G(Source)
+        self.source2 = G(Source, group=self.source.group)
+        self.rs1 = G(RenderingStyle, name='short')
+        self.rs2 = G(RenderingStyle, name='long')
+        self.cr1 = G(ContextRenderer, source=self.source, source_group=None, rendering_style=self.rs1)
+        self.cr2 = G(ContextRenderer, source=None, source_group=self.source.group, rendering_style=self.rs2)
+
+    def test_loaded_once(self):
+        # The rendering styles, the context renderers, their source groups and the sources of the groups
+        with self.assertNumQueries(4):
+            registry = RendererRegistry()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.get_rendering_style('short'), self.rs1)
+            self.assertEqual(registry.get_context_renderers({self.source.id}, set(), {self.rs1.id}), [self.cr1])
+            self.assertEqual(registry.get_context_renderers({self.source.id}, set(), {0}), [])
+            self.assertEqual(registry.get_context_renderers({0}, {0}, {self.rs1.id, self.rs2.id}), [])
+
+            group_renderers = registry.get_context_renderers(
+                set(), {self.source.group_id}, {self.rs1.id, self.rs2.id})
+            self.assertEqual(group_renderers, [self.cr2])
+            self.assertEqual(set(group_renderers[0].get_sources()), {self.source, self.source2})
+
+    def test_compiled_context_hints_memoized(self):
+        registry = RendererRegistry()
+        compile_context_hints = Mock(side_effect=lambda context_renderers: object())
+
+        compiled = registry.get_compiled_context_hints([self.cr1, self.cr2], compile_context_hints)
+        self.assertIs(registry.get_compiled_context_hints([self.cr2, self.cr1], compile_context_hints), compiled)
+        self.assertIsNot(registry.get_compiled_context_hints([self.cr1], compile_context_hints), compiled)
+        self.assertEqual(compile_context_hints.call_count, 2)
+
+        # A new registry is loaded when a renderer changes
+        reloaded_registry = RendererRegistry()
+        self.assertIsNot(
+            reloaded_registry.get_compiled_context_hints([self.cr1, self.cr2], compile_context_hints), compiled)
+
+    @patch.object(renderer_registry, 'MAX_COMPILED_CONTEXT_HINTS', 1)
+    def test_compiled_context_hints_bounded(self):
+        registry = RendererRegistry()
+        registry.get_compiled_context_hints([self.cr1], Mock())
+        registry.get_compiled_context_hints([self.cr2], Mock())
+        self.assertEqual(list(registry.compiled_context_hints), [frozenset([self.cr2.id])])
+
+    def test_missing_rendering_style(self):
+        with self.assertRaises(RenderingStyle.DoesNotExist):
+            RendererRegistry().get_rendering_style('missing')
+
+
+class GetRendererRegistryTest(TestCase):
+    def tearDown(self):
+        reset_renderer_registry()
+        cache.clear()
+        super(GetRendererRegistryTest, self).tearDown()
+
+    def test_not_enabled(self):
+        self.assertIsNone(get_renderer_registry())
+
+    def test_loaded_once(self):
+        with override_settings(ENTITY_EVENT_RENDERER_REGISTRY=True):
+            registry = get_renderer_registry()
+            with self.assertNumQueries(0):
+                self.assertIs(get_renderer_registry(), registry)
+
+        # Changing the setting discards the registry
+        self.assertIsNone(renderer_registry._registry)
+
+    def test_other_setting_changed(self):
+        with override_settings(ENTITY_EVENT_RENDERER_REGISTRY=True):
+            registry = get_renderer_registry()
+            with override_settings(DEBUG=True):
+                self.assertIs(get_renderer_registry(), registry)
+
+    @override_settings(ENTITY_EVENT_RENDERER_REGISTRY=True)
+    def test_invalidated_by_changes(self):
+        for create in [
+            lambda: G(RenderingStyle),
+            lambda: G(ContextRenderer),
+            lambda: G(Source),
+            lambda: G(SourceGroup),
+        ]:
+            registry = get_renderer_registry()
+            instance = create()
+            self.assertIsNot(get_renderer_registry(), registry)
+
+            registry = get_renderer_registry()
+            instance.delete()
+            self.assertIsNot(get_renderer_registry(), registry)
+
+    @override_settings(ENTITY_EVENT_RENDERER_REGISTRY=True)
+    def test_invalidated_on_commit(self):
+        registry = get_renderer_registry()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            G(RenderingStyle)
+            reloaded_registry = get_renderer_registry()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNot(reloaded_registry, registry)
+        self.assertIsNot(get_renderer_registry(), reloaded_registry)
+
+    @override_settings(ENTITY_EVENT_RENDERER_REGISTRY={'cache': 'default'})
+    def test_shared_cache_version(self):
+        registry = get_renderer_registry()
+        self.assertEqual(registry.version, cache.get(VERSION_CACHE_KEY))
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_renderer_registry(), registry)
+
+        # Another process changed a renderer
+        cache.set(VERSION_CACHE_KEY, 'changed')
+        self.assertEqual(get_renderer_registry().version, 'changed')
+
+        invalidate_renderer_registry()
+        self.assertNotEqual(cache.get(VERSION_CACHE_KEY), 'changed')
+
+
+@override_settings(ENTITY_EVENT_RENDERER_REGISTRY=True, DEFAULT_ENTITY_EVENT_RENDERING_STYLE='short')
+class LoadContextsAndRenderersWithRegistryTest(TestCase):
+    def tearDown(self):
+        reset_renderer_registry()
+        super(LoadContextsAndRenderersWithRegistryTest, self).tearDown()
+
+    def test_no_renderer_queries(self):
+        m1 = G(test_models.TestModel)
+        s = G(Source)
+        rs = G(RenderingStyle, name='short')
+        rs2 = G(RenderingStyle)
+        medium = G(Medium, rendering_style=rs2)
+        cr = G(ContextRenderer, rendering_style=rs, source=None, source_group=s.group, context_hints={
+            'key': {
+                'model_name': 'TestModel',
+                'app_name': 'tests',
+            }
+        })
+        G(Event, context={'key': m1.id}, source=s)
+        events = list(Event.objects.all())
+        get_renderer_registry()
+
+        # Only the hinted models
+        with self.assertNumQueries(1):
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        self.assertEqual(events[0].loaded_context, {'key': m1})
+        self.assertEqual(events[0]._context_renderers, {medium: cr})
+
+        # The context hints are compiled once for the same renderers
+        events = list(Event.objects.all())
+        with patch.object(context_loader, 'get_context_hints_per_source') as mock_get_context_hints_per_source:
+            context_loader.load_contexts_and_renderers(events, [medium])
+        self.assertFalse(mock_get_context_hints_per_source.called)
+        self.assertEqual(events[0].loaded_context, {'key': m1})
+
+    @override_settings(ENTITY_EVENT_RENDERER_REGISTRY={'cache': 'default'})
+    def test_registry_looked_up_once(self):
+        s = G(Source)
+        rs = G(RenderingStyle, name='short')
+        medium = G(Medium, rendering_style=rs)
+        cr = G(ContextRenderer, rendering_style=rs, source=s)
+        G(Event, context={}, source=s)
+        events = list(Event.objects.all())
+
+        # The version of the registry is only read from the shared cache once per render
+        with patch.object(cache, 'get', wraps=cache.get) as mock_get:
+            context_loader.load_contexts_and_renderers(events, [medium])
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(events[0]._context_renderers, {medium: cr})
@@ -0,0 +1,183 @@
+from django.test import TestCase, override_settings
+from django_dynamic_fixture import G
+from entity.models import Entity
+
+from entity_event import uuid_filter
+from entity_event.fields import hash_uuid
+from entity_event.models import Event, EventActor, Source
+from entity_event.uuid_filter import get_uuid_filter, reset_uuid_filter, UuidFilter, UuidFilterStats
+
+
+class UuidFilterStatsTest(TestCase):
+    def test_no_checks(self):
+        self.assertEqual(UuidFilterStats().false_positive_rate, 0)
+
+    def test_false_positive_rate(self):
+        stats = UuidFilterStats()
+        stats.num_checked = 10
+        stats.num_possible = 4
+        stats.num_false_positives = 2
+        self.assertEqual(stats.false_positive_rate, 0.25)
+
+
+class UuidFilterTest(TestCase):
+    def test_sizing(self):
+        uuid_filter = UuidFilter(capacity=1000, error_rate=0.01)
+        self.assertEqual(uuid_filter.num_bits, 9586)
+        self.assertEqual(uuid_filter.num_hashes, 7)
+        self.assertEqual(uuid_filter.num_bytes, 1199)
+
+    def test_add_and_contains(self):
+        uuid_filter = UuidFilter(capacity=1000, error_rate=0.01)
+        self.assertNotIn('1', uuid_filter)
+
+        uuid_filter.add(['1', '2'])
+        self.assertIn('1', uuid_filter)
+        self.assertIn('2', uuid_filter)
+        self.assertEqual(uuid_filter.num_added, 2)
+
+    def test_false_positive_rate_near_target(self):
+        uuid_filter = UuidFilter(capacity=1000, error_rate=0.01)
+        uuid_filter.add(str(i) for i in range(1000))
+
+        self.assertAlmostEqual(uuid_filter.estimated_false_positive_rate, 0.01, places=3)
+        num_false_positives = sum(str(i) in uuid_filter for i in range(1000, 11000))
+        self.assertLess(num_false_positives, 200)
+
+    def test_get_possible(self):
+        uuid_filter = UuidFilter(capacity=1000, error_rate=0.01)
+        uuid_filter.add(['1'])
+
+        self.assertEqual(uuid_filter.get_possible(['1', '2']), ['1'])
+        self.assertEqual(uuid_filter.stats.num_checked, 2)
+        self.assertEqual(uuid_filter.stats.num_possible, 1)
+
+    def test_warm(self):
+        source = G(Source)
+        for i in range(3):
+            Event.objects.create_event(source=source, context={}, uuid=str(i))
+
+        uuid_filter = UuidFilter(capacity=1000, error_rate=0.01)
+        with self.assertNumQueries(1):
+            uuid_filter.warm(2)
+
+        self.assertEqual(uuid_filter.num_added, 2)
+        self.assertIn('1', uuid_filter)
+        self.assertIn('2', uuid_filter)
+
+
+class GetUuidFilterTest(TestCase):
+    def tearDown(self):
+        reset_uuid_filter()
+        super(GetUuidFilterTest, self).tearDown()
+
+    def test_not_configured(self):
+        self.assertIsNone(get_uuid_filter())
+
+    def test_built_once(self):
+        with override_settings(ENTITY_EVENT_UUID_FILTER={'capacity': 1000}):
+            process_filter = get_uuid_filter()
+            self.assertEqual(process_filter.capacity, 1000)
+            self.assertIs(get_uuid_filter(), process_filter)
+
+        # Changing the setting discards the filter
+        self.assertIsNone(uuid_filter._uuid_filter)
+
+    def test_warmed(self):
+        Event.objects.create_event(source=G(Source), context={}, uuid='1')
+
+        with override_settings(ENTITY_EVENT_UUID_FILTER={'capacity': 1000, 'warm': 10}):
+            self.assertIn('1', get_uuid_filter())
+
+    def test_other_setting_changed(self):
+        with override_settings(ENTITY_EVENT_UUID_FILTER={'capacity': 1000}):
+            process_filter = get_uuid_filter()
+            with override_settings(DEBUG=True):
+                self.assertIs(get_uuid_filter(), process_filter)
+
+
+@override_settings(ENTITY_EVENT_UUID_FILTER={'capacity': 1000})
+class CreateEventsWithUuidFilterTest(TestCase):
+    def setUp(self):
+        super(CreateEventsWithUuidFilterTest, self).setUp()
+        self.source = G(Source)
+        self.actor = G(Entity)
+
+    def tearDown(self):
+        reset_uuid_filter()
+        super(CreateEventsWithUuidFilterTest, self).tearDown()
+
+    def get_kwargs_list(self, uuids):
+        return [
+            {'source': self.source, 'context': {}, 'uuid': uuid, 'actors': [self.actor], 'ignore_duplicates': True}
+            for uuid in uuids
+        ]
+
+    def test_new_uuids_skip_lookup(self):
+        # The event insert and the actor insert, with no lookup
+        with self.assertNumQueries(2):
+            events = Event.objects.create_events(self.get_kwargs_list(['1', '2']))
+
+        self.assertEqual(len(events), 2)
+        self.assertEqual(EventActor.objects.count(), 2)
+        self.assertIn('1', get_uuid_filter())
+
+    def test_duplicates_looked_up(self):
+        Event.objects.create_events(self.get_kwargs_list(['1', '2']))
+
+        # Only the lookup, since there is nothing left to insert
+        with self.assertNumQueries(1):
+            events = Event.objects.create_events(self.get_kwargs_list(['1', '2']))
+
+        self.assertEqual(events, [])
+        self.assertEqual(Event.objects.count(), 2)
+        self.assertEqual(get_uuid_filter().stats.num_false_positives, 0)
+
+    def test_false_positive(self):
+        process_filter = get_uuid_filter()
+        process_filter.add(['1'])
+
+        events = Event.objects.create_events(self.get_kwargs_list(['1']))
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(process_filter.stats.num_false_positives, 1)
+        self.assertEqual(process_filter.stats.false_positive_rate, 1)
+
+    def test_uuid_created_by_another_process(self):
+        get_uuid_filter()
+        Event.objects.bulk_create([Event(source=self.source, context={}, uuid='1')])
+
+        events = Event.objects.create_events(self.get_kwargs_list(['1', '2']))
+
+        self.assertEqual([e.uuid for e in events], ['2'])
+        self.assertEqual(Event.objects.count(), 2)
+        self.assertEqual(EventActor.objects.count(), 1)
+        self.assertEqual(get_uuid_filter().stats.num_conflicts, 1)
+        self.assertIn('1', get_uuid_filter())
+        self.assertEqual(get_uuid_filter().get_possible(['1']), ['1'])
+
+    def test_new_and_possible_uuids(self):
+        process_filter = get_uuid_filter()
+        process_filter.add(['1'])
+        kwargs_list = self.get_kwargs_list(['1', '2'])
+        kwargs_list.append({'source': self.source, 'context': {}, 'uuid': '3'})
+
+        # The lookup of the possible uuid, the insert of the events that were looked up or do not
+        # ignore duplicates, the insert of the new uuid and the actor insert
+        with self.assertNumQueries(4):
+            events = Event.objects.create_events(kwargs_list)
+
+        self.assertEqual({e.uuid for e in events}, {'1', '2', '3'})
+        self.assertTrue(all(e.pk for e in events))
+        self.assertEqual(EventActor.objects.count(), 2)
+        self.assertEqual(process_filter.stats.num_conflicts, 0)
+
+    def test_duplicates_not_ignored(self):
+        kwargs_list = self.get_kwargs_list(['1'])
+        kwargs_list[0]['ignore_duplicates'] = False
+
+        # Nothing to look up without ignore_duplicates
+        with self.assertNumQueries(2):
+            Event.objects.create_events(kwargs_list)
+
+        self.assertEqual(Event.objects.with_uuids(['1']).get().uuid_hash, hash_uuid('1'))
@@ -0,0 +1,164 @@
+"""
+A process-local bloom filter of event uuids, used by ``Event.objects.create_events`` to skip the
+duplicate lookup for uuids that are definitely new.
+"""
+from math import ceil, exp, log
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from entity_event.fields import hash_uuid
+
+
+# The process-wide filter, built on first use when ENTITY_EVENT_UUID_FILTER is set
+_uuid_filter = None
+_uuid_filter_lock = threading.Lock()
+
+
+class UuidFilterStats(object):
+    """
+    Counters describing how well a ``UuidFilter`` is working.
+    """
+    def __init__(self):
+        # The number of uuids checked, and how many of those may have existed and were looked up
+        self.num_checked = 0
+        self.num_possible = 0
+
+        # The number of looked up uuids that did not exist
+        self.num_false_positives = 0
+
+        # The number of times a uuid that the filter reported as new already existed, which happens
+        # when another process creates the event
+        self.num_conflicts = 0
+
+    @property
+    def false_positive_rate(self):
+        """
+        The observed fraction of new uuids that the filter could not rule out.
+        """
+        num_new = self.num_checked - self.num_possible + self.num_false_positives
+        return self.num_false_positives / num_new if num_new else 0
+
+
+class UuidFilter(object):
+    """
+    A bloom filter of event uuids. The bit positions of a uuid are derived from its 128 bit
+    ``uuid_hash``, so uuids can be added straight from the database without being hashed again.
+
+    The filter never reports a uuid that was added as new, but it only knows about the uuids
+    created by this process and the ones it was warmed with. Callers must be ready for a uuid
+    that the filter considers new to already exist.
+
+    :type capacity: int
+    :param capacity: The number of uuids the filter is sized for. The false positive rate
+        climbs above ``error_rate`` once more uuids than this have been added.
+
+    :type error_rate: float
+    :param error_rate: The target false positive rate at capacity.
+    """
+    def __init__(self, capacity=1000000, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = int(ceil(-capacity * log(error_rate) / (log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * log(2))))
+        self.num_added = 0
+        self.stats = UuidFilterStats()
+
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+
+    @property
+    def num_bytes(self):
+        """
+        The memory used by the bit array.
+        """
+        return len(self._bits)
+
+    @property
+    def estimated_false_positive_rate(self):
+        """
+        The expected false positive rate given the number of uuids added so far.
+        """
+        return (1 - exp(-self.num_hashes * self.num_added / self.num_bits)) ** self.num_hashes
+
+    def get_positions(self, uuid_hash):
+        """
+        Returns the bit positions of a uuid hash, using the two halves of the hash for double hashing.
+        """
+        value = uuid_hash.int
+        h1 = value & 0xFFFFFFFFFFFFFFFF
+        h2 = (value >> 64) | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add_hashes(self, uuid_hashes):
+        with self._lock:
+            for uuid_hash in uuid_hashes:
+                for position in self.get_positions(uuid_hash):
+                    self._bits[position >> 3] |= 1 << (position & 7)
+                self.num_added += 1
+
+    def add(self, uuids):
+        """
+        Adds event uuids to the filter.
+        """
+        self.add_hashes(hash_uuid(uuid) for uuid in uuids)
+
+    def __contains__(self, uuid):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self.get_positions(hash_uuid(uuid))
+        )
+
+    def get_possible(self, uuids):
+        """
+        Returns the uuids that may already exist. Every other uuid is definitely new, unless it
+        was created by another process.
+        """
+        possible = [uuid for uuid in uuids if uuid in self]
+        self.stats.num_checked += len(uuids)
+        self.stats.num_possible += len(possible)
+        return possible
+
+    def warm(self, num_events):
+        """
+        Adds the uuids of the most recently created events.
+        """
+        from entity_event.models import Event
+        self.add_hashes(Event.objects.order_by('-id').values_list('uuid_hash', flat=True)[:num_events])
+
+
+def get_uuid_filter():
+    """
+    Returns the uuid filter of the process, or ``None`` if the ``ENTITY_EVENT_UUID_FILTER`` setting
+    is not configured. The setting is a dict of ``UuidFilter`` arguments plus an optional ``warm``
+    number of recent events to add when the filter is built.
+    """
+    global _uuid_filter
+
+    config = getattr(settings, 'ENTITY_EVENT_UUID_FILTER', None)
+    if not config:
+        return None
+
+    with _uuid_filter_lock:
+        if _uuid_filter is None:
+            config = dict(config)
+            num_warm_events = config.pop('warm', 0)
+            uuid_filter = UuidFilter(**config)
+            if num_warm_events:
+                uuid_filter.warm(num_warm_events)
+            _uuid_filter = uuid_filter
+
+    return _uuid_filter
+
+
+@receiver(setting_changed)
+def reset_uuid_filter(setting=None, **kwargs):
+    """
+    Discards the filter of the process so that it is rebuilt on next use.
+    """
+    global _uuid_filter
+
+    if setting in (None, 'ENTITY_EVENT_UUID_FILTER'):
+        _uuid_filter = None
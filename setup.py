@@ -35,7 +35,7 @@ setup(
     author='Erik Swanson',
     author_email='opensource@ambition.com',
     keywords='',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     classifiers=[
         'Programming Language :: Python',
         'Programming Language :: Python :: 3.7',